@@ -0,0 +1 @@
+'''Benchmarks for mpyr, runnable outside of Maya.'''
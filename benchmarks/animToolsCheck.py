@@ -0,0 +1,132 @@
+'''Check the results of the animation tools of lib.rig on the biped.
+
+Builds the example biped and runs each check on it. A check poses or queries the rig
+with a tool and compares the result with what the tool should do, returning the
+problems found.
+Exits with a non zero code when any check finds a problem. Run it with mayapy, or with
+--fake in any python to build on the in-memory scene of lib.fakeScene:
+
+    mayapy -m mpyr.benchmarks.animToolsCheck
+    python -m mpyr.benchmarks.animToolsCheck --fake
+'''
+from __future__ import print_function
+import sys
+
+import mpyr.lib.cache as mpCache
+import mpyr.lib.name as name
+import mpyr.lib.rig as mpRig
+import mpyr.lib.scene as mpScene
+
+cmds=mpScene.cmds
+
+def buildBiped():
+    '''build the example biped rig'''
+    import mpyr.examples.biped.biped as biped
+    biped.Rig().create()
+
+def _setFlipAttrs(ctrlName):
+    '''give the limb of ctrlName and its mirror limb different FKIK values, return their
+    plugs. None if the limb has no mirror'''
+    source=mpRig.getLimbNodeShape(ctrlName)
+    target=mpRig.findMirrorCtrl(source)
+    if not target or target==source:
+        return None
+    plugs=('%s.%s'%(source,name.FKIKBLENDATTR),'%s.%s'%(target,name.FKIKBLENDATTR))
+    cmds.setAttr(plugs[0],1)
+    cmds.setAttr(plugs[1],0)
+    return plugs
+
+def _checkSwapped(plugs):
+    '''return a problem if the FKIK values set by _setFlipAttrs were not swapped'''
+    values=tuple(cmds.getAttr(plug) for plug in plugs)
+    if values!=(0,1):
+        return ['flipped %s and %s are %s and %s, expected 0 and 1'%(plugs+values)]
+    return []
+
+def checkFlipLimbAttrs(ctrlName='Arm_L_endIKCTRL'):
+    '''flip the limb attributes of ctrlName's limb and check they swapped with the mirror
+    limb'''
+    plugs=_setFlipAttrs(ctrlName)
+    if not plugs:
+        return ['%s has no mirror limb'%ctrlName]
+    mpRig.mirrorLimbAttrs([plugs[0].split('.')[0]],mode=mpRig.FLIP)
+    return _checkSwapped(plugs)
+
+def checkFlipCharacter(ctrlName='Leg_L_FootIKCTRL'):
+    '''flip the whole character and check the limb attributes swapped and the ctrls are
+    back in their pose after a second flip'''
+    plugs=_setFlipAttrs(ctrlName)
+    if not plugs:
+        return ['%s has no mirror limb'%ctrlName]
+    other=mpRig.findMirrorCtrl(ctrlName)
+    cmds.setAttr(ctrlName+'.t',1,2,3)
+    cmds.setAttr(other+'.t',-4,5,6)
+    ctrls=mpRig.getCharacterCtrls(ctrlName)
+    before=dict((ctrl,cmds.getAttr(ctrl+'.t')[0]+cmds.getAttr(ctrl+'.r')[0]) for ctrl in ctrls)
+    mpRig.mirrorCharacter(ctrlName,mode=mpRig.FLIP)
+    problems=_checkSwapped(plugs)
+    mpRig.mirrorCharacter(ctrlName,mode=mpRig.FLIP)
+    for ctrl in ctrls:
+        after=cmds.getAttr(ctrl+'.t')[0]+cmds.getAttr(ctrl+'.r')[0]
+        if max(abs(a-b) for a,b in zip(before[ctrl],after))>1e-6:
+            problems.append('%s moved from %s to %s after flipping twice'%(ctrl,before[ctrl],after))
+    return problems
+
+#ctrl: joint getJointFromCtrl should find on the biped, FK and IK ctrls
+DRIVENJOINTS={
+    'Arm_L_00FKCTRL':'Arm_L_01',
+    'Arm_L_02FKCTRL':'Arm_L_03',
+    'Arm_L_endIKCTRL':'Arm_L_03',
+    'Arm_R_endIKCTRL':'Arm_R_03',
+    'Leg_L_BallIKCTRL':'Foot_L_02',
+    'Leg_L_ToeTipIKCTRL':'Foot_L_03',
+    'Leg_R_BallIKCTRL':'Foot_R_02',
+    'Leg_R_ToeTipIKCTRL':'Foot_R_03',
+    }
+
+def checkDriverGraph(ctrlName='Arm_L_endIKCTRL',expected=DRIVENJOINTS):
+    '''check the joints found for the expected ctrls, and that no ctrl of the character
+    drives a helper joint flagged not to be cached, like the ik stub joints'''
+    problems=[]
+    for ctrl,jointName in sorted(expected.items()):
+        found=mpRig.getJointFromCtrl(ctrl)
+        if found!=jointName:
+            problems.append('getJointFromCtrl(%s) is %s, expected %s'%(ctrl,found,jointName))
+    ctrlJoints,jointCtrls=mpRig.getDriverGraph(ctrlName)
+    for jointName in sorted(jointCtrls):
+        if mpCache.isFlagged(jointName) and not mpCache.getFlag(jointName):
+            problems.append('helper joint %s is driven by %s'%(jointName,', '.join(jointCtrls[jointName])))
+        elif mpRig.getCtrlFromJoint(jointName)!=jointCtrls[jointName][0]:
+            problems.append('getCtrlFromJoint(%s) is not %s'%(jointName,jointCtrls[jointName][0]))
+    return problems
+
+#checks run by main, in order
+CHECKS=(checkFlipLimbAttrs,checkFlipCharacter,checkDriverGraph)
+
+def run(buildFunc=buildBiped):
+    '''build the rig and run every check, printing the result of each. Returns the list of
+    problems found'''
+    buildFunc()
+    problems=[]
+    for check in CHECKS:
+        found=check()
+        print('%-28s %s'%(check.__name__,'FAIL' if found else 'ok'))
+        problems.extend(found)
+    for problem in problems:
+        sys.stderr.write('FAIL %s\n'%problem)
+    return problems
+
+def main(args=None):
+    args=sys.argv[1:] if args is None else args
+    if '--fake' in args:
+        import mpyr.lib.fakeScene as mpFakeScene
+        with mpFakeScene.FakeBackend():
+            problems=run()
+    else:
+        import maya.standalone
+        maya.standalone.initialize()
+        problems=run()
+    return 1 if problems else 0
+
+if __name__=='__main__':
+    sys.exit(main())
@@ -0,0 +1,72 @@
+'''Profile a rig build and save the report, for tracking build time across characters.
+
+Builds a rig class with lib.profiler recording, prints the phase table and optionally
+writes the nested json report and a chrome trace. With --calls the scene commands are
+traced too (see lib.scene) and the call report is printed. Run it with mayapy:
+
+    mayapy -m mpyr.benchmarks.buildProfile
+    mayapy -m mpyr.benchmarks.buildProfile --rig mpyr.examples.biped.biped.Rig --json biped.json --trace bipedTrace.json
+    mayapy -m mpyr.benchmarks.buildProfile --calls
+
+or with --fake in any python, to build on the in-memory scene of lib.fakeScene. Times
+there show the cost of mpyr's own code and call counts are the same as in Maya, but
+command times are not Maya's:
+
+    python -m mpyr.benchmarks.buildProfile --fake --calls
+'''
+from __future__ import print_function
+import argparse
+import importlib
+
+import mpyr.lib.fakeScene as mpFakeScene
+import mpyr.lib.profiler as mpProfiler
+import mpyr.lib.scene as mpScene
+
+#rig built when --rig isn't given
+DEFAULTRIG='mpyr.examples.biped.biped.Rig'
+
+def getRigClass(path):
+    '''return the class from a dotted module.Class path'''
+    moduleName,className=path.rsplit('.',1)
+    return getattr(importlib.import_module(moduleName),className)
+
+def profileBuild(rigClass,calls=False):
+    '''build an instance of rigClass and return the BuildProfile and the scene Trace
+    (None unless calls is True)'''
+    trace=None
+    with mpProfiler.BuildProfile(rigClass.__name__) as profile:
+        if calls:
+            with mpScene.Trace() as trace:
+                rigClass().create()
+        else:
+            rigClass().create()
+    return profile,trace
+
+def main(args=None):
+    parser=argparse.ArgumentParser(description='Profile a rig build in mayapy.')
+    parser.add_argument('--rig',default=DEFAULTRIG,help='dotted path of the rig class (default: %(default)s)')
+    parser.add_argument('--json',help='write the nested report as json to this file')
+    parser.add_argument('--trace',help='write a chrome trace to this file')
+    parser.add_argument('--calls',action='store_true',help='also count and time scene commands')
+    parser.add_argument('--fake',action='store_true',help='build on an in-memory fake scene instead of Maya')
+    options=parser.parse_args(args)
+
+    if options.fake:
+        with mpFakeScene.FakeBackend():
+            profile,trace=profileBuild(getRigClass(options.rig),calls=options.calls)
+    else:
+        import maya.standalone
+        maya.standalone.initialize()
+        profile,trace=profileBuild(getRigClass(options.rig),calls=options.calls)
+    print(profile.getTable())
+    if trace:
+        print('')
+        print(trace.getTable())
+    if options.json:
+        profile.writeJson(options.json)
+    if options.trace:
+        profile.writeChromeTrace(options.trace)
+    return 0
+
+if __name__=='__main__':
+    main()
@@ -0,0 +1,234 @@
+'''Measure how rig build time grows with the size of the skeleton.
+
+Generates synthetic creature skeletons (a spine, pairs of legs, arms with many fingers,
+tentacles and NURBS strip tails), rigs them with FKChain, FKTree, FKIKChain, NurbsStrip
+and LegFKIK and reports build time and node count against joint count. Each size
+multiplies the number of limbs, so the joint count grows linearly with it and a build
+that scales well grows linearly too.
+
+The build runs on the in-memory scene of lib.fakeScene, so no Maya is needed. The end
+of build steps that go over every limb (addLimbSets, addAllCtrlSet, cleanupDanglingLimbs)
+are timed on their own, with their growth exponent against the previous size: about 1
+is linear, about 2 is quadratic.
+
+    python -m mpyr.benchmarks.buildScaling
+    python -m mpyr.benchmarks.buildScaling --sizes 1 2 4 8 16 --fingers 8 --tentacle-joints 30
+    python -m mpyr.benchmarks.buildScaling --json scaling.json
+'''
+from __future__ import print_function
+import argparse
+import gc
+import json
+import math
+
+from mpyr.lib.scene import cmds
+import mpyr.lib.fakeScene as mpFakeScene
+import mpyr.lib.profiler as mpProfiler
+import mpyr.rig.rigbase as mpRigBase
+import mpyr.rig.limb.generic as limbGen
+import mpyr.rig.limb.leg as limbLeg
+
+#default limb multipliers that are built
+SIZES=(1,2,4,8)
+
+#each size is built this many times and the fastest times are kept, to filter out noise
+REPEAT=3
+
+#end of build phases reported on their own
+WATCHED=('addLimbSets','addAllCtrlSet','cleanupDanglingLimbs','mirrorInfo')
+
+class SkeletonSpec(object):
+    '''Shape of a synthetic skeleton. Every count except spineJoints is per size step,
+    so size=4 makes four times the legs, arms, tentacles and strips.'''
+    def __init__(self,size=1,spineJoints=5,legs=1,arms=1,fingers=5,fingerJoints=3,
+            tentacles=1,tentacleJoints=12,strips=1,stripJoints=8):
+        object.__init__(self)
+        self.size=size
+        self.spineJoints=spineJoints
+        self.legs=legs
+        self.arms=arms
+        self.fingers=fingers
+        self.fingerJoints=fingerJoints
+        self.tentacles=tentacles
+        self.tentacleJoints=tentacleJoints
+        self.strips=strips
+        self.stripJoints=stripJoints
+
+    def __repr__(self):
+        return '%s(size=%s)'%(self.__class__.__name__,self.size)
+
+    def getJointCount(self):
+        '''return the number of joints makeSkeleton will create'''
+        perSide=(self.legs*6+
+            self.arms*(3+1+self.fingers*self.fingerJoints)+
+            self.tentacles*self.tentacleJoints+
+            self.strips*self.stripJoints)
+        return 1+self.spineJoints+2*perSide*self.size
+
+def makeChain(names,parent,offset):
+    '''create a joint chain under parent, each joint offset (x,y,z) from the last.
+    Returns the joint names.'''
+    joints=[]
+    for name in names:
+        joint=cmds.createNode('joint',n=name,p=parent)
+        cmds.setAttr(joint+'.t',*offset)
+        joints.append(joint)
+        parent=joint
+    return joints
+
+def makeSkeleton(spec,parent):
+    '''create a synthetic skeleton under parent. Returns a dict of limb kind: list of
+    (side,joint list) for every chain made, the 'spine' entry has the root first.
+    Legs also get a '<leg>_heel' joint under the ankle.'''
+    chains={'spine':[],'leg':[],'arm':[],'hand':[],'tentacle':[],'strip':[]}
+    root=makeChain(['Root'],parent,(0,10,0))[0]
+    spine=makeChain(['Spine_%02d'%(idx+1) for idx in range(spec.spineJoints)],root,(0,1,0))
+    chains['spine'].append(('M',[root]+spine))
+    count=spec.size
+    for side,sign in (('L',1),('R',-1)):
+        for idx in range(spec.legs*count):
+            part='Leg%s_%s'%(idx,side)
+            hip=makeChain([part+'_01'],root,(sign*(1+idx*0.5),0,-idx))[0]
+            knee=makeChain([part+'_02'],hip,(0,-4.5,0.4))[0]
+            leg=[hip,knee]+makeChain([part+'_03'],knee,(0,-4.5,-0.4))
+            foot=makeChain([part+'_04',part+'_05'],leg[-1],(0,-0.5,1))
+            makeChain([part+'_heel'],leg[-1],(0,-1,-0.5))
+            chains['leg'].append((side,leg+foot))
+        for idx in range(spec.arms*count):
+            part='Arm%s_%s'%(idx,side)
+            arm=makeChain([part+'_01'],spine[-1],(sign*1.0,0,-idx*0.5))
+            arm+=makeChain([part+'_02'],arm[0],(sign*3,0,-0.3))
+            arm+=makeChain([part+'_03'],arm[1],(sign*3,0,0.3))
+            chains['arm'].append((side,arm))
+            hand=makeChain(['Hand%s_%s_01'%(idx,side)],arm[-1],(sign*0.5,0,0))[0]
+            for finger in range(spec.fingers):
+                makeChain(['Finger%s%s_%s_%02d'%(idx,finger,side,joint+1) for joint in range(spec.fingerJoints)],
+                    hand,(sign*0.5,0,0.2*(finger-spec.fingers/2.0)))
+            chains['hand'].append((side,[hand]))
+        for idx in range(spec.tentacles*count):
+            part='Tentacle%s_%s'%(idx,side)
+            tentacle=makeChain(['%s_%02d'%(part,joint+1) for joint in range(spec.tentacleJoints)],
+                spine[len(spine)//2],(sign*0.8,-0.1,0.3))
+            chains['tentacle'].append((side,tentacle))
+        for idx in range(spec.strips*count):
+            part='Tail%s_%s'%(idx,side)
+            strip=makeChain(['%s_%02d'%(part,joint+1) for joint in range(spec.stripJoints)],
+                root,(sign*0.2*(idx+1),-0.2,-1))
+            chains['strip'].append((side,strip))
+    return chains
+
+class SyntheticRig(mpRigBase.AnimRig):
+    '''AnimRig built from a generated skeleton instead of an imported file'''
+    def __init__(self,spec=None):
+        mpRigBase.AnimRig.__init__(self)
+        self.rigName='Synthetic'
+        self.spec=spec or SkeletonSpec()
+        self.chains=None
+
+    def build(self):
+        self.chains=makeSkeleton(self.spec,self.skeletonNode)
+        self.rootJoint='Root'
+        self.skeletonSnapshot=None #hierarchy changed
+
+        side,joints=self.chains['spine'][0]
+        spine=self.makeLimb(limbGen.FKChain,'Spine','M',joints[0],joints[-1])
+        self.addLimb(spine)
+        for kind,limbClass in (('leg',limbLeg.LegFKIK),('arm',limbGen.FKIKChain),
+                ('hand',limbGen.FKTree),('tentacle',limbGen.FKChain),('strip',limbGen.NurbsStrip)):
+            for idx,(side,joints) in enumerate(self.chains[kind]):
+                limb=self.makeLimb(limbClass,'%s%s'%(kind.capitalize(),idx),side,joints[0],joints[-1])
+                if kind=='leg':
+                    limb.heel=joints[0][:-2]+'heel'
+                self.addLimb(limb)
+                limb > cmds.listRelatives(joints[0],p=True)[0]
+
+    def makeLimb(self,limbClass,part,loc,startJoint,endJoint):
+        '''return an instance of limbClass set up for the given joints'''
+        limb=limbClass()
+        limb.name.part=part
+        limb.name.loc=loc
+        limb.startJoint=startJoint
+        limb.endJoint=endJoint
+        return limb
+
+def buildSize(spec):
+    '''build a SyntheticRig of the given spec on a new fake scene. Returns a result dict
+    of joints, nodes, seconds and the seconds of each WATCHED phase. The garbage
+    collector is off while building, like timeit, its pauses grow with the heap and
+    would show up as superlinear build time.'''
+    with mpFakeScene.FakeBackend() as scene:
+        rig=SyntheticRig(spec)
+        gc.collect()
+        gcEnabled=gc.isenabled()
+        gc.disable()
+        try:
+            with mpProfiler.BuildProfile(str(spec)) as profile:
+                rig.create()
+        finally:
+            if gcEnabled:
+                gc.enable()
+        result={
+            'size':spec.size,
+            'joints':len(scene.ls(type='joint')),
+            'limbs':len(rig.limbs),
+            'nodes':len(scene.nodes),
+            'seconds':profile.root.duration,
+            }
+    for depth,phase in profile.getPhases():
+        if phase.name in WATCHED:
+            result[phase.name]=phase.duration
+    return result
+
+def growth(before,after,key):
+    '''return the exponent k of seconds ~ joints**k between two results, or None'''
+    if not before.get(key) or not after.get(key) or after['joints']==before['joints']:
+        return None
+    return math.log(after[key]/before[key])/math.log(float(after['joints'])/before['joints'])
+
+def getTable(results):
+    '''return the results as a text table, growth exponents in brackets'''
+    columns=('seconds',)+WATCHED
+    lines=['%6s %7s %6s %7s'%('size','joints','limbs','nodes')+''.join(' %23s'%name for name in columns)]
+    for idx,result in enumerate(results):
+        row='%6d %7d %6d %7d'%(result['size'],result['joints'],result['limbs'],result['nodes'])
+        for name in columns:
+            exponent=growth(results[idx-1],result,name) if idx else None
+            exponent='(%.2f)'%exponent if exponent is not None else ''
+            row+=' %12.1fms %7s'%(result.get(name,0.0)*1000.0,exponent)
+        lines.append(row)
+    return '\n'.join(lines)
+
+def run(sizes=SIZES,repeat=REPEAT,**specArgs):
+    '''build every size repeat times and return a list of result dicts with the
+    fastest time of each phase'''
+    results=[]
+    for size in sizes:
+        spec=SkeletonSpec(size=size,**specArgs)
+        runs=[buildSize(spec) for idx in range(repeat)]
+        result=runs[0]
+        for key in ('seconds',)+WATCHED:
+            if key in result:
+                result[key]=min(item[key] for item in runs)
+        results.append(result)
+    return results
+
+def main(args=None):
+    parser=argparse.ArgumentParser(description='Report rig build time against synthetic skeleton size, without Maya.')
+    parser.add_argument('--sizes',type=int,nargs='+',default=list(SIZES),help='limb multipliers to build (default: %(default)s)')
+    parser.add_argument('--fingers',type=int,default=5,help='fingers per hand')
+    parser.add_argument('--tentacle-joints',type=int,default=12,help='joints per tentacle')
+    parser.add_argument('--strip-joints',type=int,default=8,help='joints per NURBS strip tail')
+    parser.add_argument('--repeat',type=int,default=REPEAT,help='builds per size, the fastest is kept (default: %(default)s)')
+    parser.add_argument('--json',help='write the results as json to this file')
+    options=parser.parse_args(args)
+
+    results=run(options.sizes,options.repeat,fingers=options.fingers,tentacleJoints=options.tentacle_joints,
+        stripJoints=options.strip_joints)
+    print(getTable(results))
+    if options.json:
+        with open(options.json,'w') as f:
+            json.dump(results,f,indent=2,sort_keys=True)
+    return 0
+
+if __name__=='__main__':
+    main()
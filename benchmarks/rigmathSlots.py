@@ -0,0 +1,89 @@
+'''Micro benchmark for the rigmath Vector and Transform constructors.
+
+Compares the argument sniffing construction that rigmath used internally (make an
+empty object, then set it from a list) with the trusted __slots__ constructors it uses
+now, and reports the memory used per object. Runs without Maya:
+
+    python -m mpyr.benchmarks.rigmathSlots
+'''
+from __future__ import print_function
+import sys
+import timeit
+
+import mpyr.lib.rigmath as rigmath
+
+NUMBER=100000
+
+class _DictVector(object):
+    '''a Vector sized object without __slots__, only used to compare memory'''
+    def __init__(self,x,y,z):
+        self.x=x
+        self.y=y
+        self.z=z
+
+def _sniffedVector(x,y,z):
+    newV=rigmath.Vector()
+    newV.setFromList([x,y,z])
+    return newV
+
+def _sniffedAdd(a,b):
+    newV=rigmath.Vector()
+    newV.setFromList([a.x+b.x,a.y+b.y,a.z+b.z])
+    return newV
+
+def _sniffedCopy(xform):
+    return rigmath.Transform(xform.get())
+
+def _sniffedMul(a,b):
+    return rigmath.Transform(*[x*y for x,y in zip(a.get(),b.get())])
+
+def _trustedMul(a,b):
+    return rigmath._newTransform([x*y for x,y in zip(a._matrix,b._matrix)])
+
+def getCases():
+    '''return a list of (name,sniffed callable,trusted callable)'''
+    va=rigmath.Vector(1.0,2.0,3.0)
+    vb=rigmath.Vector(4.0,5.0,6.0)
+    xa=rigmath.Transform()
+    xa.setFromEuler(10,20,30)
+    xb=rigmath.Transform()
+    xb.setFromEuler(30,20,10)
+    return [
+        ('Vector construct',lambda: _sniffedVector(1.0,2.0,3.0),lambda: rigmath._newVector(1.0,2.0,3.0)),
+        ('Vector add',lambda: _sniffedAdd(va,vb),lambda: va+vb),
+        ('Vector cross',lambda: rigmath.Vector(va.y*vb.z-va.z*vb.y,va.z*vb.x-va.x*vb.z,va.x*vb.y-va.y*vb.x),lambda: va.cross(vb)),
+        ('Transform copy',lambda: _sniffedCopy(xa),lambda: xa.copy()),
+        ('Transform build',lambda: _sniffedMul(xa,xb),lambda: _trustedMul(xa,xb)),
+        ('Transform xAxis',lambda: rigmath.Vector(*xa.get()[0:3]),lambda: xa.xAxis()),
+        ]
+
+def objectSize(obj):
+    '''return bytes used by an object and its attribute dict, if it has one'''
+    size=sys.getsizeof(obj)
+    if hasattr(obj,'__dict__'):
+        size+=sys.getsizeof(obj.__dict__)
+    return size
+
+def run(number=NUMBER):
+    '''time every case and print a table of results. Returns list of
+    (name,sniffed seconds,trusted seconds)'''
+    results=[]
+    print('%-18s %12s %12s %8s'%('case','sniffed(us)','trusted(us)','speedup'))
+    for name,sniffed,trusted in getCases():
+        sniffedTime=min(timeit.repeat(sniffed,number=number,repeat=3))
+        trustedTime=min(timeit.repeat(trusted,number=number,repeat=3))
+        results.append((name,sniffedTime,trustedTime))
+        print('%-18s %12.3f %12.3f %7.2fx'%(
+            name,
+            sniffedTime/number*1e6,
+            trustedTime/number*1e6,
+            sniffedTime/trustedTime))
+    print('')
+    print('bytes per Vector:    %s (without __slots__: %s)'%(
+        objectSize(rigmath.Vector(1.0,2.0,3.0)),
+        objectSize(_DictVector(1.0,2.0,3.0))))
+    print('bytes per Transform: %s'%objectSize(rigmath.Transform()))
+    return results
+
+if __name__=='__main__':
+    run()
@@ -0,0 +1,231 @@
+'''Benchmark suite for rigmath, runs under plain CPython without Maya.
+
+Times the common Vector and Transform operations plus an aim vector calculation over
+a batch of three joint chains (the math rig.getAimVector does), once with Vectors and
+once with VectorArrays when numpy is available.
+
+Timings are also stored divided by a pure Python calibration loop, so a baseline saved
+on one machine is roughly comparable on another. Every case is timed over several
+rounds, each normalized by its own calibration, and the median round is kept. Comparing
+against a baseline times the cases found slower than the tolerance allows once more,
+and exits with a non zero code when any of them is still slow:
+
+    python -m mpyr.benchmarks.rigmathSuite
+    python -m mpyr.benchmarks.rigmathSuite --json results.json
+    python -m mpyr.benchmarks.rigmathSuite --baseline mpyr/benchmarks/rigmathBaseline.json
+    python -m mpyr.benchmarks.rigmathSuite --save-baseline mpyr/benchmarks/rigmathBaseline.json
+'''
+from __future__ import print_function
+import argparse
+import json
+import os
+import platform
+import random
+import sys
+import timeit
+
+import mpyr.lib.rigmath as rigmath
+
+#default file to compare against, next to this module
+BASELINE=os.path.join(os.path.dirname(os.path.abspath(__file__)),'rigmathBaseline.json')
+
+#allowed slowdown against the baseline before a case counts as a regression
+TOLERANCE=0.5
+
+#each case is timed this many times per round and the fastest is kept, to filter out noise
+REPEAT=7
+
+#number of calibrated rounds, the median normalized time of the rounds is kept so a
+#slow spell of the machine during one round doesn't move the result
+ROUNDS=5
+
+#number of chains used by the aim cases
+CHAINS=200
+
+def calibrate(number=200000):
+    '''return seconds per iteration of a fixed pure Python loop, used to normalize'''
+    def loop():
+        total=0.0
+        for idx in range(100):
+            total+=idx*0.5
+        return total
+    return min(timeit.repeat(loop,number=number//100,repeat=5))/(number//100)
+
+def randomChains(count,seed=0):
+    '''return count (start,mid,end) lists of Vectors for bent chains'''
+    rand=random.Random(seed)
+    chains=[]
+    for idx in range(count):
+        start=rigmath.Vector(rand.uniform(-10,10),rand.uniform(-10,10),rand.uniform(-10,10))
+        mid=start+rigmath.Vector(rand.uniform(1,5),rand.uniform(-1,1),rand.uniform(1,2))
+        end=mid+rigmath.Vector(rand.uniform(1,5),rand.uniform(-1,1),rand.uniform(-2,-1))
+        chains.append((start,mid,end))
+    return chains
+
+def aimVector(startV,midV,endV,distance=0.5):
+    '''the math of rig.getAimVector on Vectors'''
+    chainV=endV-startV
+    upperV=midV-startV
+    chainLength=chainV.length()
+    chainV.normalize()
+    upperV.normalize()
+    elbowV=chainV.cross(upperV).cross(chainV)
+    elbowV.normalize()
+    return elbowV*chainLength*distance+midV
+
+def aimVectorArray(startV,midV,endV,distance=0.5):
+    '''the math of rig.getAimVector on VectorArrays, one aim per chain'''
+    chainV=endV-startV
+    upperV=midV-startV
+    chainLength=chainV.length()
+    chainV.normalize()
+    upperV.normalize()
+    elbowV=chainV.cross(upperV).cross(chainV)
+    elbowV.normalize()
+    return elbowV*(chainLength*distance)+midV
+
+def getCases():
+    '''return a list of (name,callable,number of calls to time)'''
+    va=rigmath.Vector(1.0,2.0,3.0)
+    vb=rigmath.Vector(4.0,5.0,6.0)
+    xa=rigmath.Transform()
+    xa.setFromEuler(10,20,30)
+    xa.setTranslation(va)
+    xb=rigmath.Transform()
+    xb.setFromEuler(30,20,10,order='zxy')
+    scaled=rigmath.Transform([2,0,0,0,0,3,0,0,0,0,4,0,0,0,0,1])*xa
+    sheared=rigmath.Transform([1,0.5,0,0,0,1,0,0,0,0,1,0,0,0,0,1])*xa
+    matrixList=xa.get()
+    axis=rigmath.Vector(1.0,1.0,0.0)
+    chains=randomChains(CHAINS)
+
+    def invert(xform):
+        def run():
+            xform.copy().invert()
+        return run
+
+    def reflect():
+        xa.copy().reflect()
+
+    def aimScalar():
+        for start,mid,end in chains:
+            aimVector(start,mid,end)
+
+    cases=[
+        ('Vector construct',lambda: rigmath.Vector(1.0,2.0,3.0),100000),
+        ('Vector from list',lambda: rigmath.Vector([1.0,2.0,3.0]),100000),
+        ('Vector add',lambda: va+vb,100000),
+        ('Vector cross',lambda: va.cross(vb),100000),
+        ('Vector normalize',lambda: va.copy().normalize(),100000),
+        ('Transform construct',lambda: rigmath.Transform(matrixList),50000),
+        ('Transform multiply',lambda: xa*xb,50000),
+        ('Transform invert rigid',invert(xa),50000),
+        ('Transform invert scaled',invert(scaled),50000),
+        ('Transform invert affine',invert(sheared),50000),
+        ('Transform reflect',reflect,20000),
+        ('Transform setFromEuler',lambda: rigmath.Transform().setFromEuler(10,20,30,order='yzx'),20000),
+        ('Transform setFromAxisAngle',lambda: rigmath.Transform().setFromAxisAngle(axis,0.5),20000),
+        ('Transform getEuler',lambda: xa.getEuler('yzx'),20000),
+        ('Aim chains scalar',aimScalar,100),
+        ]
+    if rigmath.numpy:
+        starts=rigmath.VectorArray([chain[0] for chain in chains])
+        mids=rigmath.VectorArray([chain[1] for chain in chains])
+        ends=rigmath.VectorArray([chain[2] for chain in chains])
+        cases.append(('Aim chains batched',lambda: aimVectorArray(starts,mids,ends),100))
+    return cases
+
+def median(values):
+    '''return the median of a list of numbers'''
+    values=sorted(values)
+    middle=len(values)//2
+    if len(values)%2:
+        return values[middle]
+    return (values[middle-1]+values[middle])/2.0
+
+def run(scale=1.0,pattern=None,verbose=True,rounds=ROUNDS,names=None):
+    '''time every case, or only the cases in names. Returns a results dict that can be
+    saved as json'''
+    cases=[]
+    for name,func,number in getCases():
+        if pattern and pattern.lower() not in name.lower():
+            continue
+        if names is not None and name not in names:
+            continue
+        cases.append((name,func,max(1,int(number*scale))))
+    units=[]
+    timings=dict((name,[]) for name,func,number in cases)
+    for idx in range(rounds):
+        unit=calibrate()
+        units.append(unit)
+        for name,func,number in cases:
+            seconds=min(timeit.repeat(func,number=number,repeat=REPEAT))/number
+            timings[name].append((seconds,seconds/unit))
+    results={}
+    if verbose:
+        print('%-28s %12s %12s'%('case','us/call','normalized'))
+    for name,func,number in cases:
+        seconds=median([timing[0] for timing in timings[name]])
+        normalized=median([timing[1] for timing in timings[name]])
+        results[name]={'usPerCall':seconds*1e6,'normalized':normalized,'number':number}
+        if verbose:
+            print('%-28s %12.3f %12.3f'%(name,seconds*1e6,normalized))
+    return {
+        'python':platform.python_version(),
+        'implementation':platform.python_implementation(),
+        'numpy':rigmath.numpy.__version__ if rigmath.numpy else None,
+        'calibrationUs':median(units)*1e6,
+        'rounds':rounds,
+        'repeat':REPEAT,
+        'results':results,
+        }
+
+def compare(results,baseline,tolerance=TOLERANCE):
+    '''compare results against baseline results on normalized time. Returns a list of
+    (name,baseline,current,ratio) for every case slower than tolerance allows'''
+    regressions=[]
+    for name,current in sorted(results['results'].items()):
+        if name not in baseline['results']:
+            continue
+        old=baseline['results'][name]['normalized']
+        ratio=current['normalized']/old
+        if ratio>1.0+tolerance:
+            regressions.append((name,old,current['normalized'],ratio))
+    return regressions
+
+def main(args=None):
+    parser=argparse.ArgumentParser(description='Benchmark rigmath outside of Maya.')
+    parser.add_argument('--json',help="write results as json to this file, '-' for stdout")
+    parser.add_argument('--baseline',nargs='?',const=BASELINE,help='compare against a saved baseline (default: %(const)s)')
+    parser.add_argument('--save-baseline',nargs='?',const=BASELINE,dest='saveBaseline',help='save results as the new baseline (default: %(const)s)')
+    parser.add_argument('--tolerance',type=float,default=TOLERANCE,help='allowed slowdown, 0.5 = 50%% (default: %(default)s)')
+    parser.add_argument('--scale',type=float,default=1.0,help='multiply the number of calls per case')
+    parser.add_argument('--rounds',type=int,default=ROUNDS,help='number of calibrated rounds (default: %(default)s)')
+    parser.add_argument('--filter',dest='pattern',help='only run cases containing this text')
+    options=parser.parse_args(args)
+
+    results=run(scale=options.scale,pattern=options.pattern,verbose=options.json!='-',rounds=options.rounds)
+    if options.json=='-':
+        print(json.dumps(results,indent=2,sort_keys=True))
+    elif options.json:
+        with open(options.json,'w') as f:
+            json.dump(results,f,indent=2,sort_keys=True)
+    if options.saveBaseline:
+        with open(options.saveBaseline,'w') as f:
+            json.dump(results,f,indent=2,sort_keys=True)
+    if options.baseline:
+        with open(options.baseline) as f:
+            baseline=json.load(f)
+        regressions=compare(results,baseline,tolerance=options.tolerance)
+        if regressions:
+            #time the slow cases again, only report the ones that are still slow
+            rerun=run(scale=options.scale,verbose=False,rounds=options.rounds,names=[regression[0] for regression in regressions])
+            regressions=compare(rerun,baseline,tolerance=options.tolerance)
+        for name,old,new,ratio in regressions:
+            sys.stderr.write('REGRESSION %s: %.3f -> %.3f (%.2fx)\n'%(name,old,new,ratio))
+        if regressions:
+            return 1
+    return 0
+
+if __name__=='__main__':
+    sys.exit(main())
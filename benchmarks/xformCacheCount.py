@@ -0,0 +1,153 @@
+'''Count the Maya queries saved by the lib.xform world matrix cache on the biped build.
+
+Wraps the xform and objExists commands of lib.scene with counters, builds the example biped
+once with the cache disabled and once with it enabled, and prints the number of calls
+made each time. It exits with a non zero code when the cached build doesn't make fewer
+xform calls, or when any transform ends up with a different world matrix than in the
+uncached build. Run it with mayapy, or with --fake in any python to build on the
+in-memory scene of lib.fakeScene:
+
+    mayapy -m mpyr.benchmarks.xformCacheCount
+    python -m mpyr.benchmarks.xformCacheCount --fake
+'''
+from __future__ import print_function
+import functools
+import sys
+
+import mpyr.lib.xform as mpXform
+
+#cmds functions that are counted
+COUNTED=('xform','objExists')
+
+#largest difference allowed between the world matrix values of both builds
+MATRIXTOLERANCE=1e-6
+
+class CallCounter(object):
+    '''Stand-in for the functions of a cmds module that counts calls to them.
+    xform calls are split into queries and edits. Use as a context manager, the
+    original functions are put back on exit.'''
+    def __init__(self,cmdsModule,names=COUNTED):
+        object.__init__(self)
+        self.cmdsModule=cmdsModule
+        self.names=names
+        self.originals={}
+        self.counts={}
+
+    def _wrap(self,name,func):
+        @functools.wraps(func)
+        def wrapper(*args,**kwargs):
+            key=name
+            if name=='xform':
+                key='xform query' if kwargs.get('q') or kwargs.get('query') else 'xform edit'
+            self.counts[key]=self.counts.get(key,0)+1
+            return func(*args,**kwargs)
+        return wrapper
+
+    def __enter__(self):
+        for name in self.names:
+            func=getattr(self.cmdsModule,name)
+            self.originals[name]=func
+            setattr(self.cmdsModule,name,self._wrap(name,func))
+        return self
+
+    def __exit__(self,excType,excValue,traceback):
+        for name,func in self.originals.items():
+            setattr(self.cmdsModule,name,func)
+        self.originals={}
+        return False
+
+class NewScene(object):
+    '''context manager that starts each Maya build in a new empty scene'''
+    def __enter__(self):
+        import mpyr.lib.scene as mpScene
+        mpScene.cmds.file(new=True,force=True)
+        return self
+
+    def __exit__(self,excType,excValue,traceback):
+        return False
+
+def buildBiped():
+    '''build the example biped rig'''
+    import mpyr.examples.biped.biped as biped
+    biped.Rig().create()
+
+def getWorldMatrices(cmdsModule):
+    '''return a dict of full path: world matrix of every transform in the scene, queried
+    directly so the cache can't hide a stale value'''
+    return dict((node,cmdsModule.xform(node,q=True,ws=True,m=True))
+        for node in cmdsModule.ls(type='transform',long=True) or [])
+
+def count(cmdsModule,buildFunc=buildBiped,enabled=True,sceneFunc=None,matrices=None):
+    '''run buildFunc with the cache enabled or disabled, return dict of call counts.
+    sceneFunc returns a context manager to build in, like a new FakeBackend, so every
+    build starts from its own scene. If a matrices dict is given it is filled with the
+    world matrix of every transform after the build, see getWorldMatrices.'''
+    if sceneFunc:
+        with sceneFunc():
+            return count(cmdsModule,buildFunc,enabled,matrices=matrices)
+    oldEnabled=mpXform.ENABLED
+    mpXform.ENABLED=enabled
+    mpXform.resetStats()
+    try:
+        with CallCounter(cmdsModule) as counter:
+            buildFunc()
+    finally:
+        mpXform.ENABLED=oldEnabled
+    counts=dict(counter.counts)
+    counts.update(('cache %s'%key,value) for key,value in mpXform.getStats().items())
+    if matrices is not None:
+        matrices.update(getWorldMatrices(cmdsModule))
+    return counts
+
+def check(without,withCache,matricesWithout,matricesWith,tolerance=MATRIXTOLERANCE):
+    '''return a list of problems found comparing the uncached and cached builds, empty
+    if the cache saved xform calls and left every world matrix as it was'''
+    problems=[]
+    before=without.get('xform query',0)+without.get('xform edit',0)
+    after=withCache.get('xform query',0)+withCache.get('xform edit',0)
+    if after>=before:
+        problems.append('cached build made %s xform calls, uncached %s'%(after,before))
+    for node in sorted(set(matricesWithout)|set(matricesWith)):
+        if node not in matricesWithout or node not in matricesWith:
+            problems.append('%s only exists in one build'%node)
+            continue
+        diff=max(abs(a-b) for a,b in zip(matricesWithout[node],matricesWith[node]))
+        if diff>tolerance:
+            problems.append('%s world matrix differs by %g'%(node,diff))
+    return problems
+
+def run(cmdsModule,buildFunc=buildBiped,sceneFunc=None):
+    '''count calls without and with the cache, print a table and the problems found by
+    check. Returns the list of problems'''
+    matricesWithout={}
+    matricesWith={}
+    without=count(cmdsModule,buildFunc,enabled=False,sceneFunc=sceneFunc,matrices=matricesWithout)
+    withCache=count(cmdsModule,buildFunc,enabled=True,sceneFunc=sceneFunc,matrices=matricesWith)
+    print('%-22s %10s %10s %8s'%('calls','no cache','cache','saved'))
+    for key in sorted(set(without)|set(withCache)):
+        before=without.get(key,0)
+        after=withCache.get(key,0)
+        saved=''
+        if before and not key.startswith('cache'):
+            saved='%.0f%%'%(100.0*(before-after)/before)
+        print('%-22s %10s %10s %8s'%(key,before,after,saved))
+    problems=check(without,withCache,matricesWithout,matricesWith)
+    print('%s transforms compared'%len(matricesWith))
+    for problem in problems:
+        sys.stderr.write('FAIL %s\n'%problem)
+    return problems
+
+def main(args=None):
+    import mpyr.lib.scene as mpScene
+    args=sys.argv[1:] if args is None else args
+    if '--fake' in args:
+        import mpyr.lib.fakeScene as mpFakeScene
+        problems=run(mpScene.cmds,sceneFunc=mpFakeScene.FakeBackend) #a new scene for each build
+    else:
+        import maya.standalone
+        maya.standalone.initialize()
+        problems=run(mpScene.cmds,sceneFunc=NewScene)
+    return 1 if problems else 0
+
+if __name__=='__main__':
+    sys.exit(main())
@@ -1,6 +1,6 @@
 '''test rig build script'''
 import os
-import maya.cmds as cmds
+from mpyr.lib.scene import cmds
 import mpyr.rig.rigbase as mpRigBase
 import mpyr.rig.limb.generic as generic
 import mpyr.rig.limb.leg as legs
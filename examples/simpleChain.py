@@ -1,6 +1,6 @@
 '''A few simple limbs on a simple skeleton'''
 import os
-import maya.cmds as cmds
+from mpyr.lib.scene import cmds
 import mpyr.rig.rigbase as mpRigBase
 import mpyr.rig.limb.generic as limbGen
 
@@ -1,6 +1,6 @@
 '''helpers for getting/setting/making/locking attributes on maya nodes'''
-import maya.cmds as cmds
-import maya.mel as mel
+from mpyr.lib.scene import cmds
+from mpyr.lib.scene import mel
 
 def visOveride(obj,value):
     '''hides node using vis override, so unhide all won't unhide'''
@@ -34,7 +34,7 @@ def matchAttr(src,target,attr):
         
     if srcType == 'string':
         val = cmds.getAttr(src + '.%s' % attr)
-        print 'setting target to ' , target, attr,val
+        print('setting target to %s %s %s'%(target,attr,val))
         cmds.setAttr(target+'.%s' % attr, val, type='string')
     else:
         if attr in 'srt':
@@ -46,6 +46,41 @@ def matchAttr(src,target,attr):
     if locked:
         cmds.setAttr(target+'.'+attr, lock=True)
 
+def getChannels(obj,channels):
+    '''given an object and a list of channels, return a list of their values. When all
+    of the x,y,z channels of t, r or s are asked for they are read with a single getAttr.'''
+    values = {}
+    for attr in ('t','r','s'):
+        group = [attr+axis for axis in 'xyz']
+        if all(channel in channels for channel in group):
+            values.update(zip(group,cmds.getAttr(obj+'.'+attr)[0]))
+    return [values[channel] if channel in values else cmds.getAttr(obj+'.'+channel) for channel in channels]
+
+def setChannels(obj,values,skipLocked=False):
+    '''given an object and a dict of channel: value, set every channel. When all of
+    the x,y,z channels of t, r or s are given they are set with a single setAttr.
+    With skipLocked channels that can't be set (locked or connected) are skipped,
+    otherwise they raise RuntimeError.'''
+    remaining = dict(values)
+    try:
+        for attr in ('t','r','s'):
+            channels = [attr+axis for axis in 'xyz']
+            if all(channel in remaining for channel in channels):
+                cmds.setAttr(obj+'.'+attr,*[remaining[channel] for channel in channels])
+                for channel in channels:
+                    del remaining[channel]
+        for channel in list(remaining):
+            cmds.setAttr(obj+'.'+channel,remaining.pop(channel))
+    except RuntimeError:
+        if not skipLocked:
+            raise
+        #set what can be set one channel at a time
+        for channel,value in remaining.items():
+            try:
+                cmds.setAttr(obj+'.'+channel,value)
+            except RuntimeError:
+                pass
+
 def lockAndHide(obj, attrs):
     '''given an object and a list of attrs, lock and hide those attrs'''
     for aa in attrs:
@@ -1,6 +1,6 @@
 '''Library for caching joints/mesh'''
 import mpyr.lib.name as mpName
-import maya.cmds as cmds
+from mpyr.lib.scene import cmds
 
 def getFlag(obj):
     '''returns cache flag value on object, False if not flagged'''
@@ -1,6 +1,8 @@
 '''helper functions for working with contraints'''
-import maya.cmds as cmds
+from mpyr.lib.scene import cmds
+import mpyr.lib.xform as mpXform
 
+@mpXform.invalidates
 def blendConstraint(driver1,driver2,driven,blendAttr,cnsType='parent', **kwargs):
     '''given two drivers, a driven, and an attribute that goes from 0-1, make a blended 
     constraint setup. All other keyword arguments are passed through to the maya cns command.
@@ -3,12 +3,13 @@ will be putting keyframes on.'''
 import math
 import os
 import json
-import maya.cmds as cmds
-import maya.mel as mel
+from mpyr.lib.scene import cmds
+from mpyr.lib.scene import mel
 import mpyr.lib.attr as attr
 import mpyr.lib.name as name
 import mpyr.lib.fileIO as fileIO
 import mpyr.lib.rigmath as rigmath
+import mpyr.lib.xform as mpXform
 
 #List of available curve ctrl types
 CTRLTYPES=['sphere','cube','box','circle','cross','square','pyramid','line','spoon']
@@ -66,8 +67,8 @@ def addCtrl(ctrlname,shape='sphere',size=1.0,segments=13,parent=None,color=None,
 
     if xform:
         #if name of node then math matrix and rotate order
-        if isinstance(xform,str) and cmds.objExists(xform):
-            matchMatrix = cmds.xform(xform,q=True,ws=True,m=True)
+        if isinstance(xform,str) and mpXform.exists(xform):
+            matchMatrix = mpXform.getWorldMatrix(xform)
             attr.matchAttr(xform,zero,"rotateOrder")
             attr.matchAttr(xform,crv,"rotateOrder")
         #otherwise just match matrix.
@@ -232,7 +233,7 @@ def loadCtrlAppearance(filePath,search='',replace=''):
         raise IOError('ctrl appearance file not found:%s'%filePath)
     with open(filePath) as ctrlAppFile:
         data=json.load(ctrlAppFile)
-        for ctrlName,ctrlData in data.iteritems():
+        for ctrlName,ctrlData in data.items():
             if search:
                 ctrlName=ctrlName.replace(search,replace)
             if not cmds.objExists(ctrlName):
@@ -300,7 +301,7 @@ def makeSphere(size=1.0,segments=13,**kwargs):
     #add the axes together.
     #The little segment added in is needed to bridge where the second circle ends
     #to where the third circle begins.
-    totalVerts = vertsX+vertsY+vertsX[:segments/3] + vertsZ
+    totalVerts = vertsX+vertsY+vertsX[:segments//3] + vertsZ
     
     return cmds.curve(d=1,p=totalVerts,k=range(len(totalVerts)))
         
@@ -1,63 +1,245 @@
-'''Functions for navigating maya nodes'''
-import maya.cmds as cmds
+'''Functions for navigating maya nodes
 
-def getLowestParent(nodeList):
-    '''Given a list of nodes, get the topmost parent common to every node in the list.
-    If no node parent is found the scene root (|) is returned.'''
-    testList = []
-    
-    #exclude any node parented to another node in the nodeList.
-    #They will automatically share the lowest parent.
-    for node in nodeList:
+HierarchySnapshot reads a DAG hierarchy once and answers parent/child/chain queries
+from memory. Helpers like joint.getJointList take an optional snapshot, so a rig build
+can share one instead of querying Maya and splitting paths on every call.
+'''
+from mpyr.lib.scene import cmds
+
+class HierarchySnapshot(object):
+    '''A read only copy of the DAG hierarchy under a root node (root included).
+    Stores full paths, short names, node types and parent/child indices, and answers
+    queries without calling Maya. Nodes can be given by short name (if unique in the
+    snapshot) or full path. Returned nodes are short names, like listRelatives.
+
+    The snapshot does not update, make a new one (or call refresh) after changing the
+    hierarchy under the root.
+    '''
+    def __init__(self,root):
+        object.__init__(self)
+        self.root = root
+        self.refresh()
+
+    def __len__(self):
+        return len(self.paths)
+
+    def __contains__(self,node):
         try:
-            nodePar = cmds.listRelatives(node,p=True,fullPath=True)[0]
+            self.index(node)
+        except RuntimeError:
+            return False
+        return True
 
-        except RuntimeError: #this is a root level node, common parent is scene root
-            return ('|')
-            
-        #check immediate parent
-        if nodePar in nodeList:
-            continue
-            
-        #Check other parents (a little slower)
-        splitPars = nodePar.split("|")[:-1]
-        alreadyInList = False
-        for par in splitPars:
-            if par in nodeList:
-                alreadyInList = True
-                break
-        if alreadyInList:
+    def __repr__(self):
+        return '%s(%s) %s nodes' % (self.__class__.__name__,self.root,len(self.paths))
+
+    def refresh(self):
+        '''read the hierarchy from the scene again'''
+        listing = cmds.ls(self.root,dag=True,long=True,showType=True) or []
+        self.paths = listing[0::2]
+        self.types = listing[1::2]
+        self.names = [path.rsplit('|',1)[-1] for path in self.paths]
+        self.depths = [path.count('|') for path in self.paths]
+        self._byPath = dict((path,idx) for idx,path in enumerate(self.paths))
+        self._byName = dict()
+        for idx,shortName in enumerate(self.names):
+            self._byName.setdefault(shortName,[]).append(idx)
+        self.parents = []
+        self.children = [[] for path in self.paths]
+        for idx,path in enumerate(self.paths):
+            parIdx = self._byPath.get(path.rsplit('|',1)[0],-1)
+            self.parents.append(parIdx)
+            if parIdx != -1:
+                self.children[parIdx].append(idx)
+
+    def index(self,node):
+        '''return the index of a node. Raises RuntimeError if the node is not in the
+        snapshot or the short name is not unique.'''
+        if node in self._byPath:
+            return self._byPath[node]
+        indices = self._byName.get(node.rsplit('|',1)[-1],[])
+        if '|' in node:
+            #partial path, match the end of the full paths
+            indices = [idx for idx in indices if self.paths[idx].endswith('|'+node)]
+        if len(indices) == 1:
+            return indices[0]
+        if not indices:
+            raise RuntimeError("'%s' not found in hierarchy of %s" % (node,self.root))
+        raise RuntimeError("More than one node named '%s' in hierarchy of %s" % (node,self.root))
+
+    def getFullPath(self,node):
+        '''return the full DAG path of a node'''
+        return self.paths[self.index(node)]
+
+    def getType(self,node):
+        '''return the node type of a node'''
+        return self.types[self.index(node)]
+
+    def getParent(self,node,type=None):
+        '''return the parent of a node, or the nearest ancestor of the given type. None if
+        there isn't one in the snapshot'''
+        for idx in self._ancestors(self.index(node)):
+            if type is None or self.types[idx] == type:
+                return self.names[idx]
+        return None
+
+    def getChildren(self,node,type=None):
+        '''return the children of a node, optionally only of a given type'''
+        return [self.names[idx] for idx in self.children[self.index(node)]
+                if type is None or self.types[idx] == type]
+
+    def getAncestors(self,node,type=None):
+        '''return the ancestors of a node from its parent up, optionally only of a given type'''
+        return [self.names[idx] for idx in self._ancestors(self.index(node))
+                if type is None or self.types[idx] == type]
+
+    def getDescendants(self,node,type=None):
+        '''return every node under a node depth first, optionally only of a given type'''
+        descendants = []
+        stack = list(reversed(self.children[self.index(node)]))
+        while stack:
+            idx = stack.pop()
+            if type is None or self.types[idx] == type:
+                descendants.append(self.names[idx])
+            stack.extend(reversed(self.children[idx]))
+        return descendants
+
+    def isAncestor(self,ancestor,node):
+        '''return True if ancestor is above node in the hierarchy'''
+        ancIdx = self.index(ancestor)
+        return ancIdx in self._ancestors(self.index(node))
+
+    def getChain(self,startNode,endNode):
+        '''return the list of nodes from startNode down to endNode, both included.
+        Raises RuntimeError if startNode is not above endNode.'''
+        startIdx = self.index(startNode)
+        endIdx = self.index(endNode)
+        chain = [endIdx]
+        for idx in self._ancestors(endIdx):
+            chain.append(idx)
+            if idx == startIdx:
+                chain.reverse()
+                return [self.names[idx] for idx in chain]
+        raise RuntimeError("'%s' not a parent of '%s'" % (startNode,endNode))
+
+    def getTopJoint(self,node):
+        '''return the highest joint above node, or node if it is a joint with no joints
+        above it. Raises RuntimeError if neither.'''
+        idx = self.index(node)
+        top = None
+        for parIdx in self._ancestors(idx):
+            if self.types[parIdx] == 'joint':
+                top = parIdx
+        if top is None:
+            if self.types[idx] == 'joint':
+                return self.names[idx]
+            raise RuntimeError("'%s' has no parent joints nor is it a joint" % node)
+        return self.names[top]
+
+    def getEndJoint(self,startJoint):
+        '''return the lowest joint of a chain starting at startJoint, stopping at a branch.
+        Returns None if startJoint has no child joints.'''
+        idx = self.index(startJoint)
+        endJoint = None
+        while True:
+            childJoints = [child for child in self.children[idx] if self.types[child] == 'joint']
+            if len(childJoints) != 1:
+                return endJoint
+            idx = childJoints[0]
+            endJoint = self.names[idx]
+
+    def getCommonParent(self,node1,node2):
+        '''return the full path of the lowest node above both nodes, '|' for the scene
+        root. Works from the full paths, so ancestors outside the snapshot count too and
+        the answer matches dag.getCommonParent.'''
+        return _commonParentPath([self.getFullPath(node1),self.getFullPath(node2)])
+
+    def _ancestors(self,idx):
+        '''yield indices above idx, parent first'''
+        idx = self.parents[idx]
+        while idx != -1:
+            yield idx
+            idx = self.parents[idx]
+
+def getLowestParent(nodeList,snapshot=None):
+    '''Given a list of nodes, get the lowest parent common to every node in the list, as a
+    full path. Nodes parented under other nodes of the list share their parent, so the
+    result is always above every node. If no node parent is found the scene root (|) is
+    returned. If a HierarchySnapshot holding every node is given the scene isn't queried.'''
+    return getLowestParents([nodeList],snapshot=snapshot)[0]
+
+def getLowestParents(groups,snapshot=None):
+    '''Batched getLowestParent: given a list of node lists, return the lowest common parent
+    of each list. Full paths are looked up once for all nodes, then each group is a
+    single prefix walk over its paths, so the cost is linear in the number of nodes.'''
+    allNodes = []
+    seen = set()
+    for nodeList in groups:
+        for node in nodeList:
+            if node not in seen:
+                seen.add(node)
+                allNodes.append(node)
+    fullPaths = dict(zip(allNodes,getFullPaths(allNodes,snapshot=snapshot)))
+    return [_commonParentPath([fullPaths[node] for node in nodeList]) for nodeList in groups]
+
+def getFullPaths(nodeList,snapshot=None):
+    '''return the full DAG path of every node in nodeList, in order. Uses one ls call for
+    the whole list, or the snapshot if it holds every node.
+    Raises RuntimeError if a node doesn't exist or its name isn't unique.'''
+    nodeList = list(nodeList)
+    if snapshot and all(node in snapshot for node in nodeList):
+        return [snapshot.getFullPath(node) for node in nodeList]
+    fullPaths = cmds.ls(nodeList,long=True) or []
+    matched = len(fullPaths) == len(nodeList)
+    if matched:
+        matched = all(path.endswith(node.rsplit('|',1)[-1]) for node,path in zip(nodeList,fullPaths))
+    if not matched:
+        #missing, duplicate or non dag names, look each one up to report the problem
+        fullPaths = []
+        for node in nodeList:
+            found = cmds.ls(node,long=True) or []
+            if len(found) != 1:
+                raise RuntimeError("'%s' not found or not unique, cannot get full path" % node)
+            fullPaths.append(found[0])
+    return fullPaths
+
+def _commonParentPath(fullPaths):
+    '''given full paths return the full path of the lowest common parent, '|' for the
+    scene root. Walks the shared prefix of the parent paths.'''
+    common = None
+    for path in fullPaths:
+        parts = path.split('|')[1:-1] #drop leading empty and the node itself
+        if common is None:
+            common = parts
             continue
-            
-        #tests passed, add to list to be analyzed
-        testList.append(node)
-        
-    #If only one node survives the test it was a simple tree. Return the root's parent.
-    if len(testList) == 1:
-        return cmds.listRelatives(testList[0],p=True)
-        
-    #else, we must test
-    lowestPar = '|'
-    #TODO test
-    
-def getCommonParent(node1,node2):
-    '''return the common parent of both nodes'''
-    fullPath1 = cmds.listRelatives(node1,fullPath=True,p=True)[0]
-    fullPath2 = cmds.listRelatives(node2,fullPath=True,p=True)[0]
-    for index,item in enumerate(fullPath1):
-        if fullPath2[index] != item:
-            return fullPath1[:index]
-    return fullPath1
+        length = min(len(common),len(parts))
+        idx = 0
+        while idx < length and common[idx] == parts[idx]:
+            idx += 1
+        del common[idx:]
+        if not common:
+            break
+    if not common:
+        return '|'
+    return '|' + '|'.join(common)
+
+def getCommonParent(node1,node2,snapshot=None):
+    '''return the common parent of both nodes. If a HierarchySnapshot holding both nodes
+    is given it is used instead of querying the scene.'''
+    return _commonParentPath(getFullPaths([node1,node2],snapshot=snapshot))
     
 
 def getRootNodes(nodeList):
     '''given a list of dag nodes, return a list containing only those nodes parented to the
     scene root'''
+    nodeList = list(nodeList)
+    if not nodeList:
+        return []
+    #one query for all dag nodes, a root node's full path has a single |
+    rootPaths = set(path for path in cmds.ls(nodeList,long=True,type='dagNode') or [] if path.count('|') == 1)
     rootNodes = []
     for node in nodeList:
-        par = cmds.listRelatives(node,p=True)
-        if not par:
-            nodeTypes = cmds.nodeType(node,i=True)
-            if 'dagNode' in nodeTypes:
-                rootNodes.append(node)
-    return rootNodes
\ No newline at end of file
+        shortName = node.rsplit('|',1)[-1]
+        if '|'+shortName in rootPaths and (node == shortName or node == '|'+shortName):
+            rootNodes.append(node)
+    return rootNodes
@@ -1,8 +1,8 @@
 '''helpers for working with maya deformers'''
 import os
 import xml.etree.ElementTree
-import maya.cmds as cmds
-import maya.mel as mel
+from mpyr.lib.scene import cmds
+from mpyr.lib.scene import mel
 
 def saveSkinWeights(mesh,path,force=False):
     '''wrapper for deformerWeights command, however will attempt to
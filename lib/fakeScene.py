@@ -0,0 +1,1706 @@
+'''In-memory stand-in for maya.cmds, for building and profiling rigs without Maya.
+
+FakeScene models the DAG, node types, attributes, connections, object sets and the
+selection in plain python. The maya.cmds commands mpyr uses are methods with the same
+names and flags, so a FakeScene can be used as the lib.scene backend. FakeBackend does
+that for the length of a with block:
+
+    with mpFakeScene.FakeBackend() as scene:
+        biped.Rig().create()
+        print(len(scene.ls()))
+
+World matrices are computed from translate, rotate, scale and jointOrient like Maya
+does (pivots and shear are ignored). Constraints and ik handles are made with the nodes
+and connections Maya makes. A constraint is solved when it is made and again when one
+of its targets is edited directly (xform, move or setAttr), but the scene is never
+evaluated otherwise: moving a target's parent, ik solvers, deformers and utility nodes
+have no effect. Flags mpyr doesn't use are ignored.
+
+Missing nodes raise ValueError and refused edits (locked or connected attributes,
+bad parenting) raise RuntimeError, like the Maya commands.
+'''
+import datetime
+import fnmatch
+import re
+import shlex
+
+import mpyr.lib.rigmath as rigmath
+import mpyr.lib.scene as mpScene
+try:
+    _stringTypes=(basestring,)
+except NameError:
+    _stringTypes=(str,)
+
+#node type: parent type. Types not listed are dependency nodes with no parent type.
+NODETYPES={
+    'dagNode':None,
+    'transform':'dagNode',
+    'joint':'transform',
+    'ikHandle':'transform',
+    'ikEffector':'transform',
+    'constraint':'transform',
+    'parentConstraint':'constraint',
+    'pointConstraint':'constraint',
+    'orientConstraint':'constraint',
+    'aimConstraint':'constraint',
+    'scaleConstraint':'constraint',
+    'poleVectorConstraint':'pointConstraint',
+    'shape':'dagNode',
+    'camera':'shape',
+    'locator':'shape',
+    'clusterHandle':'shape',
+    'geometryShape':'shape',
+    'deformableShape':'geometryShape',
+    'controlPoint':'deformableShape',
+    'curveShape':'controlPoint',
+    'nurbsCurve':'curveShape',
+    'surfaceShape':'controlPoint',
+    'mesh':'surfaceShape',
+    'nurbsSurface':'surfaceShape',
+    'geometryFilter':None,
+    'cluster':'geometryFilter',
+    'skinCluster':'geometryFilter',
+    'objectSet':None,
+    'shadingEngine':'objectSet',
+    }
+
+#rotateOrder enum values
+ROTATEORDERS=('xyz','yzx','zxy','xzy','yxz','zyx')
+
+#attributes that move a transform, editing them re-solves constraints targeting the node
+XFORMATTRS=frozenset((
+    'translate','translateX','translateY','translateZ',
+    'rotate','rotateX','rotateY','rotateZ',
+    'scale','scaleX','scaleY','scaleZ',
+    'jointOrient','jointOrientX','jointOrientY','jointOrientZ',
+    'rotateOrder'))
+
+#attributes whose value is computed from the hierarchy
+MATRIXATTRS=frozenset(('worldMatrix','matrix','parentMatrix','worldInverseMatrix','parentInverseMatrix'))
+
+class FakeAttr(object):
+    '''Description of a static or dynamic attribute'''
+    __slots__=('name','short','type','default','children','parent','multi','keyable','min','max','enum')
+
+    def __init__(self,name,short=None,attrType='double',default=0.0,parent=None,multi=False,keyable=False):
+        object.__init__(self)
+        self.name=name
+        self.short=short
+        self.type=attrType
+        self.default=default
+        self.children=[]
+        self.parent=parent
+        self.multi=multi
+        self.keyable=keyable
+        self.min=None
+        self.max=None
+        self.enum=None
+
+def _spec(name,short,attrType='double',default=0.0,children=None,multi=False,keyable=False):
+    '''return a static attribute spec tuple, children are (name,short) pairs'''
+    return (name,short,attrType,default,children,multi,keyable)
+
+def _xyz(name,short,attrType,childType,default,suffixes=('X','Y','Z'),keyable=False):
+    '''spec of a three child compound such as translate'''
+    children=[(name+suffix,short+suffix.lower(),childType,default) for suffix in suffixes]
+    return _spec(name,short,attrType,None,children,keyable=keyable)
+
+#static attributes per node type, inherited by child types
+_ATTRSPECS={
+    'dagNode':[
+        _spec('visibility','v','bool',True,keyable=True),
+        _spec('template','tmp','bool',False),
+        _spec('lodVisibility','lodv','bool',True),
+        _spec('intermediateObject','io','bool',False),
+        _spec('overrideEnabled','ove','bool',False),
+        _spec('overrideDisplayType','ovdt','enum',0),
+        _spec('overrideVisibility','ovv','bool',True),
+        _spec('overrideColor','ovc','byte',0),
+        _spec('overrideRGBColors','ovrgbf','bool',False),
+        _xyz('overrideColorRGB','ovrgb','float3','float',0.0,suffixes=('R','G','B')),
+        _spec('instObjGroups','iog','compound',None,multi=True),
+        _spec('message','msg','message',None),
+        _spec('worldMatrix','wm','matrix',None,multi=True),
+        _spec('matrix','m','matrix',None),
+        _spec('parentMatrix','pm','matrix',None,multi=True),
+        _spec('worldInverseMatrix','wim','matrix',None,multi=True),
+        _spec('parentInverseMatrix','pim','matrix',None,multi=True),
+        ],
+    'transform':[
+        _xyz('translate','t','double3','doubleLinear',0.0,keyable=True),
+        _xyz('rotate','r','double3','doubleAngle',0.0,keyable=True),
+        _xyz('scale','s','double3','double',1.0,keyable=True),
+        _spec('shear','sh','double3',None),
+        _spec('rotateOrder','ro','enum',0),
+        _spec('inheritsTransform','it','bool',True),
+        _xyz('rotatePivot','rp','double3','doubleLinear',0.0),
+        _xyz('scalePivot','sp','double3','doubleLinear',0.0),
+        _xyz('rotateAxis','ra','double3','doubleAngle',0.0),
+        _spec('displayHandle','dh','bool',False),
+        _spec('displayLocalAxis','dla','bool',False),
+        ],
+    'joint':[
+        _xyz('jointOrient','jo','double3','doubleAngle',0.0),
+        _spec('radius','radi','double',1.0),
+        _spec('segmentScaleCompensate','ssc','bool',True),
+        _spec('drawStyle','ds','enum',0),
+        _xyz('preferredAngle','pa','double3','doubleAngle',0.0),
+        _spec('minRotLimit','mnrl','double3',None),
+        _spec('maxRotLimit','mxrl','double3',None),
+        _spec('inverseScale','is','double3',None),
+        ],
+    'ikHandle':[
+        _spec('startJoint','hsj','message',None),
+        _spec('endEffector','hee','message',None),
+        _spec('ikBlend','ikb','double',1.0,keyable=True),
+        _xyz('poleVector','pv','double3','double',0.0,keyable=True),
+        _spec('twist','twi','doubleAngle',0.0,keyable=True),
+        _spec('ikSolver','hsv','message',None),
+        _spec('stickiness','stic','enum',0),
+        _spec('snapEnable','snen','bool',True),
+        ],
+    'ikEffector':[
+        _spec('handlePath','hp','message',None,multi=True),
+        ],
+    'constraint':[
+        _spec('target','tg','compound',None,multi=True),
+        _spec('targetTranslate','tt','double3',None),
+        _spec('targetRotate','tr','double3',None),
+        _spec('targetScale','ts','double3',None),
+        _spec('targetWeight','tw','double',1.0),
+        _spec('targetParentMatrix','tpm','matrix',None),
+        _xyz('constraintTranslate','ct','double3','doubleLinear',0.0),
+        _xyz('constraintRotate','cr','double3','doubleAngle',0.0),
+        _xyz('constraintScale','cs','double3','double',1.0),
+        _spec('interpType','int','enum',1),
+        _spec('worldUpType','wut','enum',0),
+        _xyz('worldUpVector','wu','double3','double',0.0),
+        _xyz('aimVector','a','double3','double',0.0),
+        _xyz('upVector','u','double3','double',0.0),
+        _xyz('offset','o','double3','double',0.0),
+        ],
+    'curveShape':[
+        _spec('create','cr','nurbsCurve',None),
+        _spec('local','l','nurbsCurve',None),
+        _spec('worldSpace','ws','nurbsCurve',None,multi=True),
+        _spec('spans','spn','long',1),
+        _spec('degree','d','long',1),
+        ],
+    'nurbsSurface':[
+        _spec('create','cr','nurbsSurface',None),
+        _spec('local','l','nurbsSurface',None),
+        _spec('worldSpace','ws','nurbsSurface',None,multi=True),
+        ],
+    'mesh':[
+        _spec('inMesh','i','mesh',None),
+        _spec('outMesh','o','mesh',None),
+        _spec('worldMesh','w','mesh',None,multi=True),
+        ],
+    'locator':[
+        _xyz('localPosition','lp','double3','doubleLinear',0.0),
+        _xyz('localScale','los','double3','doubleLinear',1.0),
+        ],
+    }
+
+def _buildAttrs(specs):
+    attrs={}
+    for name,short,attrType,default,children,multi,keyable in specs:
+        attr=attrs[name]=FakeAttr(name,short,attrType,default,multi=multi,keyable=keyable)
+        for childName,childShort,childType,childDefault in children or ():
+            attrs[childName]=FakeAttr(childName,childShort,childType,childDefault,parent=name,keyable=keyable)
+            attr.children.append(childName)
+    return attrs
+
+_TYPEATTRS=dict((nodeType,_buildAttrs(specs)) for nodeType,specs in _ATTRSPECS.items())
+
+_lineages={}
+_mergedAttrs={}
+_mergedAliases={}
+
+def getLineage(nodeType):
+    '''return a tuple of the node type and the types it inherits from, closest first'''
+    lineage=_lineages.get(nodeType)
+    if lineage is None:
+        lineage=[]
+        current=nodeType
+        while current:
+            lineage.append(current)
+            current=NODETYPES.get(current)
+        lineage=_lineages[nodeType]=tuple(lineage)
+    return lineage
+
+def isType(nodeType,baseType):
+    '''return True if nodeType is baseType or inherits from it'''
+    return baseType in getLineage(nodeType)
+
+def _typeAttrs(nodeType):
+    '''return (attrs,aliases) dicts of the static attributes of a node type'''
+    attrs=_mergedAttrs.get(nodeType)
+    if attrs is None:
+        attrs={}
+        for baseType in reversed(getLineage(nodeType)):
+            attrs.update(_TYPEATTRS.get(baseType,{}))
+        aliases=dict((attr.short,name) for name,attr in attrs.items() if attr.short)
+        _mergedAttrs[nodeType]=attrs
+        _mergedAliases[nodeType]=aliases
+    return attrs,_mergedAliases[nodeType]
+
+def _flag(kwargs,names,default=None):
+    '''return the value of the first of the long and short flag names given'''
+    for name in names:
+        if name in kwargs:
+            return kwargs[name]
+    return default
+
+def _flatten(args):
+    '''flatten command arguments that may be names or lists of names into one list'''
+    items=[]
+    for arg in args:
+        if isinstance(arg,(list,tuple)):
+            items.extend(_flatten(arg))
+        elif arg is not None:
+            items.append(arg)
+    return items
+
+def _splitPlug(plug):
+    '''split 'node.attr' into (node,attr), attr is '' for a node name'''
+    nodeName,dot,attr=plug.strip().partition('.')
+    return nodeName,attr.strip()
+
+def _baseAttr(attr):
+    '''return the top level attribute name of an attribute path, without index'''
+    return attr.split('.',1)[0].split('[',1)[0]
+
+def _lastAttr(attr):
+    '''return the last attribute name of an attribute path, without index'''
+    return attr.rsplit('.',1)[-1].split('[',1)[0]
+
+def _eulerMatrix(rotation,order='xyz'):
+    '''return a rigmath Transform of x,y,z degrees in the given order'''
+    matrix=rigmath.Transform()
+    if rotation[0] or rotation[1] or rotation[2]:
+        matrix.setFromEuler(rotation[0],rotation[1],rotation[2],order=order)
+    return matrix
+
+def _rotationPart(matrix):
+    '''return (rotation Transform,scale list) of a matrix, the rotation has no scale or
+    translation'''
+    a=matrix.get()
+    scale=[]
+    rows=[]
+    for idx in (0,4,8):
+        row=a[idx:idx+3]
+        length=(row[0]*row[0]+row[1]*row[1]+row[2]*row[2])**0.5 or 1.0
+        scale.append(length)
+        rows.extend([row[0]/length,row[1]/length,row[2]/length,0.0])
+    if matrix.det()<0:
+        scale[0]=-scale[0]
+        rows[0:3]=[-x for x in rows[0:3]]
+    rows.extend([0.0,0.0,0.0,1.0])
+    return rigmath.Transform(rows),scale
+
+def _transposed(matrix):
+    result=matrix.copy()
+    result.transpose()
+    return result
+
+def _inverted(matrix):
+    result=matrix.copy()
+    result.invert()
+    return result
+
+def _axes(skip):
+    '''return the set of axis names from a skip flag ('x', ['x','y'] or 'none')'''
+    if not skip or skip=='none':
+        return set()
+    if isinstance(skip,_stringTypes):
+        return set([skip])
+    return set(skip)
+
+class FakeNode(object):
+    '''One node of a FakeScene. parents is None for dependency nodes, a list for DAG
+    nodes (empty at the world, more than one when instanced).'''
+    __slots__=('name','type','parents','children','values','attrs','userAttrs','aliases',
+        'locked','unkeyable','inputs','outputs','data','deleted')
+
+    def __init__(self,name,nodeType):
+        object.__init__(self)
+        self.name=name
+        self.type=nodeType
+        self.parents=[] if isType(nodeType,'dagNode') else None
+        self.children=[]
+        self.values={}
+        self.attrs={} #dynamic attributes
+        self.userAttrs=[] #dynamic attribute names in order
+        self.aliases={} #dynamic short names
+        self.locked=set()
+        self.unkeyable=set()
+        self.inputs={} #destination attr: (source node,source attr)
+        self.outputs=[] #(source attr,destination node,destination attr)
+        self.data={}
+        self.deleted=False
+
+    def __repr__(self):
+        return '%s(%s,%s)'%(self.__class__.__name__,self.name,self.type)
+
+    def isDag(self):
+        return self.parents is not None
+
+    def isTransform(self):
+        return isType(self.type,'transform')
+
+    def isLenient(self):
+        '''Dependency nodes and constraints accept any attribute, like the many utility
+        node attributes mpyr connects without this module knowing about them'''
+        return self.parents is None or isType(self.type,'constraint')
+
+class FakeMel(object):
+    '''Stand-in for maya.mel, evaluates the few mel procedures mpyr calls'''
+    def __init__(self,scene):
+        object.__init__(self)
+        self.scene=scene
+
+    def eval(self,command):
+        match=re.match(r'\s*findRelatedSkinCluster\s*\(?\s*"([^"]*)"\s*\)?\s*;?\s*$',command)
+        if match:
+            return self.scene._findSkinCluster(match.group(1))
+        raise RuntimeError('mel command not supported by the fake scene: %s'%command)
+
+class FakeScene(object):
+    '''An in-memory scene with the maya.cmds commands mpyr uses as methods.
+    Node names are unique in the whole scene, a clash gets a number like Maya's
+    default names.'''
+    def __init__(self):
+        object.__init__(self)
+        self._reset()
+
+    def __repr__(self):
+        return '<%s %s nodes>'%(self.__class__.__name__,len(self.nodes))
+
+    def _reset(self):
+        self.nodes={}
+        self.selection=[]
+        self.currentFrame=1.0
+        self.keyframes=[]
+        self._counters={}
+        self._constraintsByTarget={}
+        for camera in ('persp','top','front','side'):
+            self._newNode('camera',camera+'Shape',self._newNode('transform',camera))
+        for name,nodeType in (('time1','time'),('initialShadingGroup','shadingEngine'),
+                ('defaultLightSet','objectSet'),('lightLinker1','lightLinker')):
+            self._newNode(nodeType,name)
+
+    #-----------------------------------------------------------------------------
+    #nodes and names
+    def _uniqueName(self,name):
+        if name not in self.nodes:
+            return name
+        base=name.rstrip('0123456789')
+        idx=self._counters.get(base,1)
+        while base+str(idx) in self.nodes:
+            idx+=1
+        self._counters[base]=idx+1
+        return base+str(idx)
+
+    def _newNode(self,nodeType,name=None,parent=None):
+        node=FakeNode(self._uniqueName(name or nodeType+'1'),nodeType)
+        self.nodes[node.name]=node
+        if parent is not None:
+            node.parents.append(parent)
+            parent.children.append(node)
+        return node
+
+    def _find(self,name):
+        '''return (node,parent) for a node name or DAG path. parent is the node the path
+        goes through when a path is given, else None. Returns (None,None) if not found.'''
+        if '|' not in name:
+            return self.nodes.get(name.lstrip(':')),None
+        parts=[part.lstrip(':') for part in name.split('|') if part]
+        node=self.nodes.get(parts[-1]) if parts else None
+        if node is None or not node.isDag():
+            return None,None
+        current=node
+        parent=None
+        for part in reversed(parts[:-1]):
+            above=self.nodes.get(part)
+            if above is None or above not in current.parents:
+                return None,None
+            if parent is None:
+                parent=above
+            current=above
+        if name.startswith('|') and current.parents:
+            return None,None
+        return node,parent
+
+    def _get(self,name):
+        '''return the node called name, raise ValueError if it doesn't exist'''
+        node,parent=self._find(name) if isinstance(name,_stringTypes) else (None,None)
+        if node is None:
+            raise ValueError('No object matches name: %s'%name)
+        return node
+
+    def _getMany(self,args,useSelection=True):
+        '''return the nodes of names given as arguments, or the selection if none'''
+        names=_flatten(args)
+        if not names and useSelection:
+            return list(self.selection)
+        return [self._get(name) for name in names]
+
+    def _path(self,node,parent=None):
+        '''return the full DAG path of a node, through parent if given'''
+        if not node.isDag():
+            return node.name
+        parts=[node.name]
+        current=parent or (node.parents[0] if node.parents else None)
+        while current is not None:
+            parts.append(current.name)
+            current=current.parents[0] if current.parents else None
+        return '|'+'|'.join(reversed(parts))
+
+    def _isAncestor(self,node,other):
+        '''return True if node is above other in the DAG'''
+        stack=list(other.parents or ())
+        while stack:
+            current=stack.pop()
+            if current is node:
+                return True
+            stack.extend(current.parents)
+        return False
+
+    def _descendants(self,node,parentPath=None):
+        '''yield (node,path) for everything below node, depth first in child order'''
+        path=parentPath or self._path(node)
+        for child in node.children:
+            childPath=path+'|'+child.name
+            yield child,childPath
+            for item in self._descendants(child,childPath):
+                yield item
+
+    #-----------------------------------------------------------------------------
+    #attributes
+    def _attrName(self,node,attr):
+        '''return an attribute path with every name in its long form'''
+        attrs,aliases=_typeAttrs(node.type)
+        if '.' not in attr and '[' not in attr:
+            return node.aliases.get(attr) or aliases.get(attr,attr)
+        parts=[]
+        for part in attr.split('.'):
+            name,bracket,index=part.partition('[')
+            name=node.aliases.get(name) or aliases.get(name,name)
+            parts.append(name+bracket+index)
+        return '.'.join(parts)
+
+    def _attrSpec(self,node,attr):
+        '''return the FakeAttr of a long attribute name, or None'''
+        spec=node.attrs.get(attr)
+        if spec is None:
+            spec=_typeAttrs(node.type)[0].get(attr)
+        return spec
+
+    def _hasAttr(self,node,attr):
+        base=_baseAttr(attr)
+        if self._attrSpec(node,base) is not None or attr in node.values or attr in node.inputs:
+            return True
+        if base=='cv' and isType(node.type,'curveShape'):
+            return True
+        return False
+
+    def _plug(self,plug,error=ValueError,create=False):
+        '''return (node,long attribute path) of a plug. Missing nodes raise error, so do
+        attributes missing on DAG nodes unless create is True. Like Maya, an attribute
+        missing on a transform is looked up on its shapes.'''
+        nodeName,attr=_splitPlug(plug)
+        node,parent=self._find(nodeName)
+        if node is None:
+            raise error('No object matches name: %s'%plug)
+        longAttr=self._attrName(node,attr)
+        if create or node.isLenient() or self._hasAttr(node,longAttr):
+            return node,longAttr
+        if node.isTransform():
+            for shape in self._shapes(node):
+                shapeAttr=self._attrName(shape,attr)
+                if self._hasAttr(shape,shapeAttr):
+                    return shape,shapeAttr
+        raise error('No object matches name: %s'%plug)
+
+    def _value(self,node,attr):
+        '''return the value of an attribute, compounds as a list of one tuple'''
+        spec=self._attrSpec(node,attr)
+        if spec is not None and spec.children:
+            return [tuple(self._value(node,child) for child in spec.children)]
+        if attr in node.values:
+            return node.values[attr]
+        base=_baseAttr(attr)
+        if base in MATRIXATTRS and node.isDag():
+            return self._matrixAttr(node,base).get()
+        if base=='cv':
+            return [tuple(self._cvs(node)[int(attr[3:-1])])]
+        if spec is not None:
+            return spec.default
+        return 0.0
+
+    def _setValue(self,node,attr,values):
+        spec=self._attrSpec(node,attr)
+        if spec is not None and spec.children and len(values)==len(spec.children):
+            for child,value in zip(spec.children,values):
+                node.values[child]=value
+        elif len(values)==1:
+            node.values[attr]=values[0]
+        else:
+            node.values[attr]=list(values)
+
+    def _isLocked(self,node,attr):
+        if attr in node.locked:
+            return True
+        spec=self._attrSpec(node,attr)
+        if spec is None:
+            return False
+        if spec.parent and spec.parent in node.locked:
+            return True
+        return any(child in node.locked for child in spec.children)
+
+    def _isConnected(self,node,attr):
+        if attr in node.inputs:
+            return True
+        spec=self._attrSpec(node,attr)
+        if spec is None:
+            return False
+        if spec.parent and spec.parent in node.inputs:
+            return True
+        return any(child in node.inputs for child in spec.children)
+
+    def _connect(self,srcNode,srcAttr,dstNode,dstAttr):
+        dstNode.inputs[dstAttr]=(srcNode,srcAttr)
+        srcNode.outputs.append((srcAttr,dstNode,dstAttr))
+
+    def _disconnect(self,dstNode,dstAttr):
+        srcNode,srcAttr=dstNode.inputs.pop(dstAttr)
+        srcNode.outputs.remove((srcAttr,dstNode,dstAttr))
+
+    def _plugMatches(self,node,stored,attr):
+        '''return True if a connection on the stored attribute is a connection of attr:
+        the same attribute, an element or child of it, or its compound parent'''
+        if stored==attr or stored.startswith(attr+'[') or stored.startswith(attr+'.'):
+            return True
+        spec=self._attrSpec(node,attr)
+        return spec is not None and spec.parent==stored
+
+    #-----------------------------------------------------------------------------
+    #transforms
+    def _localMatrix(self,node):
+        '''return the local matrix of a transform: scale*rotate(*jointOrient)*translate'''
+        if not node.isTransform():
+            return rigmath.Transform()
+        get=node.values.get
+        order=ROTATEORDERS[int(get('rotateOrder',0))]
+        matrix=_eulerMatrix((get('rotateX',0.0),get('rotateY',0.0),get('rotateZ',0.0)),order)
+        if node.type=='joint':
+            orient=(get('jointOrientX',0.0),get('jointOrientY',0.0),get('jointOrientZ',0.0))
+            if orient[0] or orient[1] or orient[2]:
+                matrix=matrix*_eulerMatrix(orient)
+        scale=(get('scaleX',1.0),get('scaleY',1.0),get('scaleZ',1.0))
+        if scale!=(1.0,1.0,1.0):
+            matrix=rigmath.Transform([scale[0],0,0,0,0,scale[1],0,0,0,0,scale[2],0,0,0,0,1])*matrix
+        matrix[12]=get('translateX',0.0)
+        matrix[13]=get('translateY',0.0)
+        matrix[14]=get('translateZ',0.0)
+        return matrix
+
+    def _parentMatrix(self,node,parent=None):
+        '''return the world matrix of the parent of node, through parent if given'''
+        if node.isTransform() and not node.values.get('inheritsTransform',True):
+            return rigmath.Transform()
+        parent=parent or (node.parents[0] if node.parents else None)
+        if parent is None:
+            return rigmath.Transform()
+        return self._worldMatrix(parent)
+
+    def _worldMatrix(self,node,parent=None):
+        '''return the world matrix of a DAG node as a rigmath Transform'''
+        if not node.isDag():
+            raise RuntimeError('%s is not a DAG node'%node.name)
+        matrix=self._localMatrix(node)
+        if not node.parents:
+            return matrix
+        parentMatrix=self._parentMatrix(node,parent)
+        return matrix*parentMatrix
+
+    def _matrixAttr(self,node,attr):
+        if attr=='matrix':
+            return self._localMatrix(node)
+        if attr=='parentMatrix':
+            return self._parentMatrix(node)
+        if attr=='parentInverseMatrix':
+            return _inverted(self._parentMatrix(node))
+        if attr=='worldInverseMatrix':
+            return _inverted(self._worldMatrix(node))
+        return self._worldMatrix(node)
+
+    def _setLocalMatrix(self,node,matrix,translate=True,rotate=True,scale=True,keepRotate=False):
+        '''set translate, rotate and scale of a transform from a local matrix.
+        Joints keep their jointOrient, unless keepRotate is True, then their rotate is
+        kept and the jointOrient changed (what parenting a joint does).
+        translate and rotate can be sets of axes to change instead of True.'''
+        values=node.values
+        rotation,scales=_rotationPart(matrix)
+        if translate:
+            for idx,axis in enumerate('xyz'):
+                if translate is True or axis in translate:
+                    values['translate'+axis.upper()]=matrix[12+idx]
+        if scale:
+            for idx,axis in enumerate('XYZ'):
+                values['scale'+axis]=scales[idx]
+        if not rotate:
+            return
+        order=ROTATEORDERS[int(values.get('rotateOrder',0))]
+        current=[values.get('rotateX',0.0),values.get('rotateY',0.0),values.get('rotateZ',0.0)]
+        if node.type=='joint':
+            if keepRotate:
+                orient=_transposed(_eulerMatrix(current,order))*rotation
+                for axis,angle in zip('XYZ',orient.getEuler('xyz')):
+                    values['jointOrient'+axis]=angle
+                return
+            get=values.get
+            orient=_eulerMatrix((get('jointOrientX',0.0),get('jointOrientY',0.0),get('jointOrientZ',0.0)))
+            rotation=rotation*_transposed(orient)
+        for axis,angle in zip('xyz',rotation.getEuler(order,previous=current)):
+            if rotate is True or axis in rotate:
+                values['rotate'+axis.upper()]=angle
+
+    def _setWorldMatrix(self,node,matrix,parent=None,**kwargs):
+        local=matrix*_inverted(self._parentMatrix(node,parent))
+        self._setLocalMatrix(node,local,**kwargs)
+
+    def _moved(self,node):
+        '''re-solve the constraints targeting a node that was just edited'''
+        for cns in self._constraintsByTarget.get(node,()):
+            if not cns.deleted:
+                self._solveConstraint(cns)
+
+    def _cvs(self,node):
+        '''return the control points list of a curve or surface shape (or its transform)'''
+        if node.isTransform():
+            for child in node.children:
+                if 'cvs' in child.data:
+                    return child.data['cvs']
+            return []
+        return node.data.setdefault('cvs',[])
+
+    def _shapes(self,node):
+        if node.isDag() and not node.isTransform():
+            return [node]
+        return [child for child in node.children if not child.isTransform()]
+
+    #-----------------------------------------------------------------------------
+    #constraints
+    def _constrain(self,cnsType,args,kwargs,inputs,outputs):
+        '''make (or add targets to) a constraint. inputs are the target attributes that
+        are connected, outputs are (constraint attr,driven attr) pairs.'''
+        nodes=self._getMany(args)
+        if len(nodes)<2:
+            raise RuntimeError('%s: a target and an object to constrain are needed'%cnsType)
+        targets,driven=nodes[:-1],nodes[-1]
+        skipTranslate=_axes(_flag(kwargs,('st','skipTranslate')))
+        skipRotate=_axes(_flag(kwargs,('sr','skipRotate')))
+        #like Maya, constraining with the same type again adds targets to the constraint
+        cns=None
+        for child in driven.children:
+            if child.type==cnsType and 'constraint' in child.data:
+                cns=child
+        if cns is None:
+            name=_flag(kwargs,('n','name')) or '%s_%s1'%(driven.name,cnsType)
+            cns=self._newNode(cnsType,name,driven)
+            cns.data['constraint']={'driven':driven,'targets':[],'offsets':[],
+                'translate':set('xyz')-skipTranslate,'rotate':set('xyz')-skipRotate}
+            for cnsAttr,drivenAttr in outputs:
+                axis=drivenAttr[-1].lower()
+                if drivenAttr.startswith(('translate','poleVector')) and axis in skipTranslate:
+                    continue
+                if drivenAttr.startswith('rotate') and axis in skipRotate:
+                    continue
+                if drivenAttr not in driven.inputs:
+                    self._connect(cns,cnsAttr,driven,drivenAttr)
+        spec=cns.data['constraint']
+        spec['maintainOffset']=bool(_flag(kwargs,('mo','maintainOffset'),False))
+        if cnsType=='aimConstraint':
+            spec['aimVector']=list(_flag(kwargs,('aim','aimVector'),(1,0,0)))
+            spec['upVector']=list(_flag(kwargs,('u','upVector'),(0,1,0)))
+            spec['worldUpType']=_flag(kwargs,('wut','worldUpType'),'vector')
+            spec['worldUpVector']=list(_flag(kwargs,('wu','worldUpVector'),(0,1,0)))
+            upObject=_flag(kwargs,('wuo','worldUpObject'))
+            spec['worldUpObject']=self._get(upObject) if upObject else None
+            if spec['worldUpObject'] is not None:
+                self._constraintsByTarget.setdefault(spec['worldUpObject'],[]).append(cns)
+        for target in targets:
+            idx=len(spec['targets'])
+            for attr in inputs:
+                self._connect(target,attr,cns,'target[%d].%s'%(idx,'target'+attr[0].upper()+attr[1:]))
+            weight=FakeAttr('%sW%d'%(target.name,idx),'w%d'%idx,'double',1.0,keyable=True)
+            cns.attrs[weight.name]=weight
+            cns.userAttrs.append(weight.name)
+            cns.aliases[weight.short]=weight.name
+            cns.values[weight.name]=1.0
+            self._connect(cns,weight.name,cns,'target[%d].targetWeight'%idx)
+            spec['targets'].append(target)
+            spec['offsets'].append(None)
+            self._constraintsByTarget.setdefault(target,[]).append(cns)
+        drivenWorld=self._worldMatrix(driven)
+        for idx,target in enumerate(spec['targets']):
+            if spec['offsets'][idx] is None:
+                spec['offsets'][idx]=self._constraintOffset(cns,target,drivenWorld)
+        self._solveConstraint(cns)
+        self.selection=[driven]
+        return [cns.name]
+
+    def _constraintOffset(self,cns,target,drivenWorld):
+        '''return the offset kept between a target and the driven node: a matrix for
+        parent and orient constraints, a translation for point constraints'''
+        spec=cns.data['constraint']
+        if not spec['maintainOffset'] or cns.type in ('scaleConstraint','poleVectorConstraint'):
+            return None
+        targetWorld=self._worldMatrix(target)
+        if cns.type=='pointConstraint':
+            return [drivenWorld[idx]-targetWorld[idx] for idx in (12,13,14)]
+        if cns.type=='aimConstraint':
+            return _rotationPart(drivenWorld)[0]*_transposed(self._aimRotation(cns,drivenWorld))
+        if cns.type=='orientConstraint':
+            return _rotationPart(drivenWorld)[0]*_transposed(_rotationPart(targetWorld)[0])
+        return drivenWorld*_inverted(targetWorld)
+
+    def _aimRotation(self,cns,drivenWorld):
+        '''return the rotation that points the aim vector of an aim constraint at its
+        target and the up vector at the world up'''
+        spec=cns.data['constraint']
+        position=drivenWorld.getTranslation()
+        aim=self._worldMatrix(spec['targets'][0]).getTranslation()-position
+        upType=spec['worldUpType']
+        if upType=='object' and spec['worldUpObject'] is not None:
+            up=self._worldMatrix(spec['worldUpObject']).getTranslation()-position
+        elif upType=='objectrotation' and spec['worldUpObject'] is not None:
+            up=rigmath.Vector(spec['worldUpVector'])*_rotationPart(self._worldMatrix(spec['worldUpObject']))[0]
+        else:
+            up=rigmath.Vector(spec['worldUpVector'])
+        frames=[]
+        for aimAxis,upAxis in ((aim,up),(rigmath.Vector(spec['aimVector']),rigmath.Vector(spec['upVector']))):
+            aimAxis.normalize()
+            upAxis=upAxis-aimAxis*upAxis.dot(aimAxis)
+            upAxis.normalize()
+            side=aimAxis.cross(upAxis)
+            frames.append(rigmath.Transform(aimAxis.get()+[0]+upAxis.get()+[0]+side.get()+[0,0,0,0,1]))
+        #the local frame is orthonormal so its inverse is its transpose
+        return _transposed(frames[1])*frames[0]
+
+    def _solveConstraint(self,cns):
+        '''move the driven node of a constraint to its targets'''
+        spec=cns.data['constraint']
+        driven=spec['driven']
+        targets=[(target,offset) for target,offset in zip(spec['targets'],spec['offsets']) if not target.deleted]
+        if driven.deleted or not targets or cns.type in ('scaleConstraint','poleVectorConstraint'):
+            return
+        drivenWorld=self._worldMatrix(driven)
+        matrix=drivenWorld.copy()
+        translate=spec['translate'] if cns.type in ('parentConstraint','pointConstraint') else None
+        rotate=spec['rotate'] if cns.type in ('parentConstraint','orientConstraint','aimConstraint') else None
+        if translate:
+            position=[0.0,0.0,0.0]
+            for target,offset in targets:
+                world=self._worldMatrix(target)
+                if cns.type=='parentConstraint' and offset is not None:
+                    world=offset*world
+                for idx in range(3):
+                    position[idx]+=world[12+idx]+(offset[idx] if cns.type=='pointConstraint' and offset else 0.0)
+            matrix.setTranslation([value/len(targets) for value in position])
+        if rotate:
+            target,offset=targets[0]
+            if cns.type=='aimConstraint':
+                rotation=self._aimRotation(cns,drivenWorld)
+            else:
+                rotation=_rotationPart(self._worldMatrix(target))[0]
+            if offset is not None:
+                rotation=_rotationPart(offset)[0]*rotation
+            scale=_rotationPart(drivenWorld)[1]
+            rows=rotation.get()
+            for row in range(3):
+                for col in range(3):
+                    matrix[row*4+col]=rows[row*4+col]*scale[row]
+        self._setWorldMatrix(driven,matrix,translate=translate or False,rotate=rotate or False,scale=False)
+
+    #-----------------------------------------------------------------------------
+    #node creation commands
+    def createNode(self,nodeType,**kwargs):
+        name=_flag(kwargs,('n','name'))
+        if _flag(kwargs,('s','shared')) and name in self.nodes:
+            return name
+        parentName=_flag(kwargs,('p','parent'))
+        parent=self._get(parentName) if parentName else None
+        if parent is None and isType(nodeType,'shape'):
+            parent=self._newNode('transform','transform1')
+        node=self._newNode(nodeType,name,parent)
+        if not _flag(kwargs,('ss','skipSelect')):
+            self.selection=[node]
+        return node.name
+
+    def group(self,*args,**kwargs):
+        parentName=_flag(kwargs,('p','parent'))
+        parent=self._get(parentName) if parentName else None
+        members=[] if _flag(kwargs,('em','empty')) else self._getMany(args)
+        group=self._newNode('transform',_flag(kwargs,('n','name')) or 'group1',parent)
+        for member in members:
+            self.parent(member.name,group.name)
+        self.selection=[group]
+        return group.name
+
+    def joint(self,*args,**kwargs):
+        parent=self.selection[-1] if self.selection and self.selection[-1].type=='joint' else None
+        node=self._newNode('joint',_flag(kwargs,('n','name')) or 'joint1',parent)
+        position=_flag(kwargs,('p','position'))
+        if position:
+            matrix=self._worldMatrix(node)
+            matrix.setTranslation([float(value) for value in position])
+            self._setWorldMatrix(node,matrix,rotate=False,scale=False)
+        if _flag(kwargs,('rad','radius')) is not None:
+            node.values['radius']=_flag(kwargs,('rad','radius'))
+        self.selection=[node]
+        return node.name
+
+    def spaceLocator(self,*args,**kwargs):
+        name=_flag(kwargs,('n','name')) or 'locator1'
+        node=self._newNode('transform',name)
+        self._newNode('locator',node.name.replace('locator','locatorShape') if name=='locator1' else node.name+'Shape',node)
+        position=_flag(kwargs,('p','position'))
+        if position:
+            node.values.update(zip(('translateX','translateY','translateZ'),position))
+        self.selection=[node]
+        return [node.name]
+
+    def curve(self,*args,**kwargs):
+        points=[list(map(float,point)) for point in _flag(kwargs,('p','point'),())]
+        node=self._newNode('transform',_flag(kwargs,('n','name')) or 'curve1')
+        shape=self._newNode('nurbsCurve',node.name+'Shape' if _flag(kwargs,('n','name')) else node.name.replace('curve','curveShape'),node)
+        shape.data['cvs']=points
+        shape.values['degree']=_flag(kwargs,('d','degree'),3)
+        shape.values['spans']=max(1,len(points)-shape.values['degree'])
+        self.selection=[node]
+        return node.name
+
+    def extrude(self,*args,**kwargs):
+        node=self._newNode('transform',_flag(kwargs,('n','name')) or 'extrudedSurface1')
+        self._newNode('nurbsSurface',node.name.replace('extrudedSurface','extrudedSurfaceShape'),node)
+        self.selection=[node]
+        result=[node.name]
+        if _flag(kwargs,('ch','constructionHistory'),True):
+            result.append(self._newNode('extrude').name)
+        return result
+
+    def rebuildSurface(self,*args,**kwargs):
+        return [node.name for node in self._getMany(args)]
+
+    def pointOnSurface(self,*args,**kwargs):
+        surface=self._getMany(args)[0]
+        info=self._newNode('pointOnSurfaceInfo')
+        for shape in self._shapes(surface):
+            self._connect(shape,'worldSpace[0]',info,'inputSurface')
+        return info.name
+
+    def cluster(self,*args,**kwargs):
+        nodes=self._getMany(args)
+        name=_flag(kwargs,('n','name')) or 'cluster1'
+        deformer=self._newNode('cluster',name)
+        handle=self._newNode('transform',deformer.name+'Handle')
+        self._newNode('clusterHandle',handle.name+'Shape',handle)
+        deformer.data['geometry']=[shape for node in nodes for shape in self._shapes(node)]
+        deformer.data['handle']=handle
+        handle.data['deformer']=deformer
+        self._connect(handle,'worldMatrix[0]',deformer,'matrix')
+        self.selection=[handle]
+        return [deformer.name,handle.name]
+
+    def skinCluster(self,*args,**kwargs):
+        nodes=self._getMany(args)
+        influences=[node for node in nodes if node.type=='joint']
+        geometry=[shape for node in nodes if node.type!='joint' for shape in self._shapes(node)]
+        skin=self._newNode('skinCluster',_flag(kwargs,('n','name')) or 'skinCluster1')
+        skin.data['influences']=influences
+        skin.data['geometry']=geometry
+        for idx,joint in enumerate(influences):
+            self._connect(joint,'worldMatrix[0]',skin,'matrix[%d]'%idx)
+        return [skin.name]
+
+    def _findSkinCluster(self,name):
+        node,parent=self._find(name)
+        if node is None:
+            return ''
+        shapes=self._shapes(node)
+        for skin in self.nodes.values():
+            if skin.type=='skinCluster' and any(shape in skin.data['geometry'] for shape in shapes):
+                return skin.name
+        return ''
+
+    def skinPercent(self,*args,**kwargs):
+        return None
+
+    def deformerWeights(self,*args,**kwargs):
+        return None
+
+    def ikHandle(self,*args,**kwargs):
+        startJoint=self._get(_flag(kwargs,('sj','startJoint')))
+        endJoint=self._get(_flag(kwargs,('ee','endEffector')))
+        if not endJoint.parents:
+            raise RuntimeError('ikHandle: %s has no parent joint'%endJoint.name)
+        handle=self._newNode('ikHandle',_flag(kwargs,('n','name')) or 'ikHandle1')
+        handle.values.update(zip(('translateX','translateY','translateZ'),self._worldMatrix(endJoint).get()[12:15]))
+        handle.data['solver']=_flag(kwargs,('sol','solver'),'ikRPsolver')
+        effector=self._newNode('ikEffector','effector1',endJoint.parents[0])
+        for axis in 'XYZ':
+            effector.values['translate'+axis]=endJoint.values.get('translate'+axis,0.0)
+            self._connect(endJoint,'translate'+axis,effector,'translate'+axis)
+        self._connect(effector,'handlePath[0]',handle,'endEffector')
+        self._connect(startJoint,'message',handle,'startJoint')
+        self.selection=[handle]
+        return [handle.name,effector.name]
+
+    def instance(self,*args,**kwargs):
+        result=[]
+        for node in self._getMany(args):
+            if node.isTransform():
+                source=node
+                shapes=self._shapes(node)
+            else:
+                source=node.parents[0]
+                shapes=[node]
+            parent=source.parents[0] if source.parents else None
+            copy=self._newNode('transform',_flag(kwargs,('n','name')) or source.name,parent)
+            copy.values.update((attr,value) for attr,value in source.values.items() if attr in XFORMATTRS)
+            for shape in shapes:
+                shape.parents.append(copy)
+                copy.children.append(shape)
+            result.append(copy.name)
+        self.selection=[self.nodes[name] for name in result]
+        return result
+
+    def parentConstraint(self,*args,**kwargs):
+        outputs=[('constraint%s%s'%(kind,axis),'%s%s'%(attr,axis)) for kind,attr in (('Translate','translate'),('Rotate','rotate')) for axis in 'XYZ']
+        return self._constrain('parentConstraint',args,kwargs,('translate','rotate','scale','parentMatrix[0]'),outputs)
+
+    def pointConstraint(self,*args,**kwargs):
+        outputs=[('constraintTranslate'+axis,'translate'+axis) for axis in 'XYZ']
+        return self._constrain('pointConstraint',args,kwargs,('translate','parentMatrix[0]'),outputs)
+
+    def orientConstraint(self,*args,**kwargs):
+        outputs=[('constraintRotate'+axis,'rotate'+axis) for axis in 'XYZ']
+        return self._constrain('orientConstraint',args,kwargs,('rotate','parentMatrix[0]'),outputs)
+
+    def aimConstraint(self,*args,**kwargs):
+        outputs=[('constraintRotate'+axis,'rotate'+axis) for axis in 'XYZ']
+        return self._constrain('aimConstraint',args,kwargs,('translate','parentMatrix[0]'),outputs)
+
+    def scaleConstraint(self,*args,**kwargs):
+        outputs=[('constraintScale'+axis,'scale'+axis) for axis in 'XYZ']
+        return self._constrain('scaleConstraint',args,kwargs,('scale','parentMatrix[0]'),outputs)
+
+    def poleVectorConstraint(self,*args,**kwargs):
+        outputs=[('constraintTranslate'+axis,'poleVector'+axis) for axis in 'XYZ']
+        return self._constrain('poleVectorConstraint',args,kwargs,('translate','parentMatrix[0]'),outputs)
+
+    #-----------------------------------------------------------------------------
+    #hierarchy and naming commands
+    def parent(self,*args,**kwargs):
+        names=_flatten(args)
+        world=_flag(kwargs,('w','world'))
+        if world:
+            newParent=None
+        else:
+            if len(names)<2:
+                raise RuntimeError('parent: an object and a new parent are needed')
+            newParent=self._get(names.pop())
+        relative=_flag(kwargs,('r','relative'))
+        result=[]
+        for name in names:
+            node,oldParent=self._find(name)
+            if node is None:
+                raise ValueError('No object matches name: %s'%name)
+            if not node.isDag():
+                raise RuntimeError('parent: %s is not a DAG node'%name)
+            oldParent=oldParent or (node.parents[0] if node.parents else None)
+            if oldParent is newParent:
+                raise RuntimeError("parent: Object '%s' is already a child of '%s'"%(name,newParent.name if newParent else 'the world'))
+            if newParent is node or (newParent is not None and self._isAncestor(node,newParent)):
+                raise RuntimeError('parent: cannot parent %s under itself'%name)
+            world=None
+            if not relative and node.isTransform():
+                world=self._worldMatrix(node,oldParent)
+            if oldParent is not None:
+                node.parents.remove(oldParent)
+                oldParent.children.remove(node)
+            if newParent is not None:
+                node.parents.insert(0,newParent)
+                newParent.children.append(node)
+            if world is not None:
+                self._setWorldMatrix(node,world,newParent,keepRotate=True)
+            result.append(node.name)
+        return result
+
+    def rename(self,*args,**kwargs):
+        if len(args)==1:
+            node=self.selection[-1]
+            newName=args[0]
+        else:
+            node=self._get(args[0])
+            newName=args[1]
+        if newName==node.name:
+            return newName
+        del self.nodes[node.name]
+        node.name=self._uniqueName(newName)
+        self.nodes[node.name]=node
+        return node.name
+
+    def delete(self,*args,**kwargs):
+        names=_flatten(args)
+        found=[]
+        for name in names or [node.name for node in self.selection]:
+            node,parent=self._find(name)
+            if node is None:
+                raise ValueError('No object matches name: %s'%name)
+            found.append((node,parent))
+        if _flag(kwargs,('ch','constructionHistory')):
+            for node,parent in found:
+                self._deleteHistory(node)
+            return
+        for node,parent in found:
+            if not node.deleted:
+                self._deleteNode(node,parent)
+
+    def _deleteHistory(self,node):
+        '''bake clusters into the curves they deform and delete them'''
+        for shape in self._shapes(node):
+            for deformer in [other for other in self.nodes.values() if other.type=='cluster' and shape in other.data['geometry']]:
+                handle=deformer.data['handle']
+                if 'cvs' in shape.data and not handle.deleted:
+                    parentWorld=self._worldMatrix(shape)
+                    toLocal=parentWorld*self._worldMatrix(handle)*_inverted(parentWorld)
+                    shape.data['cvs']=[(rigmath.Vector(cv)*rigmath.Transform(_transposed(toLocal).get())).get() for cv in shape.data['cvs']]
+                self._deleteNode(deformer)
+                if not handle.deleted:
+                    self._deleteNode(handle)
+
+    def _deleteNode(self,node,parent=None):
+        '''delete a node and everything under it. Only the given instance of a node with
+        more than one parent is removed.'''
+        if node.isDag() and len(node.parents)>1:
+            parent=parent or node.parents[0]
+            node.parents.remove(parent)
+            parent.children.remove(node)
+            return
+        for child in list(node.children):
+            self._deleteNode(child,node)
+        for above in node.parents or ():
+            above.children.remove(node)
+        for dstAttr in list(node.inputs):
+            self._disconnect(node,dstAttr)
+        for srcAttr,dstNode,dstAttr in list(node.outputs):
+            self._disconnect(dstNode,dstAttr)
+        for objectSet in node.data.pop('sets',()):
+            objectSet.data['members'].remove(node)
+            objectSet.data['memberSet'].discard(node)
+        for member in node.data.get('members',()):
+            member.data['sets'].remove(node)
+        if node in self.selection:
+            self.selection.remove(node)
+        self._constraintsByTarget.pop(node,None)
+        if 'deformer' in node.data and not node.data['deformer'].deleted:
+            self._deleteNode(node.data['deformer'])
+        node.deleted=True
+        del self.nodes[node.name]
+
+    def select(self,*args,**kwargs):
+        if _flag(kwargs,('cl','clear')):
+            self.selection=[]
+            return
+        nodes=self._getMany(args,useSelection=False)
+        if _flag(kwargs,('add','af','addFirst')):
+            self.selection.extend(node for node in nodes if node not in self.selection)
+        elif _flag(kwargs,('d','deselect')):
+            self.selection=[node for node in self.selection if node not in nodes]
+        else:
+            self.selection=nodes
+
+    def move(self,*args,**kwargs):
+        values,names=[],[]
+        for arg in _flatten(args):
+            (names if isinstance(arg,_stringTypes) else values).append(arg)
+        relative=_flag(kwargs,('r','relative'))
+        for node in self._getMany(names):
+            matrix=self._worldMatrix(node)
+            for idx,value in enumerate(values[:3]):
+                matrix[12+idx]=matrix[12+idx]+value if relative else float(value)
+            self._setWorldMatrix(node,matrix,rotate=False,scale=False)
+            self._moved(node)
+
+    #-----------------------------------------------------------------------------
+    #queries
+    def objExists(self,name):
+        nodeName,attr=_splitPlug(name)
+        node,parent=self._find(nodeName)
+        if node is None:
+            return False
+        if not attr:
+            return True
+        return self._hasAttr(node,self._attrName(node,attr))
+
+    def nodeType(self,name,**kwargs):
+        node=self._get(_splitPlug(name)[0])
+        if _flag(kwargs,('i','inherited')):
+            return list(reversed(getLineage(node.type)))
+        return node.type
+
+    def ls(self,*args,**kwargs):
+        if not args and not kwargs:
+            return list(self.nodes) #every node, used to count nodes
+        names=_flatten(args)
+        longNames=_flag(kwargs,('l','long'))
+        flatten=_flag(kwargs,('fl','flatten'))
+        items=[] #(node,path or None,component or None)
+        if names:
+            for name in names:
+                nodeName,attr=_splitPlug(name)
+                if attr:
+                    node,parent=self._find(nodeName)
+                    if node is None:
+                        continue
+                    if attr.startswith('cv['):
+                        count=len(self._cvs(node))
+                        if flatten or attr!='cv[*]':
+                            indices=range(count) if attr=='cv[*]' else [int(attr[3:-1])]
+                            items.extend((node,None,'cv[%d]'%idx) for idx in indices)
+                        else:
+                            items.append((node,None,'cv[0:%d]'%(count-1)))
+                    elif self._hasAttr(node,self._attrName(node,attr)):
+                        items.append((node,None,attr))
+                elif '*' in name or '?' in name:
+                    items.extend((node,None,None) for node in self.nodes.values() if fnmatch.fnmatchcase(node.name,name))
+                else:
+                    node,parent=self._find(name)
+                    if node is not None:
+                        items.append((node,self._path(node,parent) if node.isDag() else None,None))
+        elif _flag(kwargs,('sl','selection')):
+            items=[(node,None,None) for node in self.selection]
+        else:
+            items=[(node,None,None) for node in self.nodes.values()]
+        if _flag(kwargs,('dag',)):
+            expanded=[]
+            if not names and not _flag(kwargs,('sl','selection')):
+                items=[(node,None,None) for node in self.nodes.values() if node.isDag() and not node.parents]
+            for node,path,component in items:
+                if not node.isDag():
+                    continue
+                path=path or self._path(node)
+                expanded.append((node,path,None))
+                expanded.extend((child,childPath,None) for child,childPath in self._descendants(node,path))
+            items=expanded
+        types=_flag(kwargs,('type','typ'))
+        if types:
+            types=[types] if isinstance(types,_stringTypes) else types
+            items=[item for item in items if any(isType(item[0].type,nodeType) for nodeType in types)]
+        if _flag(kwargs,('tr','transforms')):
+            items=[item for item in items if item[0].isTransform()]
+        if _flag(kwargs,('s','shapes')):
+            items=[item for item in items if item[0].isDag() and not item[0].isTransform()]
+        result=[]
+        seen=set()
+        for node,path,component in items:
+            if component:
+                name='%s.%s'%(node.name,component)
+            elif longNames and node.isDag():
+                name=path or self._path(node)
+            else:
+                name=node.name
+            if name in seen:
+                continue
+            seen.add(name)
+            result.append(name)
+            if _flag(kwargs,('st','showType')):
+                result.append(node.type)
+        return result
+
+    def listRelatives(self,*args,**kwargs):
+        names=_flatten(args) or [self._path(node) for node in self.selection]
+        fullPath=_flag(kwargs,('f','fullPath','path'))
+        shapes=_flag(kwargs,('s','shapes'))
+        types=_flag(kwargs,('type',))
+        if types:
+            types=[types] if isinstance(types,_stringTypes) else types
+        result=[]
+        for name in names:
+            node,parent=self._find(name)
+            if node is None:
+                raise ValueError('No object matches name: %s'%name)
+            if not node.isDag():
+                continue
+            path=self._path(node,parent)
+            found=[]
+            if _flag(kwargs,('p','parent')):
+                above=parent or (node.parents[0] if node.parents else None)
+                if above is not None:
+                    found.append((above,path.rsplit('|',1)[0]))
+            elif _flag(kwargs,('ap','allParents')):
+                found.extend((above,self._path(above)) for above in node.parents)
+            elif _flag(kwargs,('ad','allDescendents')):
+                found.extend(reversed(list(self._descendants(node,path))))
+            else:
+                found.extend((child,path+'|'+child.name) for child in node.children)
+            for child,childPath in found:
+                if shapes and child.isTransform():
+                    continue
+                if types and not any(isType(child.type,nodeType) for nodeType in types):
+                    continue
+                result.append(childPath if fullPath else child.name)
+        if not fullPath:
+            seen=set()
+            result=[name for name in result if not (name in seen or seen.add(name))]
+        return result or None
+
+    def listConnections(self,*args,**kwargs):
+        source=_flag(kwargs,('s','source'),True)
+        destination=_flag(kwargs,('d','destination'),True)
+        plugs=_flag(kwargs,('p','plugs'))
+        connections=_flag(kwargs,('c','connections'))
+        types=_flag(kwargs,('t','type'))
+        result=[]
+        for name in _flatten(args):
+            node,attr=self._plug(name,create=True)
+            found=[]
+            if source:
+                for dstAttr,(srcNode,srcAttr) in node.inputs.items():
+                    if not attr or self._plugMatches(node,dstAttr,attr):
+                        found.append((dstAttr,srcNode,srcAttr))
+            if destination:
+                for srcAttr,dstNode,dstAttr in node.outputs:
+                    if not attr or self._plugMatches(node,srcAttr,attr):
+                        found.append((srcAttr,dstNode,dstAttr))
+            for localAttr,other,otherAttr in found:
+                if types and not isType(other.type,types):
+                    continue
+                if connections:
+                    result.append('%s.%s'%(node.name,localAttr))
+                result.append('%s.%s'%(other.name,otherAttr) if plugs else other.name)
+        return result or None
+
+    def connectionInfo(self,plug,**kwargs):
+        node,attr=self._plug(plug,create=True)
+        if _flag(kwargs,('ged','getExactDestination')):
+            return '%s.%s'%(node.name,attr) if attr in node.inputs else ''
+        if _flag(kwargs,('sfd','sourceFromDestination')):
+            if attr in node.inputs:
+                srcNode,srcAttr=node.inputs[attr]
+                return '%s.%s'%(srcNode.name,srcAttr)
+            return ''
+        if _flag(kwargs,('dfs','destinationFromSource')):
+            return ['%s.%s'%(dstNode.name,dstAttr) for srcAttr,dstNode,dstAttr in node.outputs if srcAttr==attr]
+        if _flag(kwargs,('id','isDestination')):
+            return attr in node.inputs
+        if _flag(kwargs,('is','isSource')):
+            return any(srcAttr==attr for srcAttr,dstNode,dstAttr in node.outputs)
+        return None
+
+    def xform(self,*args,**kwargs):
+        names=_flatten(args) or [self._path(node) for node in self.selection]
+        worldSpace=_flag(kwargs,('ws','worldSpace'))
+        if _flag(kwargs,('q','query')):
+            return self._xformQuery(names[0],worldSpace,kwargs)
+        for name in names:
+            node,parent=self._find(name)
+            if node is None:
+                raise ValueError('No object matches name: %s'%name)
+            if node.isTransform():
+                self._xformEdit(node,parent,worldSpace,kwargs)
+                self._moved(node)
+
+    def _xformQuery(self,name,worldSpace,kwargs):
+        nodeName,attr=_splitPlug(name)
+        node,parent=self._find(nodeName)
+        if node is None:
+            raise ValueError('No object matches name: %s'%name)
+        if attr.startswith('cv['):
+            cv=rigmath.Vector(self._cvs(node)[int(attr[3:-1])])
+            if worldSpace:
+                cv=cv*rigmath.Transform(_transposed(self._worldMatrix(node,parent)).get())
+            return cv.get()
+        values=node.values
+        if _flag(kwargs,('m','matrix')):
+            matrix=self._worldMatrix(node,parent) if worldSpace else self._localMatrix(node)
+            return matrix.get()
+        if _flag(kwargs,('t','translation')):
+            if worldSpace:
+                return self._worldMatrix(node,parent).get()[12:15]
+            return [values.get('translate'+axis,0.0) for axis in 'XYZ']
+        if _flag(kwargs,('ro','rotation')):
+            if worldSpace:
+                order=ROTATEORDERS[int(values.get('rotateOrder',0))]
+                return _rotationPart(self._worldMatrix(node,parent))[0].getEuler(order)
+            return [values.get('rotate'+axis,0.0) for axis in 'XYZ']
+        if _flag(kwargs,('s','scale')):
+            if worldSpace:
+                return [abs(value) for value in _rotationPart(self._worldMatrix(node,parent))[1]]
+            return [values.get('scale'+axis,1.0) for axis in 'XYZ']
+        if _flag(kwargs,('roo','rotateOrder')):
+            return ROTATEORDERS[int(values.get('rotateOrder',0))]
+        if _flag(kwargs,('rp','rotatePivot','sp','scalePivot','piv','pivots')):
+            if worldSpace:
+                return self._worldMatrix(node,parent).get()[12:15]
+            return [0.0,0.0,0.0]
+        raise RuntimeError('xform: query flag not supported by the fake scene')
+
+    def _xformEdit(self,node,parent,worldSpace,kwargs):
+        values=node.values
+        rotateOrder=_flag(kwargs,('roo','rotateOrder'))
+        if rotateOrder:
+            world=self._worldMatrix(node,parent)
+            values['rotateOrder']=ROTATEORDERS.index(rotateOrder)
+            if _flag(kwargs,('p','preserve')):
+                self._setWorldMatrix(node,world,parent,translate=False,scale=False)
+        matrix=_flag(kwargs,('m','matrix'))
+        if matrix:
+            matrix=rigmath.Transform(list(matrix))
+            if worldSpace:
+                self._setWorldMatrix(node,matrix,parent)
+            else:
+                self._setLocalMatrix(node,matrix)
+        translation=_flag(kwargs,('t','translation'))
+        if translation:
+            relative=_flag(kwargs,('r','relative'))
+            if worldSpace:
+                world=self._worldMatrix(node,parent)
+                world.setTranslation([(world[12+idx] if relative else 0.0)+float(value) for idx,value in enumerate(translation)])
+                self._setWorldMatrix(node,world,parent,rotate=False,scale=False)
+            else:
+                for axis,value in zip('XYZ',translation):
+                    values['translate'+axis]=(values.get('translate'+axis,0.0) if relative else 0.0)+float(value)
+        rotation=_flag(kwargs,('ro','rotation'))
+        if rotation:
+            if worldSpace:
+                world=self._worldMatrix(node,parent)
+                order=ROTATEORDERS[int(values.get('rotateOrder',0))]
+                rotated=_eulerMatrix(rotation,order)
+                scale=_rotationPart(world)[1]
+                for row in range(3):
+                    for col in range(3):
+                        world[row*4+col]=rotated[row*4+col]*scale[row]
+                self._setWorldMatrix(node,world,parent,translate=False,scale=False)
+            else:
+                values.update(zip(('rotateX','rotateY','rotateZ'),map(float,rotation)))
+        scale=_flag(kwargs,('s','scale'))
+        if scale:
+            values.update(zip(('scaleX','scaleY','scaleZ'),map(float,scale)))
+        for flags,attr in ((('rp','rotatePivot','piv','pivots'),'rotatePivot'),(('sp','scalePivot','piv','pivots'),'scalePivot')):
+            pivot=_flag(kwargs,flags)
+            if pivot:
+                if worldSpace:
+                    pivot=(rigmath.Vector(pivot)*rigmath.Transform(_transposed(_inverted(self._worldMatrix(node,parent))).get())).get()
+                values.update(zip((attr+'X',attr+'Y',attr+'Z'),pivot))
+
+    #-----------------------------------------------------------------------------
+    #attribute commands
+    def getAttr(self,plug,**kwargs):
+        node,attr=self._plug(plug)
+        if _flag(kwargs,('type',)):
+            spec=self._attrSpec(node,attr)
+            return spec.type if spec is not None else 'double'
+        if _flag(kwargs,('l','lock')):
+            return self._isLocked(node,attr)
+        if _flag(kwargs,('k','keyable')):
+            spec=self._attrSpec(node,attr)
+            return bool(spec and spec.keyable) and attr not in node.unkeyable
+        if _flag(kwargs,('size','s')):
+            prefix=attr+'['
+            return len(set(key.split(']',1)[0] for key in list(node.values)+list(node.inputs) if key.startswith(prefix)))
+        if _flag(kwargs,('settable','se')):
+            return not self._isLocked(node,attr) and not self._isConnected(node,attr)
+        value=self._value(node,attr)
+        return list(value) if isinstance(value,list) else value
+
+    def setAttr(self,plug,*values,**kwargs):
+        node,attr=self._plug(plug,error=RuntimeError)
+        lock=_flag(kwargs,('l','lock'))
+        keyable=_flag(kwargs,('k','keyable'))
+        if keyable is not None:
+            (node.unkeyable.discard if keyable else node.unkeyable.add)(attr)
+        if values:
+            if self._isLocked(node,attr) or self._isConnected(node,attr):
+                raise RuntimeError('setAttr: The attribute %s.%s is locked or connected and cannot be modified.'%(node.name,attr))
+            if len(values)==1 and isinstance(values[0],(list,tuple)) and _flag(kwargs,('type',))!='string':
+                values=tuple(values[0])
+            self._setValue(node,attr,values)
+            if node.isTransform() and _baseAttr(attr) in XFORMATTRS:
+                self._moved(node)
+        if lock is not None:
+            (node.locked.add if lock else node.locked.discard)(attr)
+
+    def addAttr(self,*args,**kwargs):
+        if _flag(kwargs,('q','query')):
+            node,attr=self._plug(args[0])
+            spec=self._attrSpec(node,attr)
+            if spec is None:
+                raise RuntimeError('addAttr: %s is not a dynamic attribute'%args[0])
+            if _flag(kwargs,('k','keyable')):
+                return spec.keyable
+            if _flag(kwargs,('dv','defaultValue')):
+                return spec.default
+            if _flag(kwargs,('at','attributeType')):
+                return spec.type
+            if _flag(kwargs,('min','minValue')):
+                return spec.min
+            if _flag(kwargs,('max','maxValue')):
+                return spec.max
+            if _flag(kwargs,('en','enumName')):
+                return spec.enum
+            return None
+        nodes=self._getMany(args)
+        name=_flag(kwargs,('ln','longName')) or _flag(kwargs,('sn','shortName'))
+        short=_flag(kwargs,('sn','shortName'))
+        attrType=_flag(kwargs,('at','attributeType')) or _flag(kwargs,('dt','dataType'),'double')
+        isData=_flag(kwargs,('dt','dataType')) is not None
+        parentName=_flag(kwargs,('p','parent'))
+        for node in nodes:
+            if self._hasAttr(node,name) or name in node.aliases:
+                raise RuntimeError("addAttr: Found an attribute named '%s' on %s already"%(name,node.name))
+            if isData or attrType in ('message','compound','double3','float3'):
+                default=None
+            else:
+                default=_flag(kwargs,('dv','defaultValue'),0)
+            spec=FakeAttr(name,short,attrType,default,parent=parentName,
+                multi=bool(_flag(kwargs,('m','multi'))),keyable=bool(_flag(kwargs,('k','keyable'))))
+            spec.min=_flag(kwargs,('min','minValue'))
+            spec.max=_flag(kwargs,('max','maxValue'))
+            spec.enum=_flag(kwargs,('en','enumName'))
+            node.attrs[name]=spec
+            node.userAttrs.append(name)
+            if short:
+                node.aliases[short]=name
+            if parentName:
+                node.attrs[parentName].children.append(name)
+            if default is not None and not spec.multi:
+                node.values[name]=default
+
+    def listAttr(self,*args,**kwargs):
+        names=[]
+        for node in self._getMany(args):
+            if _flag(kwargs,('ud','userDefined')):
+                attrs=[node.attrs[name] for name in node.userAttrs]
+            else:
+                attrs=list(_typeAttrs(node.type)[0].values())+[node.attrs[name] for name in node.userAttrs]
+            if _flag(kwargs,('k','keyable')):
+                attrs=[attr for attr in attrs if attr.keyable and attr.name not in node.unkeyable]
+            names.extend(attr.name for attr in attrs)
+        return names or None
+
+    def connectAttr(self,source,destination,**kwargs):
+        srcNode,srcAttr=self._plug(source,error=RuntimeError,create=True)
+        dstNode,dstAttr=self._plug(destination,error=RuntimeError,create=True)
+        if _flag(kwargs,('na','nextAvailable')) and not dstAttr.endswith(']'):
+            idx=0
+            while '%s[%d]'%(dstAttr,idx) in dstNode.inputs:
+                idx+=1
+            dstAttr='%s[%d]'%(dstAttr,idx)
+        if dstAttr in dstNode.inputs:
+            if dstNode.inputs[dstAttr]==(srcNode,srcAttr):
+                raise RuntimeError('connectAttr: %s is already connected to %s'%(source,destination))
+            if not _flag(kwargs,('f','force')):
+                raise RuntimeError('connectAttr: %s already has an incoming connection'%destination)
+            self._disconnect(dstNode,dstAttr)
+        self._connect(srcNode,srcAttr,dstNode,dstAttr)
+        #a curve fed into another curve's create takes its shape, like after Maya evaluates it
+        if _baseAttr(dstAttr)=='create' and 'cvs' in srcNode.data:
+            cvs=[list(cv) for cv in srcNode.data['cvs']]
+            if _baseAttr(srcAttr)=='worldSpace':
+                world=rigmath.Transform(_transposed(self._worldMatrix(srcNode)).get())
+                cvs=[(rigmath.Vector(cv)*world).get() for cv in cvs]
+            dstNode.data['cvs']=cvs
+
+    def deleteAttr(self,*args,**kwargs):
+        attrName=_flag(kwargs,('at','attribute'))
+        if attrName:
+            node=self._get(_flatten(args)[0])
+        else:
+            node,attrName=self._plug(_flatten(args)[0],error=RuntimeError)
+        attrName=node.aliases.get(attrName,attrName)
+        spec=node.attrs.get(attrName)
+        if spec is None:
+            raise RuntimeError('deleteAttr: %s.%s is not a dynamic attribute'%(node.name,attrName))
+        for name in [attrName]+list(spec.children):
+            for dstAttr in [stored for stored in node.inputs if self._plugMatches(node,stored,name)]:
+                self._disconnect(node,dstAttr)
+            for srcAttr,dstNode,dstAttr in [output for output in node.outputs if self._plugMatches(node,output[0],name)]:
+                self._disconnect(dstNode,dstAttr)
+            for stored in [stored for stored in node.values if stored==name or stored.startswith(name+'[')]:
+                del node.values[stored]
+            del node.attrs[name]
+            node.userAttrs.remove(name)
+            for short,long in list(node.aliases.items()):
+                if long==name:
+                    del node.aliases[short]
+        if spec.parent and spec.parent in node.attrs:
+            node.attrs[spec.parent].children.remove(attrName)
+
+    def disconnectAttr(self,source,destination,**kwargs):
+        srcNode,srcAttr=self._plug(source,error=RuntimeError,create=True)
+        dstNode,dstAttr=self._plug(destination,error=RuntimeError,create=True)
+        if dstNode.inputs.get(dstAttr)!=(srcNode,srcAttr):
+            raise RuntimeError('disconnectAttr: %s is not connected to %s'%(source,destination))
+        self._disconnect(dstNode,dstAttr)
+
+    #-----------------------------------------------------------------------------
+    #sets
+    def sets(self,*args,**kwargs):
+        if _flag(kwargs,('q','query')):
+            objectSet=self._get(_flatten(args)[0])
+            return [member.name for member in objectSet.data.get('members',())] or None
+        added=_flag(kwargs,('add','addElement','fe','forceElement','include'))
+        if added:
+            objectSet=self._get(added)
+            members=objectSet.data['members']
+            memberSet=objectSet.data['memberSet']
+            for node in self._getMany(args,useSelection=False):
+                if node not in memberSet:
+                    members.append(node)
+                    memberSet.add(node)
+                    node.data.setdefault('sets',[]).append(objectSet)
+            return None
+        removed=_flag(kwargs,('rm','remove'))
+        if removed:
+            objectSet=self._get(removed)
+            for node in self._getMany(args,useSelection=False):
+                if node in objectSet.data['memberSet']:
+                    objectSet.data['members'].remove(node)
+                    objectSet.data['memberSet'].discard(node)
+                    node.data['sets'].remove(objectSet)
+            return None
+        if _flag(kwargs,('im','isMember')):
+            objectSet=self._get(_flag(kwargs,('im','isMember')))
+            return all(node in objectSet.data['memberSet'] for node in self._getMany(args))
+        objectSet=self._newNode('objectSet',_flag(kwargs,('n','name')) or 'set1')
+        objectSet.data['members']=[]
+        objectSet.data['memberSet']=set()
+        if not _flag(kwargs,('em','empty')):
+            self.sets(*[node.name for node in self._getMany(args)],add=objectSet.name)
+        return objectSet.name
+
+    def listSets(self,*args,**kwargs):
+        node=self._get(_flag(kwargs,('o','object')))
+        return [objectSet.name for objectSet in node.data.get('sets',())] or None
+
+    #-----------------------------------------------------------------------------
+    #files, time and keys
+    def file(self,*args,**kwargs):
+        if _flag(kwargs,('new',)):
+            self._reset()
+            return 'untitled'
+        if _flag(kwargs,('i','import')):
+            fileType=_flag(kwargs,('typ','type'),'mayaAscii')
+            if fileType!='mayaAscii' and not args[0].lower().endswith('.ma'):
+                raise RuntimeError('file: the fake scene can only import maya ascii files')
+            return self._importMayaAscii(args[0])
+        raise RuntimeError('file: only new and import are supported by the fake scene')
+
+    def _importMayaAscii(self,path):
+        '''create the nodes of a .ma file with their transform attributes and the
+        connections between them, return the new nodes (DAG nodes as full paths)'''
+        created=[]
+        fileNodes={}
+        current=None
+        with open(path) as f:
+            for line in f:
+                line=line.strip()
+                if line.startswith('createNode '):
+                    current=self._maCreateNode(line,fileNodes)
+                    if current is not None:
+                        created.append(current)
+                elif line.startswith('setAttr ') and current is not None:
+                    match=_MASETATTR.match(line)
+                    if match:
+                        values=[{'yes':1,'no':0}.get(value,value) for value in match.group(2).split()]
+                        attr=self._attrName(current,match.group(1))
+                        self._setValue(current,attr,[float(value) for value in values])
+                elif line.startswith('connectAttr '):
+                    current=None
+                    tokens=shlex.split(line.rstrip(';'))
+                    plugs=[token for token in tokens[1:] if not token.startswith('-')][:2]
+                    nodes=[fileNodes.get(_splitPlug(plug)[0].lstrip(':')) or self.nodes.get(_splitPlug(plug)[0].lstrip(':')) for plug in plugs]
+                    if len(plugs)==2 and all(nodes):
+                        try:
+                            self.connectAttr('%s.%s'%(nodes[0].name,_splitPlug(plugs[0])[1]),
+                                '%s.%s'%(nodes[1].name,_splitPlug(plugs[1])[1]),na='-na' in tokens)
+                        except RuntimeError:
+                            pass #already connected shared nodes
+                elif not line.startswith(('rename ','setAttr','"','+','-')) and line:
+                    current=None
+        return [self._path(node) if node.isDag() else node.name for node in created if not node.deleted]
+
+    def _maCreateNode(self,line,fileNodes):
+        tokens=shlex.split(line.rstrip(';'))
+        nodeType=tokens[1]
+        flags={}
+        idx=2
+        while idx<len(tokens):
+            if tokens[idx] in ('-n','-p') and idx+1<len(tokens):
+                flags[tokens[idx]]=tokens[idx+1]
+                idx+=2
+            else:
+                flags[tokens[idx]]=True
+                idx+=1
+        name=flags.get('-n',nodeType+'1')
+        if '-s' in flags and name in self.nodes:
+            fileNodes[name]=self.nodes[name]
+            return None
+        parentName=flags.get('-p')
+        parent=None
+        if parentName:
+            parent=fileNodes.get(parentName.split('|')[-1])
+            if parent is None:
+                parent=self._find(parentName)[0]
+        node=self._newNode(nodeType,name,parent)
+        fileNodes[name]=node
+        return node
+
+    def date(self,*args,**kwargs):
+        return datetime.datetime.now().strftime('%Y/%m/%d %H:%M:%S')
+
+    def currentTime(self,*args,**kwargs):
+        if _flag(kwargs,('q','query')):
+            return self.currentFrame
+        if args:
+            self.currentFrame=float(args[0])
+        return self.currentFrame
+
+    def setKeyframe(self,*args,**kwargs):
+        '''keys are only recorded as (plug or node,time) in .keyframes, not evaluated'''
+        for name in _flatten(args) or [node.name for node in self.selection]:
+            self.keyframes.append((name,_flag(kwargs,('t','time'),self.currentFrame)))
+        return len(_flatten(args))
+
+    def undoInfo(self,*args,**kwargs):
+        return None
+
+    def refresh(self,*args,**kwargs):
+        return None
+
+#setAttr lines of a .ma file whose values are read on import
+_MASETATTR=re.compile(r'^setAttr\s+"\.(t|r|s|jo|ro|v|it)"\s+(?:-type\s+"double3"\s+)?([-+0-9.eE\s]+|yes|no)\s*;$')
+
+class FakeBackend(object):
+    '''Context manager that sends every lib.scene command to a FakeScene while it is
+    open and returns the scene. A new empty scene is made unless one is given.
+    The backend in use before is put back on exit.'''
+    def __init__(self,scene=None):
+        object.__init__(self)
+        self.scene=scene or FakeScene()
+        self.mel=FakeMel(self.scene)
+        self._previous=None
+
+    def __enter__(self):
+        self._previous=mpScene.getBackend()
+        mpScene.setBackend(self.scene,self.mel)
+        return self.scene
+
+    def __exit__(self,excType,excValue,traceback):
+        mpScene.setBackend(*self._previous)
+        return False
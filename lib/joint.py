@@ -1,11 +1,15 @@
 '''helper functions for joint navigation/manipulation'''
-import maya.cmds as cmds
+from mpyr.lib.scene import cmds
 import mpyr.lib.rigmath as rigmath
+import mpyr.lib.xform as mpXform
 
-def getTopJoint(node):
+def getTopJoint(node,snapshot=None):
     '''given a node get the highest parent joint
     Raises RuntimeError on failure.
+    If a dag.HierarchySnapshot holding the node is given the scene isn't queried.
     '''
+    if snapshot and node in snapshot:
+        return snapshot.getTopJoint(node)
     allParents = cmds.listRelatives(node,p=True,f=True)
     if  allParents:
         parList = allParents[0].split('|')
@@ -19,8 +23,11 @@ def getTopJoint(node):
     else:
         raise RuntimeError("'%s' has no parent joints nor is it a joint" % node)
 
-def getJointList(startJoint,endJoint):
-    '''return a list representing the chain between a given start and end joint'''
+def getJointList(startJoint,endJoint,snapshot=None):
+    '''return a list representing the chain between a given start and end joint.
+    If a dag.HierarchySnapshot holding both joints is given the scene isn't queried.'''
+    if snapshot and startJoint in snapshot and endJoint in snapshot:
+        return snapshot.getChain(startJoint,endJoint)
     allParents = cmds.listRelatives(endJoint,p=True,f=True)
     if not allParents:
         raise RuntimeError("'%s' has no parents, not part of chain." % endJoint)
@@ -52,10 +59,8 @@ def getDownAxis(joint):
         target = cmds.listRelatives(joint,p=True,type='joint')  
     if not target:
         raise RuntimeError("no child or parent joints on %s, cannot determine downAxis"%joint)
-    thisVector=rigmath.Vector(joint)
-    thisXform=rigmath.Transform(joint)
-    targVector=rigmath.Vector(target[0])
-    diff=thisVector-targVector
+    thisXform,targXform=rigmath.getTransforms([joint,target[0]])
+    diff=thisXform.getTranslation()-targXform.getTranslation()
     diff.normalize()
 
     #compare alignment of local axes of transform to diff vector
@@ -64,20 +69,19 @@ def getDownAxis(joint):
         dots.append(abs(diff.dot(axis)))
     return axes[dots.index(max(dots))]
 
-def getChainLength(startJoint,endJoint):
+def getChainLength(startJoint,endJoint,snapshot=None):
     '''given a start and end joint return the length of the chain.'''
-    joints=getJointList(startJoint,endJoint)
+    positions=rigmath.getVectors(getJointList(startJoint,endJoint,snapshot=snapshot))
     distance=0.0
-    for idx,joint in enumerate(joints):
-        if idx==0:
-            continue
-        par=rigmath.Vector(joints[idx-1])
-        cur=rigmath.Vector(joint)
-        distance+=(par-cur).length()
+    for idx in range(1,len(positions)):
+        distance+=(positions[idx-1]-positions[idx]).length()
     return distance
     
-def getEndJoint(startJoint):
-    '''return the lowest end joint of a given startJoint. Quits at a branch.'''
+def getEndJoint(startJoint,snapshot=None):
+    '''return the lowest end joint of a given startJoint. Quits at a branch.
+    If a dag.HierarchySnapshot holding the joint is given the scene isn't queried.'''
+    if snapshot and startJoint in snapshot:
+        return snapshot.getEndJoint(startJoint)
     endJoint = None
     while True:
         children = cmds.listRelatives(startJoint,type='joint')
@@ -99,27 +103,31 @@ def getIKNodes(joint):
         raise RuntimeError("No IK nodes found on joint %s" % joint)
     return(effector,handle)
     
+@mpXform.invalidates
 def rotToOrient(jnt):
     '''copy rotation to orient, zeroes the joint basically'''
     #first get everything into rot
     orientToRot(jnt)
     
-    oldOrder = cmds.getAttr(jnt + ".rotateOrder")
+    #jointOrient is always xyz, so convert the rotation to that order
     rotOrders = ['xyz','yzx','zxy','xzy','yxz','zyx']
-    cmds.xform(jnt,p=True,roo='xyz')
+    oldOrder = cmds.getAttr(jnt + ".rotateOrder")
     oldRot = cmds.getAttr(jnt + ".rotate")[0]
+    rotXform = rigmath.Transform()
+    rotXform.setFromEuler(oldRot[0],oldRot[1],oldRot[2],order=rotOrders[oldOrder])
+    orient = rotXform.getEuler('xyz')
     
-    cmds.setAttr(jnt + ".jointOrient",oldRot[0],oldRot[1],oldRot[2])
+    cmds.setAttr(jnt + ".jointOrient",orient[0],orient[1],orient[2])
     cmds.setAttr(jnt + ".rotate",0,0,0)
     
-    cmds.xform(jnt,p=True,roo=rotOrders[oldOrder])
-    
+@mpXform.invalidates
 def orientToRot(jnt):
     '''copy orient to rotation'''
     origTransform = rigmath.Transform(jnt)
     cmds.setAttr(jnt + '.jointOrient',0,0,0)
     cmds.xform(jnt,ws=True,m=origTransform.get())
 
+@mpXform.invalidates
 def createJointChain(vectorList,upVector=None,downAxis='x',upAxis='z',orient=True):
     '''Create a joint chain using the given list of vectors (if objects are given their
     world translate is used. If orient is True (the default) chain will be oriented.
@@ -138,6 +146,7 @@ def createJointChain(vectorList,upVector=None,downAxis='x',upAxis='z',orient=Tru
         for joint in joints:
             orientJoint(joint,upVector=upVector,downAxis=downAxis,upAxis=upAxis)
     
+@mpXform.invalidates
 def orientJoint(joint,upVector=None,downAxis='x',upAxis='z'):
     '''orient a given joint. 
     Joint will point at it's child or -1 it's parent if no child or many children.
@@ -161,14 +170,14 @@ def orientJoint(joint,upVector=None,downAxis='x',upAxis='z'):
     fosterPar = cmds.group(em=True,n='TEMPPAR')
     if par:
         cmds.parent(fosterPar,par[0])
-        cmds.xform(fosterPar,ws=True,m=cmds.xform(par,q=True,ws=True,m=True))
+        cmds.xform(fosterPar,ws=True,m=mpXform.getWorldMatrix(par[0]))
     else:
-        cmds.xform(fosterPar,ws=True,m=cmds.xform(joint,q=True,ws=True,m=True))
+        cmds.xform(fosterPar,ws=True,m=mpXform.getWorldMatrix(joint))
 
     #create nodes to aim at and use as up object
     aimTarget = cmds.group(em=True,n='TEMPCHILD',p=fosterPar)
     upTarget = cmds.group(em=True,n='TEMPAIM')
-    cmds.xform(aimTarget,ws=True,m=cmds.xform(children[0],q=True,ws=True,m=True))
+    cmds.xform(aimTarget,ws=True,m=mpXform.getWorldMatrix(children[0]))
     cmds.parent(children,fosterPar)
     
     #zero joint's orient
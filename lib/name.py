@@ -1,8 +1,22 @@
 '''Naming convention spec
 The rest of the rigging scripts should use these defaults/classes when trying to parse
 names. That way if the naming convention needs to change it only needs to change here.
+
+Name.get checks that the name isn't used yet. While a NameRegistry is open (Rig.create
+opens one for the whole build) every name handed out by Name.get is remembered, so
+later checks are answered from a set. Only names the registry has never seen are
+looked up in the scene:
+
+    with mpName.NameRegistry():
+        name = mpName.Name('Arm','L','01FKCTRL')
+        cmds.createNode('transform',n=name.get())
+        name.get()            #RuntimeError, no scene query
+        name.get(unique=True) #'Arm_L_01FKCTRL1'
+
+Code that deletes or renames nodes named by Name.get inside a registry should call
+release() with the old name.
 '''
-import maya.cmds as cmds
+from mpyr.lib.scene import cmds
 
 #defaults for general naming convention
 SEP = '_'
@@ -31,6 +45,79 @@ CTRLSETIK = 'CTRLSIK'
 ALLCTRLSET = 'ALLCTRLS'
 FKIKBLENDATTR = 'FKIK'              #any attr that blends IK/FK 
 CACHEATTR = 'mpCache'                 #attr name used to flag objects for caching
+MIRRORPAIRSATTR = 'mirrorPairs'     #string attr on the rig node holding the mirror table
+RIGINDEXATTR = 'rigIndex'           #string attr on the rig node holding the json ctrl index
+
+_depth=0
+_names=set()  #names handed out by Name.get or found in the scene
+_counters={}  #next numbered suffix to try, per base name
+_stats={'hits':0,'misses':0}
+
+class NameRegistry(object):
+    '''Context manager that remembers the names used while it is open. Nesting is
+    allowed, inner registries share the outer one.'''
+    def __init__(self):
+        object.__init__(self)
+
+    def __enter__(self):
+        global _depth
+        _depth+=1
+        return self
+
+    def __exit__(self,excType,excValue,traceback):
+        global _depth
+        _depth-=1
+        if not _depth:
+            clearRegistry()
+        return False
+
+def isRegistryActive():
+    '''return True if a NameRegistry is open'''
+    return bool(_depth)
+
+def clearRegistry():
+    '''forget every remembered name, call after the scene is cleared'''
+    _names.clear()
+    _counters.clear()
+
+def register(name):
+    '''remember a name that was created without Name.get'''
+    if _depth:
+        _names.add(name)
+
+def release(name):
+    '''forget a name whose node was deleted or renamed'''
+    _names.discard(name)
+
+def exists(name):
+    '''return True if name is taken. Known names are answered without a scene query.'''
+    if _depth and name in _names:
+        _stats['hits']+=1
+        return True
+    _stats['misses']+=1
+    found=cmds.objExists(name)
+    if found and _depth:
+        _names.add(name)
+    return found
+
+def getUnique(name):
+    '''return name, or name with the lowest free number appended if it is taken'''
+    if not exists(name):
+        return name
+    idx=_counters.get(name,1)
+    while exists(name+str(idx)):
+        idx+=1
+    _counters[name]=idx+1
+    return name+str(idx)
+
+def getStats():
+    '''return a dict of registry hits and misses (names looked up in the scene)'''
+    return dict(_stats)
+
+def resetStats():
+    '''zero the counters returned by getStats'''
+    for key in _stats:
+        _stats[key]=0
 
 def getLocation(node):
     '''given a node, return the location string. Return None if not found'''
@@ -62,13 +149,20 @@ class Name(object):
         elif len(args) == 1:
             self.parse(args[0])            
         
-    def get(self,noCheck=False):
-        '''return the name as a string'''
+    def get(self,noCheck=False,unique=False):
+        '''return the name as a string. Raises RuntimeError if the name is taken, unless
+        noCheck is True (no check at all) or unique is True (a number is appended to
+        make it free). Inside a NameRegistry the returned name counts as taken.'''
         if not self.part or not self.loc or not self.desc:
             raise RuntimeError("invalid name: '%s _ %s _ %s" % (self.part,self.loc,self.desc))
         strName = self.sep.join([self.part,self.loc,self.desc])
-        if cmds.objExists(strName) and noCheck == False:
+        if noCheck:
+            return strName
+        if unique:
+            strName = getUnique(strName)
+        elif exists(strName):
             raise RuntimeError("can't name already exists: %s" % strName)
+        register(strName)
         return strName
 
     def mirror(self):
@@ -1,5 +1,5 @@
 '''functions for working with curves and surfaces'''
-import maya.cmds as cmds
+from mpyr.lib.scene import cmds
 
 def curveFromNodes(nodeList):
     '''given a list of nodes make and return a 1-degree curve passing through those transforms'''
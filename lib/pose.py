@@ -0,0 +1,180 @@
+'''Capture, store and apply ctrl poses.
+
+A Pose holds the channel values of a list of ctrls in one flat array of doubles. Each
+ctrl is known by its index in the pose, and has the list of channels stored for it:
+
+    pose = mpPose.captureCharacter(ctrlName)
+    pose.save('/poses/idle.json')
+
+    pose = mpPose.Pose.load('/poses/idle.json')
+    mpPose.applyPose(pose,ctrlName,weight=0.5)                  #halfway there
+    mpPose.applyPose(pose,ctrlName,limbs=[mpRig.getLimbNode(ctrlName)]) #one limb only
+
+Ctrls are stored without namespace. applyPose adds the namespace of the node it is
+given, so a pose captured on one reference of a character applies to any other.
+Channels are read and written with one getAttr/setAttr per t, r and s (see
+lib/attr.py) and the channels of a ctrl come from the rig index, so applying a pose
+doesn't query the rig. A whole pose is applied as one undo step.
+'''
+import array
+import json
+
+from mpyr.lib.scene import cmds
+
+import mpyr.lib.scene as mpScene
+import mpyr.lib.attr as mpAttr
+import mpyr.lib.rig as mpRig
+import mpyr.lib.xform as mpXform
+
+POSEVERSION = 1
+
+#order channels are stored in, user attributes follow sorted by name
+TRANSFORMCHANNELS = ('tx','ty','tz','rx','ry','rz','sx','sy','sz')
+
+def stripNamespace(node):
+    '''return the node name without namespace'''
+    return node.rpartition(':')[2]
+
+def getNamespacePrefix(node):
+    '''return the namespace of a node followed by ':', or '' if it has none'''
+    namespace = node.rpartition(':')[0]
+    return namespace+':' if namespace else ''
+
+def getPoseChannels(ctrlName):
+    '''return the list of channels a pose stores for the ctrl, the channels a reset sets'''
+    defaults = mpRig.getCtrlDefaults(ctrlName)
+    channels = [channel for channel in TRANSFORMCHANNELS if channel in defaults]
+    channels.extend(sorted(channel for channel in defaults if channel not in TRANSFORMCHANNELS))
+    return channels
+
+class Pose(object):
+    '''Channel values of a list of ctrls. ctrls and channels are lists with one entry per
+    ctrl, values is an array of every channel value in ctrl order.'''
+    def __init__(self,ctrls=None,channels=None,values=None):
+        object.__init__(self)
+        self.ctrls = list(ctrls or [])
+        self.channels = [tuple(item) for item in channels or []]
+        self.values = array.array('d',values or [])
+        self._offsets = None
+        if len(self.ctrls) != len(self.channels) or len(self.values) != sum(len(item) for item in self.channels):
+            raise RuntimeError('Pose ctrls, channels and values do not match')
+
+    def __repr__(self):
+        return '%s(%s ctrls)'%(self.__class__.__name__,len(self.ctrls))
+
+    def __len__(self):
+        return len(self.ctrls)
+
+    def __contains__(self,ctrlName):
+        return ctrlName in self._getOffsets()
+
+    def _getOffsets(self):
+        '''return dict of ctrl: (index,offset of its first value)'''
+        if self._offsets is None:
+            self._offsets = {}
+            offset = 0
+            for index,ctrlName in enumerate(self.ctrls):
+                self._offsets[ctrlName] = (index,offset)
+                offset += len(self.channels[index])
+        return self._offsets
+
+    def add(self,ctrlName,channels,values):
+        '''add a ctrl with its channel names and values to the pose'''
+        if ctrlName in self:
+            raise RuntimeError('%s is already in the pose'%ctrlName)
+        if len(channels) != len(values):
+            raise RuntimeError('%s channels and values do not match'%ctrlName)
+        self._getOffsets()[ctrlName] = (len(self.ctrls),len(self.values))
+        self.ctrls.append(ctrlName)
+        self.channels.append(tuple(channels))
+        self.values.extend(values)
+
+    def getValues(self,ctrlName):
+        '''return a dict of channel: value of a ctrl in the pose'''
+        index,offset = self._getOffsets()[ctrlName]
+        channels = self.channels[index]
+        return dict(zip(channels,self.values[offset:offset+len(channels)]))
+
+    def items(self):
+        '''yield (ctrl,channels,values) for every ctrl in the pose'''
+        offset = 0
+        for ctrlName,channels in zip(self.ctrls,self.channels):
+            yield ctrlName,channels,self.values[offset:offset+len(channels)]
+            offset += len(channels)
+
+    def toDict(self):
+        '''return the pose as a dict that can be saved as json. Channel lists shared by
+        many ctrls are only stored once.'''
+        channelSets = []
+        channelIndex = {}
+        ctrlChannels = []
+        for channels in self.channels:
+            if channels not in channelIndex:
+                channelIndex[channels] = len(channelSets)
+                channelSets.append(list(channels))
+            ctrlChannels.append(channelIndex[channels])
+        return {
+            'version':POSEVERSION,
+            'ctrls':self.ctrls,
+            'channelSets':channelSets,
+            'ctrlChannels':ctrlChannels,
+            'values':self.values.tolist(),
+            }
+
+    @classmethod
+    def fromDict(cls,data):
+        '''return a Pose made from a dict written by toDict'''
+        if data.get('version') != POSEVERSION:
+            raise RuntimeError('Unsupported pose version %s'%data.get('version'))
+        channelSets = data['channelSets']
+        return cls(data['ctrls'],[channelSets[index] for index in data['ctrlChannels']],data['values'])
+
+    def save(self,filePath):
+        '''write the pose to a json file'''
+        with open(filePath,'w') as f:
+            json.dump(self.toDict(),f,separators=(',',':'))
+
+    @classmethod
+    def load(cls,filePath):
+        '''return the Pose saved in a json file'''
+        with open(filePath) as f:
+            return cls.fromDict(json.load(f))
+
+def capturePose(ctrls):
+    '''return a Pose of the current values of the given ctrls'''
+    pose = Pose()
+    for ctrlName in mpRig.unique(ctrls):
+        channels = getPoseChannels(ctrlName)
+        pose.add(stripNamespace(ctrlName),channels,mpAttr.getChannels(ctrlName,channels))
+    return pose
+
+def captureLimb(ctrlName):
+    '''given a ctrl return a Pose of its limb'''
+    return capturePose(mpRig.getLimbCtrls(ctrlName))
+
+def captureCharacter(obj):
+    '''given an obj in a character return a Pose of all of its ctrls'''
+    return capturePose(mpRig.getCharacterCtrls(obj))
+
+@mpXform.invalidates
+def applyPose(pose,obj=None,weight=1.0,limbs=None):
+    '''set the ctrls of a pose as a single undo step.
+    obj: any node of the character to pose, its namespace is added to the ctrl names.
+    Without obj the names are used as stored.
+    weight: blends from the current pose (0.0) to the stored one (1.0).
+    limbs: list of limb nodes, only ctrls in these limbs are set.
+    Ctrls of the pose that aren't in the scene and channels that are locked are skipped.
+    '''
+    prefix = getNamespacePrefix(obj) if obj else ''
+    limbs = set(limbs) if limbs is not None else None
+    with mpScene.UndoChunk('applyPose'):
+        for ctrlName,channels,values in pose.items():
+            ctrlName = prefix+ctrlName
+            if not mpRig.getCtrlInfo(ctrlName) and not cmds.objExists(ctrlName):
+                continue
+            if limbs is not None and mpRig.getLimbNode(ctrlName) not in limbs:
+                continue
+            if weight != 1.0:
+                current = mpAttr.getChannels(ctrlName,channels)
+                values = [old+(new-old)*weight for old,new in zip(current,values)]
+            mpAttr.setChannels(ctrlName,dict(zip(channels,values)),skipLocked=True)
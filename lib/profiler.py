@@ -0,0 +1,214 @@
+'''Opt-in build profiler, records where the time of a rig build goes.
+
+Rig.create and Limb.create mark their phases (begin, build, end and the steps of
+Rig.end) with phase(). Nothing is recorded unless a BuildProfile is open:
+
+    with mpProfiler.BuildProfile() as profile:
+        biped.Rig().create()
+    print(profile.getTable())
+    profile.writeJson('/tmp/bipedBuild.json')
+    profile.writeChromeTrace('/tmp/bipedTrace.json') #open in chrome://tracing
+
+Each phase records its wall time and the number of nodes created while it ran, and
+phases nest, so a limb shows up under the rig phase that added it. With no profile
+open phase() returns a shared do-nothing context, so the build pays almost nothing.
+
+Your own build code can add phases the same way:
+
+    with mpProfiler.phase('skinning'):
+        self.loadWeights()
+'''
+import json
+import time
+import mpyr.lib.scene as mpScene
+from mpyr.lib.scene import cmds
+try:
+    import maya.api.OpenMaya as om
+except ImportError:
+    om=None
+
+#best wall clock available, time.time on python 2
+_clock=getattr(time,'perf_counter',time.time)
+
+_active=None #the open BuildProfile
+
+class Phase(object):
+    '''One timed phase of a build. Times are in seconds from the start of the profile,
+    nodes is the number of nodes created during the phase (children included).'''
+    def __init__(self,name,parent=None):
+        object.__init__(self)
+        self.name=name
+        self.parent=parent
+        self.children=[]
+        self.start=0.0
+        self.duration=0.0
+        self.nodes=0
+
+    def __repr__(self):
+        return '%s(%s) %.3fs %s nodes'%(self.__class__.__name__,self.name,self.duration,self.nodes)
+
+    def getSelfTime(self):
+        '''return the time spent in this phase and not in its children'''
+        return self.duration-sum(child.duration for child in self.children)
+
+    def toDict(self):
+        '''return the phase and its children as nested dicts'''
+        return {
+            'name':self.name,
+            'start':self.start,
+            'duration':self.duration,
+            'selfTime':self.getSelfTime(),
+            'nodes':self.nodes,
+            'children':[child.toDict() for child in self.children],
+            }
+
+    def walk(self,depth=0):
+        '''yield (depth,phase) for this phase and every phase under it, depth first'''
+        yield depth,self
+        for child in self.children:
+            for item in child.walk(depth+1):
+                yield item
+
+class _PhaseContext(object):
+    '''Context manager returned by phase() while a profile is open'''
+    def __init__(self,profile,name):
+        object.__init__(self)
+        self.profile=profile
+        self.name=name
+        self.phase=None
+        self.startNodes=0
+
+    def __enter__(self):
+        parent=self.profile.current
+        self.phase=Phase(self.name,parent)
+        parent.children.append(self.phase)
+        self.profile.current=self.phase
+        self.startNodes=self.profile.getNodeCount()
+        self.phase.start=_clock()-self.profile.startTime
+        return self.phase
+
+    def __exit__(self,excType,excValue,traceback):
+        self.phase.duration=_clock()-self.profile.startTime-self.phase.start
+        self.phase.nodes=self.profile.getNodeCount()-self.startNodes
+        self.profile.current=self.phase.parent
+        return False
+
+class _NullPhase(object):
+    '''Context manager returned by phase() when no profile is open, does nothing'''
+    def __enter__(self):
+        return None
+
+    def __exit__(self,excType,excValue,traceback):
+        return False
+
+_NULLPHASE=_NullPhase()
+
+def phase(name):
+    '''return a context manager that records a phase called name in the open
+    BuildProfile. Does nothing when no profile is open.'''
+    if _active is None:
+        return _NULLPHASE
+    return _PhaseContext(_active,name)
+
+def isActive():
+    '''return True if a BuildProfile is open'''
+    return _active is not None
+
+class BuildProfile(object):
+    '''Context manager that records every phase() entered while it is open.
+    Only one profile can be open at a time, opening a second raises RuntimeError.
+
+    Nodes are counted with an OpenMaya node added callback when the API is available,
+    otherwise by listing the scene at the start and end of each phase (slower, and
+    deleted nodes make the counts lower).
+    '''
+    def __init__(self,name='build'):
+        object.__init__(self)
+        self.root=Phase(name)
+        self.current=self.root
+        self.startTime=0.0
+        self._created=0
+        self._startNodes=0
+        self._callback=None
+
+    def __enter__(self):
+        global _active
+        if _active is not None:
+            raise RuntimeError('A BuildProfile is already open')
+        _active=self
+        self.root.children=[]
+        self.current=self.root
+        self._created=0
+        if om and mpScene.isMaya():
+            self._callback=om.MDGMessage.addNodeAddedCallback(self._nodeAdded,'dependNode')
+        self._startNodes=self.getNodeCount()
+        self.startTime=_clock()
+        return self
+
+    def __exit__(self,excType,excValue,traceback):
+        global _active
+        self.root.duration=_clock()-self.startTime
+        self.root.nodes=self.getNodeCount()-self._startNodes
+        if self._callback is not None:
+            om.MMessage.removeCallback(self._callback)
+            self._callback=None
+        _active=None
+        return False
+
+    def _nodeAdded(self,node,clientData):
+        self._created+=1
+
+    def getNodeCount(self):
+        '''return a node counter, only differences between calls are meaningful'''
+        if self._callback is not None:
+            return self._created
+        if cmds:
+            return len(cmds.ls() or [])
+        return 0
+
+    def getPhases(self):
+        '''return a list of (depth,Phase) for every recorded phase, in build order'''
+        return list(self.root.walk())
+
+    def getTable(self):
+        '''return the profile as a text table, one nested row per phase'''
+        total=self.root.duration or 1.0
+        lines=['%-50s %10s %10s %7s %8s'%('phase','total ms','self ms','%','nodes')]
+        for depth,item in self.root.walk():
+            lines.append('%-50s %10.1f %10.1f %6.1f%% %8d'%(
+                ('  '*depth+str(item.name))[:50],
+                item.duration*1000.0,
+                item.getSelfTime()*1000.0,
+                100.0*item.duration/total,
+                item.nodes))
+        return '\n'.join(lines)
+
+    def toDict(self):
+        '''return the profile as nested dicts, see Phase.toDict'''
+        return self.root.toDict()
+
+    def getChromeTrace(self):
+        '''return the profile in the chrome trace event format, as a dict'''
+        events=[]
+        for depth,item in self.root.walk():
+            events.append({
+                'name':str(item.name),
+                'cat':'build',
+                'ph':'X',
+                'ts':item.start*1e6,
+                'dur':item.duration*1e6,
+                'pid':1,
+                'tid':1,
+                'args':{'nodes':item.nodes},
+                })
+        return {'traceEvents':events,'displayTimeUnit':'ms'}
+
+    def writeJson(self,filePath):
+        '''write the nested profile to a json file'''
+        with open(filePath,'w') as f:
+            json.dump(self.toDict(),f,indent=2,sort_keys=True)
+
+    def writeChromeTrace(self,filePath):
+        '''write the profile as a chrome trace file, for chrome://tracing or perfetto'''
+        with open(filePath,'w') as f:
+            json.dump(self.getChromeTrace(),f)
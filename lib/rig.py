@@ -1,13 +1,50 @@
 '''
 library functions for working with rigs, useful for animation
 tools, like on a marking menu.
+
+Rigs store an index of their ctrls on the rig node when they are built (see
+storeRigIndex), so the lookups here are dict lookups instead of walking the scene. The
+index of a rig is read the first time one of its ctrls is looked up and kept for the
+session. Inside Maya the cached indexes and mirror tables are cleared whenever a scene
+is opened or made, or a reference is loaded, unloaded or removed (see
+addSceneCallbacks). Elsewhere call clearRigIndexes and clearMirrorTables after changing
+scenes. Cached ctrls are checked to still exist before they are used. Rigs built
+without an index are looked up in the scene like before.
 '''
-import maya.cmds as cmds
+import json
+
+from mpyr.lib.scene import cmds
+try:
+    import maya.api.OpenMaya as om
+except ImportError:
+    om = None
 
 import mpyr.lib.rigmath as rigmath
+import mpyr.lib.scene as mpScene
+import mpyr.lib.attr as mpAttr
+import mpyr.lib.xform as mpXform
 import mpyr.lib.ctrl as ctrl
+import mpyr.lib.joint as joint
 import mpyr.lib.name as name
 
+#mirror tables of the rigs used this session, see findMirrorCtrl
+_mirrorPairs = {}       #node: (mirror node,rig node), both ways
+_mirrorTables = set()   #rig nodes whose table has been read into _mirrorPairs
+
+#ctrl indexes of the rigs used this session, see getCtrlInfo
+RIGINDEXVERSION = 5
+_rigIndexes = {}        #rig node: index dict as stored, None for rigs without an index
+_ctrlIndex = {}         #ctrl: info dict, see getCtrlInfo
+_keyPlugs = {}          #rig node: {ctrl or limb attribute node: keyable plugs}, see getKeyPlugs
+_ctrlJoints = {}        #ctrl: joints it drives, see makeDriverGraph
+_jointCtrls = {}        #joint: ctrls driving it
+_driverRigs = set()     #rig nodes with every ctrl in _ctrlJoints, see markDriverGraph
+
+def unique(items):
+    '''return the items without repeats, in their first order'''
+    seen = set()
+    return [item for item in items if not (item in seen or seen.add(item))]
+
 def getSelectedCtrls():
     '''return a list of selected ctrls'''
     sel = cmds.ls(sl=True) or []
@@ -35,6 +72,9 @@ def getAllCtrlsByParent(obj):
 def getCharacter(obj):
     '''given an object in a character return the top node of the rig.
     Returns None if not found.'''
+    info = _ctrlIndex.get(obj)
+    if info and _isCached(obj,info['rig']):
+        return info['rig']
     fullName = cmds.ls(obj,l=True)[0]
     nameParts = fullName.split('|')
     nameParts.reverse()
@@ -43,8 +83,146 @@ def getCharacter(obj):
             return part
     return None
 
-def getLimbNode(ctrlName):
-    '''given a ctrl (or any node parented under a limb) return the limb node transform'''
+def storeRigIndex(rigNode,index):
+    '''save a ctrl index on the rig node as a json string and make it the cached index of
+    that rig. The index is a dict:
+        'version': RIGINDEXVERSION
+        'allCtrlSet': the set holding every ctrl
+        'limbs': {limb node: {'shape','set','setFK','setIK','ctrls'}}
+        'ctrls': {ctrl: {'limb','mirror','pickParents','pickChildren','snapParents',
+            'defaults','mirrorInfo','joints'}}
+    Names are stored without namespace. Missing sets and mirrors are None.'''
+    attr = rigNode+'.'+name.RIGINDEXATTR
+    if not cmds.objExists(attr):
+        cmds.addAttr(rigNode,ln=name.RIGINDEXATTR,dt='string')
+    cmds.setAttr(attr,json.dumps(index,sort_keys=True,separators=(',',':')),type='string')
+    clearRigIndexes() #a rebuilt rig may reuse the names of an old one
+    loadRigIndex(rigNode)
+
+def loadRigIndex(rigNode):
+    '''read the ctrl index stored on a rig node into the session cache and return it, or
+    None if the rig has no index (or one from another version of mpyr)'''
+    _rigIndexes[rigNode] = None
+    attr = rigNode+'.'+name.RIGINDEXATTR
+    if not cmds.objExists(attr):
+        return None
+    try:
+        index = json.loads(cmds.getAttr(attr) or '{}')
+    except ValueError:
+        return None
+    if index.get('version') != RIGINDEXVERSION:
+        return None
+    _rigIndexes[rigNode] = index
+
+    #add the namespace of referenced rigs to every name
+    namespace = rigNode.rpartition(':')[0]
+    prefix = namespace+':' if namespace else ''
+    def addPrefix(value):
+        if value is None:
+            return None
+        if isinstance(value,list):
+            return [prefix+item for item in value]
+        return prefix+value
+
+    allCtrlSet = addPrefix(index.get('allCtrlSet'))
+    allCtrls = addPrefix(list(index['ctrls']))
+    limbs = {}
+    for limbNode,limbData in index['limbs'].items():
+        limbInfo = dict((key,addPrefix(value)) for key,value in limbData.items())
+        limbInfo['limb'] = prefix+limbNode
+        limbs[limbNode] = limbInfo
+    for ctrlName,ctrlData in index['ctrls'].items():
+        info = {'rig':rigNode,'allCtrlSet':allCtrlSet,'allCtrls':allCtrls}
+        info.update(limbs[ctrlData['limb']])
+        info.update((key,addPrefix(value) if key in _INDEXNAMES else value) for key,value in ctrlData.items())
+        _ctrlIndex[prefix+ctrlName] = info
+        addDriverGraph({prefix+ctrlName:info['joints']})
+    return index
+
+#ctrl index keys that hold names, the rest is stored as is
+_INDEXNAMES = ('limb','mirror','pickParents','pickChildren','snapParents','joints')
+
+def dropRigIndex(rigNode):
+    '''delete the index stored on a rig node, so its ctrls are looked up in the scene. Used
+    when the rig changes after it is built.'''
+    if cmds.objExists(rigNode+'.'+name.RIGINDEXATTR):
+        cmds.deleteAttr(rigNode+'.'+name.RIGINDEXATTR)
+    clearRigIndexes()
+
+def clearRigIndexes():
+    '''forget the cached ctrl indexes, done by the scene callbacks inside Maya'''
+    _rigIndexes.clear()
+    _ctrlIndex.clear()
+    _keyPlugs.clear()
+    _ctrlJoints.clear()
+    _jointCtrls.clear()
+    _driverRigs.clear()
+
+def _isCached(node,rigNode):
+    '''return True if a node found in the session caches is still in the scene. If its
+    rig is gone too the scene changed, and every cache is cleared.'''
+    if cmds.objExists(node):
+        return True
+    if not cmds.objExists(rigNode):
+        _sceneChanged()
+    return False
+
+def _sceneChanged(*args):
+    '''forget everything cached about the rigs of the scene, it was closed or changed'''
+    clearRigIndexes()
+    clearMirrorTables()
+
+#MSceneMessage callback ids, see addSceneCallbacks. Kept when the module is reloaded, so
+#the callbacks added before can still be removed.
+_sceneCallbacks = globals().get('_sceneCallbacks',[])
+
+def addSceneCallbacks():
+    '''clear the session caches whenever a scene is opened or made, or a reference is
+    loaded, unloaded or removed. Done when this module is imported inside Maya.'''
+    removeSceneCallbacks()
+    if om is None:
+        return
+    for message in (om.MSceneMessage.kAfterOpen,om.MSceneMessage.kAfterNew,
+            om.MSceneMessage.kAfterLoadReference,om.MSceneMessage.kAfterUnloadReference,
+            om.MSceneMessage.kAfterRemoveReference):
+        _sceneCallbacks.append(om.MSceneMessage.addCallback(message,_sceneChanged))
+
+def removeSceneCallbacks():
+    '''remove the callbacks added by addSceneCallbacks'''
+    for callback in _sceneCallbacks:
+        om.MMessage.removeCallback(callback)
+    del _sceneCallbacks[:]
+
+addSceneCallbacks()
+
+def getCtrlInfo(ctrlName):
+    '''return the index info of a ctrl, or None if its rig has no index. Info is a dict of
+    'rig','limb','shape','set','setFK','setIK','ctrls' (of the limb),'allCtrlSet',
+    'allCtrls','mirror','pickParents','pickChildren','snapParents','defaults' (see
+    getCtrlDefaults), 'mirrorInfo' and 'joints' (it drives, see makeDriverGraph).
+    Don't change the dict or its lists, they are shared.'''
+    info = _ctrlIndex.get(ctrlName)
+    if info is not None:
+        return info if _isCached(ctrlName,info['rig']) else None
+    if not cmds.objExists(ctrlName):
+        return None
+    rigNode = getCharacter(ctrlName)
+    if rigNode and rigNode not in _rigIndexes:
+        loadRigIndex(rigNode)
+        return _ctrlIndex.get(ctrlName)
+    return None
+
+def getLimbNode(ctrlName,snapshot=None):
+    '''given a ctrl (or any node parented under a limb) return the limb node transform.
+    If a dag.HierarchySnapshot holding the ctrl is given the scene isn't queried.'''
+    info = getCtrlInfo(ctrlName)
+    if info:
+        return info['limb']
+    if snapshot and ctrlName in snapshot:
+        for par in [ctrlName]+snapshot.getAncestors(ctrlName):
+            if par.endswith(name.LIMBNAME):
+                return par
+        return None
     #walk up hierarchy looking for named limb node
     fullName = cmds.ls(ctrlName,long=True)[0]
     allPars = fullName.split('|')
@@ -57,6 +235,9 @@ def getLimbNode(ctrlName):
 def getLimbNodeShape(ctrlName):
     '''given an object in the limb return the instanced shape node that holds animatable
     limb attributes'''
+    info = getCtrlInfo(ctrlName)
+    if info:
+        return info['shape']
     limbNode = getLimbNode(ctrlName)
     if limbNode:
         return cmds.listRelatives(limbNode,s=True)[0]
@@ -66,6 +247,9 @@ def getCtrlSet(ctrlName):
     '''given a ctrl, return the ctrl object set. This is the
     set under the limb set that contains the ctrlsFK and ctrlsIK sets
     '''
+    info = getCtrlInfo(ctrlName)
+    if info:
+        return info['set']
     currentSets = cmds.listSets(object=ctrlName)
 
     for objSet in currentSets:
@@ -79,6 +263,9 @@ def getCtrlSet(ctrlName):
 def getAllCtrlSet(ctrlName):
     '''given a ctrl return the set that contains all ctrls.
     This is a set under the master set with every rig ctrl.'''
+    info = getCtrlInfo(ctrlName)
+    if info:
+        return info['allCtrlSet']
     currentSets = cmds.listSets(object=ctrlName)
     for objSet in currentSets:
         if objSet.endswith(name.SEP+name.ALLCTRLSET):
@@ -89,6 +276,9 @@ def getCtrlSetFK(ctrlName):
     '''given a ctrl, return the FK ctrl object set. A more specific version
     of getCtrlSet
     '''
+    info = getCtrlInfo(ctrlName)
+    if info:
+        return info['setFK']
     ctrlSet = getCtrlSet(ctrlName)
     contents = cmds.sets(ctrlSet,q=True)
     for objset in contents:
@@ -100,6 +290,9 @@ def getCtrlSetIK(ctrlName):
     '''given a ctrl, return the IK ctrl object set. A more specific version
     of getCtrlSet
     '''
+    info = getCtrlInfo(ctrlName)
+    if info:
+        return info['setIK']
     ctrlSet = getCtrlSet(ctrlName)
     contents = cmds.sets(ctrlSet,q=True)
     for objset in contents:
@@ -109,6 +302,9 @@ def getCtrlSetIK(ctrlName):
 
 def getLimbCtrls(ctrlName):
     '''given a ctrl return a list of all the ctrls in that limb'''
+    info = getCtrlInfo(ctrlName)
+    if info:
+        return list(info['ctrls'])
     ctrls = []
     limbSet = getCtrlSet(ctrlName)
     allSets = cmds.sets(limbSet,q=True)
@@ -122,75 +318,193 @@ def getLimbCtrls(ctrlName):
 
 def getAllCtrls(ctrlName):
     '''given a ctrl return list of all ctrls in the rig'''
+    info = getCtrlInfo(ctrlName)
+    if info:
+        return list(info['allCtrls'])
     allCtrlSet = getAllCtrlSet(ctrlName)
     if not allCtrlSet:
         raise RuntimeError("Rig all ctrls set not found, check ctrl set names")
     return cmds.sets(allCtrlSet,q=True)
 
+#constraints the driver graph looks through, joints driven by them count as driven by
+#their targets. Pole vector and scale constraints don't move joints, so they are skipped.
+DRIVERCONSTRAINTS = ('parentConstraint','pointConstraint','orientConstraint','aimConstraint')
+DRIVERHOPS = 8          #most connections followed from a ctrl to a joint
+
+#transform plugs that drive other nodes, as listConnections returns them long or short
+_DRIVERPLUGS = set(('t','tx','ty','tz','r','rx','ry','rz','translate','translateX','translateY',
+    'translateZ','rotate','rotateX','rotateY','rotateZ','matrix','worldMatrix','parentMatrix'))
+
+def _isDriverPlug(plug,isConstraint):
+    '''return True if the source plug (node.attr) of a connection moves what it drives'''
+    attr = plug.partition('.')[2]
+    if isConstraint:
+        return attr.startswith(('constraintTranslate','constraintRotate','ct','cr'))
+    return attr.partition('[')[0] in _DRIVERPLUGS
+
+def _getIKJoints(handle):
+    '''return the joints an ik handle moves, end joint first'''
+    startJoint = cmds.listConnections(handle+'.startJoint',s=1,d=0)
+    effector = cmds.listConnections(handle+'.endEffector',s=1,d=0)
+    endJoint = cmds.listConnections(effector[0]+'.tx',s=1,d=0) if effector else None
+    if not startJoint or not endJoint:
+        return []
+    return list(reversed(joint.getJointList(startJoint[0],endJoint[0])))
+
+def _getHelperJoints(joints):
+    '''return the given joints flagged not to be cached (see lib/cache.py), like the ik
+    stub joints of limbs. They are rig helpers, not part of the skeleton.'''
+    if not joints:
+        return []
+    plugs = cmds.ls(['%s.%s'%(jointName,name.CACHEATTR) for jointName in joints]) or []
+    return [plug.partition('.')[0] for plug in plugs if not cmds.getAttr(plug)]
+
+def makeDriverGraph(ctrls):
+    '''walk the connections from the given ctrls to the joints they drive, looking through
+    parent, point, orient and aim constraints, ik handles and the transforms in between.
+    Walking stops at joints and at the given ctrls, each hop queries all nodes at once.
+    Helper joints (see _getHelperJoints) are left out.
+    Returns a dict of ctrl: joints it drives and one of joint: ctrls driving it, nearest
+    first. Queries the scene, see getCtrlJoints for the cached maps.'''
+    ctrls = unique(ctrls)
+    ctrlJoints = dict((ctrlName,[]) for ctrlName in ctrls)
+    jointCtrls = {}
+    def addJoint(jointName,ctrlNames):
+        for ctrlName in ctrlNames:
+            if jointName not in ctrlJoints[ctrlName]:
+                ctrlJoints[ctrlName].append(jointName)
+                jointCtrls.setdefault(jointName,[]).append(ctrlName)
+
+    frontier = dict((ctrlName,[ctrlName]) for ctrlName in ctrls) #node: ctrls driving it
+    constraints = set()
+    seen = set(ctrls)
+    for hop in range(DRIVERHOPS):
+        if not frontier:
+            break
+        connections = cmds.listConnections(list(frontier),s=0,d=1,c=1,p=1) or []
+        driven = {}
+        targets = []
+        for srcPlug,dstPlug in zip(connections[::2],connections[1::2]):
+            source = srcPlug.partition('.')[0]
+            target = dstPlug.partition('.')[0]
+            if target in seen or not _isDriverPlug(srcPlug,source in constraints):
+                continue
+            if target not in driven:
+                driven[target] = []
+                targets.append(target)
+            for ctrlName in frontier[source]:
+                if ctrlName not in driven[target]:
+                    driven[target].append(ctrlName)
+        if not targets:
+            break
+        #joints, handles and constraints are transforms too, so they are sorted out first
+        joints = set(cmds.ls(targets,type='joint') or [])
+        handles = set(cmds.ls(targets,type='ikHandle') or [])
+        hopConstraints = set(cmds.ls(targets,type=list(DRIVERCONSTRAINTS)) or [])
+        hopConstraints -= set(cmds.ls(targets,type='poleVectorConstraint') or []) #a pointConstraint type
+        skipped = set(cmds.ls(targets,type='constraint') or []) - hopConstraints
+        transforms = set(cmds.ls(targets,type='transform') or [])
+        constraints.update(hopConstraints)
+        frontier = {}
+        for target in targets:
+            seen.add(target)
+            if target in joints:
+                addJoint(target,driven[target])
+            elif target in handles:
+                for jointName in _getIKJoints(target):
+                    addJoint(jointName,driven[target])
+            elif target in hopConstraints or (target in transforms and target not in skipped):
+                frontier[target] = driven[target]
+
+    #an ik end ctrl also drives the stub joint of its limb, keep the skeleton joints only
+    helpers = set(_getHelperJoints(list(jointCtrls)))
+    if helpers:
+        for ctrlName,joints in ctrlJoints.items():
+            ctrlJoints[ctrlName] = [jointName for jointName in joints if jointName not in helpers]
+        for jointName in helpers:
+            del jointCtrls[jointName]
+    return ctrlJoints,jointCtrls
+
+def addDriverGraph(ctrlJoints):
+    '''add a dict of ctrl: joints it drives (see makeDriverGraph) to the driver maps of
+    this session, where getJointFromCtrl and getCtrlFromJoint look first'''
+    for ctrlName,joints in ctrlJoints.items():
+        _ctrlJoints[ctrlName] = list(joints)
+        for jointName in joints:
+            ctrls = _jointCtrls.setdefault(jointName,[])
+            if ctrlName not in ctrls:
+                ctrls.append(ctrlName)
+
+def _checkDriverMaps(nodes):
+    '''return True if the nodes found in the driver maps are still in the scene. If one
+    is gone the maps are from another scene or an older rig, and every cache is cleared.'''
+    for node in nodes:
+        if not cmds.objExists(node):
+            _sceneChanged()
+            return False
+    return True
+
+def getCtrlJoints(ctrls):
+    '''return a dict of ctrl: joints it drives for the given ctrls, from the driver maps.
+    Ctrls that aren't in them are walked with one makeDriverGraph and added. The maps
+    are cleared with the rig indexes when the scene changes.'''
+    _checkDriverMaps([ctrlName for ctrlName in ctrls if ctrlName in _ctrlJoints])
+    for ctrlName in ctrls:
+        if ctrlName not in _ctrlJoints:
+            getCtrlInfo(ctrlName) #reads the index of the rig, joints included
+    missing = [ctrlName for ctrlName in ctrls if ctrlName not in _ctrlJoints]
+    if missing:
+        addDriverGraph(makeDriverGraph(missing)[0])
+    return dict((ctrlName,list(_ctrlJoints[ctrlName])) for ctrlName in ctrls)
+
+def markDriverGraph(rigNode):
+    '''mark every ctrl of a rig as being in the driver maps, so getCtrlFromJoint doesn't
+    walk the rig for joints no ctrl drives. Rigs mark themselves when they begin, their
+    limbs add their ctrls as they are built (see Limb.addDriverGraph).'''
+    _driverRigs.add(rigNode)
+
+def getDriverGraph(obj):
+    '''given an obj in a character return a dict of ctrl: joints it drives and one of
+    joint: ctrls driving it, for every ctrl of the character and nearest first. For tools
+    that retarget between ctrls and joints. Rigs without an index are walked once.'''
+    ctrlJoints = getCtrlJoints(getCharacterCtrls(obj))
+    jointCtrls = {}
+    for joints in ctrlJoints.values():
+        for jointName in joints:
+            jointCtrls[jointName] = [ctrlName for ctrlName in _jointCtrls[jointName] if ctrlName in ctrlJoints]
+    return ctrlJoints,jointCtrls
+
 def getJointFromCtrl(ctrlName):
-    '''given a ctrl find the joint it is driving, attempts to look through constraints'''
-    #put nodeTypes and their output attrs here
-    cnsAttrs = {
-        'pointConstraint':['ctx','cty','ctz'],
-        'orientConstraint':['crx','cry','crz'],
-        'parentConstraint':['ctx','cty','ctz','crx','cry','crz']
-        }
-    for attr in ('tr'):
-        for axis in (' xyz'):
-            connections = cmds.listConnections('%s.%s%s'%(ctrlName,attr,axis),s=0,d=1) or []
-            for connection in connections:
-                #test direct connection
-                if cmds.nodeType(connection) == 'joint':
-                    return connection
-                #test other nodes
-                try:
-                    for output in cnsAttrs[cmds.nodeType(connection)]:
-                        drivenObj = cmds.listConnections(connection+'.'+output, s=0,d=1)
-                        if not drivenObj:
-                            continue
-                        elif cmds.nodeType(drivenObj[0]) == 'joint':
-                            return drivenObj[0]
-                except KeyError:
-                    continue
-    return None
+    '''given a ctrl find the joint it is driving, looks through constraints and ik handles
+    (see makeDriverGraph). Returns the nearest joint, or None.'''
+    joints = getCtrlJoints([ctrlName])[ctrlName]
+    return joints[0] if joints else None
 
 def getCtrlFromJoint(jointName):
-    '''given a joint find the ctrl it is driving, attempts to look through constraints'''
-    cnsAttrs = {
-        'pointConstraint':['tg[0].tt'],
-        'orientConstraint':['tg[0].tr'],
-        'parentConstraint':['tg[0].tr','tg[0].tt']
-        }
-    for attr in ('tr'):
-        for axis in (' xyz'):
-            connections = cmds.listConnections('%s.%s%s'%(jointName,attr,axis),s=1,d=0) or []
-            for connection in connections:
-                #test direct connection
-                if cmds.nodeType(connection) == 'transform':
-                    return connection
-                #test other nodes
-                try:
-                    for output in cnsAttrs[cmds.nodeType(connection)]:
-                        drivenObj = cmds.listConnections(connection+'.'+output, s=1,d=0)
-                        if not drivenObj:
-                            continue
-                        elif cmds.nodeType(drivenObj[0]) == 'transform':
-                            return drivenObj[0]
-                except KeyError:
-                    continue
-    return None
+    '''given a joint find the ctrl driving it, looks through constraints and ik handles
+    (see makeDriverGraph). Returns the nearest ctrl, or None.'''
+    ctrls = _jointCtrls.get(jointName)
+    if ctrls is not None and not _checkDriverMaps([jointName,ctrls[0]]):
+        ctrls = None
+    if ctrls is None:
+        rigNode = getCharacter(jointName)
+        if rigNode and rigNode not in _rigIndexes and rigNode not in _driverRigs:
+            loadRigIndex(rigNode)
+        if rigNode and _rigIndexes.get(rigNode) is None and rigNode not in _driverRigs:
+            getDriverGraph(rigNode)
+            markDriverGraph(rigNode)
+        ctrls = _jointCtrls.get(jointName)
+    return ctrls[0] if ctrls else None
 
-def resetCtrl(ctrlName):
-    '''reset the given ctrl'''
+def queryCtrlDefaults(ctrlName):
+    '''return a dict of channel: default value of every channel a reset sets on the ctrl.
+    These are the transform channels and the keyable numeric user attributes that
+    aren't locked or connected. Queries the scene, see getCtrlDefaults.'''
+    defaults = {}
     for attr in ('srt'):
         for axis in ('xyz'):
-            dv = 0.0
-            if attr == 's':
-                dv = 1.0
-            try:
-                cmds.setAttr(ctrlName+'.%s%s'%(attr,axis),dv)
-            except RuntimeError:
-                pass
+            if cmds.getAttr(ctrlName+'.%s%s'%(attr,axis),settable=True):
+                defaults[attr+axis] = 1.0 if attr == 's' else 0.0
     for udAttr in cmds.listAttr(ctrlName,ud=True) or []:
         fullname = '%s.%s'%(ctrlName,udAttr)
         if not cmds.addAttr(fullname,q=True,k=True): #skip nonkeyable attributes
@@ -198,43 +512,91 @@ def resetCtrl(ctrlName):
         #float cast in try/except to skip/supress warnings for non numeric attrs
         try:
             float(cmds.getAttr(fullname))
-            default = cmds.addAttr(fullname,q=True,defaultValue=True)
-            cmds.setAttr(fullname,default)
         except (TypeError,RuntimeError):
             continue
+        if cmds.getAttr(fullname,settable=True):
+            defaults[udAttr] = cmds.addAttr(fullname,q=True,defaultValue=True)
+    return defaults
+
+def getCtrlDefaults(ctrlName):
+    '''return the dict of channel: default value used to reset the ctrl. Read from the
+    rig index, ctrls of rigs without one are queried.'''
+    info = getCtrlInfo(ctrlName)
+    if info:
+        return info['defaults']
+    return queryCtrlDefaults(ctrlName)
+
+@mpXform.invalidates
+def resetCtrls(ctrls):
+    '''reset every given ctrl as a single undo step. Transform channels are set
+    together, so most ctrls take one setAttr each for t, r and s.'''
+    with mpScene.UndoChunk('resetCtrls'):
+        for ctrlName in unique(ctrls):
+            #skip channels locked or connected since the rig was built
+            mpAttr.setChannels(ctrlName,getCtrlDefaults(ctrlName),skipLocked=True)
+
+def resetCtrl(ctrlName):
+    '''reset the given ctrl'''
+    resetCtrls([ctrlName])
         
 def resetSelectedCtrls():
     '''reset the current selection of ctrls'''
-    for ctrlName in getSelectedCtrls():
-        resetCtrl(ctrlName)
+    resetCtrls(getSelectedCtrls())
     
 def resetLimb(ctrlName):
     '''given a ctrl reset all ctrls in that limb'''
-    for lctrl in getLimbCtrls(ctrlName):
-        resetCtrl(lctrl)
+    resetCtrls(getLimbCtrls(ctrlName))
         
 def resetSelectedLimb():
     '''reset all limbs involved in the current ctrl selection'''
+    ctrls = []
     for ctrlName in getSelectedCtrls():
-        resetLimb(ctrlName)
+        if ctrlName not in ctrls: #already part of a limb found before
+            ctrls.extend(getLimbCtrls(ctrlName))
+    resetCtrls(ctrls)
+
+def getCharacterCtrls(obj):
+    '''given an obj in a character return all ctrls in that character'''
+    info = getCtrlInfo(obj)
+    if info:
+        return list(info['allCtrls'])
+    rigNode = getCharacter(obj)
+    index = None
+    if rigNode:
+        index = _rigIndexes[rigNode] if rigNode in _rigIndexes else loadRigIndex(rigNode)
+    if index:
+        #same names and order as the 'allCtrls' of getCtrlInfo
+        namespace = rigNode.rpartition(':')[0]
+        prefix = namespace+':' if namespace else ''
+        return [prefix+ctrlName for ctrlName in index['ctrls']]
+    return getAllCtrlsByParent(rigNode)
                 
 def resetCharacter(obj):
     '''given a obj in a character reset all ctrls in that character'''
-    for charCtrl in getAllCtrlsByParent(getCharacter(obj)):
-        resetCtrl(charCtrl)
+    resetCtrls(getCharacterCtrls(obj))
         
 def resetSelectedCharacter():
     '''reset the currently selected character(s)'''
     alreadyDone = []
+    ctrls = []
     for ctrlName in getSelectedCtrls():
         character = getCharacter(ctrlName)
         if character in alreadyDone:
             continue
         alreadyDone.append(character)
-        resetCharacter(ctrlName)
+        ctrls.extend(getCharacterCtrls(ctrlName))
+    resetCtrls(ctrls)
         
+def _rigChanged(*nodes):
+    '''drop the index of the rig these nodes are indexed in, it doesn't match any more'''
+    for node in nodes:
+        info = _ctrlIndex.get(node)
+        if info:
+            dropRigIndex(info['rig'])
+
 def addPickParent(ctrlName,parent):
     '''add a pickwalk parent to the given ctrl'''
+    _rigChanged(ctrlName,parent)
     if not cmds.objExists(ctrlName+'.pickParents'):
         cmds.addAttr(ctrlName,ln='pickParents',at='message',multi=True)
     if not cmds.objExists(parent+'.pickChildren'):
@@ -262,6 +624,7 @@ def addSnapParent(ctrlName,parent):
     creates a msg attribute that the tools follow later.
     Multiple snap parents are only used for ik aim controls.
     '''
+    _rigChanged(ctrlName,parent)
     if not cmds.objExists(ctrlName+'.snapParents'):
         cmds.addAttr(ctrlName,ln='snapParents',at='message',multi=True)
     if not cmds.objExists(parent+'.snapChildren'):
@@ -278,14 +641,29 @@ def addSnapParent(ctrlName,parent):
         ctrlName+'.snapParents[%s]'%childIndex,
         f=True) 
 
+def getSnapParents(ctrlName):
+    '''return the given ctrl's snap parents as a list'''
+    info = getCtrlInfo(ctrlName)
+    if info:
+        return list(info['snapParents'])
+    if cmds.objExists(ctrlName+'.snapParents'):
+        return cmds.listConnections(ctrlName+'.snapParents',s=1,d=0) or []
+    return []
+
 def getPickParents(ctrlName):
     '''return the given ctrl's pick Parents as a list'''
+    info = getCtrlInfo(ctrlName)
+    if info:
+        return list(info['pickParents'])
     if cmds.objExists(ctrlName+'.pickParents'):
         return cmds.listConnections(ctrlName+'.pickParents',s=1,d=0) or []
     return []
     
 def getPickChildren(ctrlName):
     '''return the given ctrl's pick children as a list'''
+    info = getCtrlInfo(ctrlName)
+    if info:
+        return list(info['pickChildren'])
     if cmds.objExists(ctrlName+'.pickChildren'):
         return cmds.listConnections(ctrlName+'.pickChildren',s=0,d=1) or []
     return []
@@ -330,70 +708,225 @@ def addMirrorInfo(ctrlName):
     
     cmds.setAttr(ctrlName+'.mirrorInfo', mirrorInfo[0], mirrorInfo[1], mirrorInfo[2])
 
-def getMirrorInfo(node):
-    '''returns a list of the node's mirror info data, or None if attr not found'''
+def queryMirrorInfo(node):
+    '''returns a list of the node's mirror info data, or None if attr not found.
+    Queries the scene, see getMirrorInfo'''
     if not cmds.objExists(node+'.mirrorInfo'):
         return None
     return cmds.getAttr(node+'.mirrorInfo')[0]
 
+def getMirrorInfo(node):
+    '''returns a list of the node's mirror info data, or None if attr not found'''
+    info = getCtrlInfo(node)
+    if info:
+        return info['mirrorInfo']
+    return queryMirrorInfo(node)
+
+def getMirrorName(node):
+    '''return the name node has on the other side of the rig, without checking that it
+    exists. Center nodes return their own name.'''
+    nameOfCtrl = name.Name(node)
+    preMirror = nameOfCtrl.get(noCheck=True)
+    nameOfCtrl.mirror()
+    postMirror = nameOfCtrl.get(noCheck=True)
+    return node.replace(preMirror,postMirror)
+
+def makeMirrorTable(nodes):
+    '''return a dict of node: mirror node for every node whose mirror is also in nodes,
+    both ways. Center nodes map to themselves. Names only, no scene queries.'''
+    nodeSet = set(nodes)
+    table = {}
+    for node in nodes:
+        other = getMirrorName(node)
+        if other in nodeSet:
+            table[node] = other
+            table[other] = node
+    return table
+
+def storeMirrorTable(rigNode,table):
+    '''save a mirror table on the rig node as a string of space separated pairs, and
+    make it the cached table of that rig'''
+    attr = rigNode+'.'+name.MIRRORPAIRSATTR
+    if not cmds.objExists(attr):
+        cmds.addAttr(rigNode,ln=name.MIRRORPAIRSATTR,dt='string')
+    pairs = sorted((node,other) for node,other in table.items() if node <= other)
+    cmds.setAttr(attr,' '.join('%s %s'%pair for pair in pairs),type='string')
+    clearMirrorTables() #a rebuilt rig may reuse the names of an old one
+    loadMirrorTable(rigNode)
+
+def loadMirrorTable(rigNode):
+    '''read the mirror table stored on a rig node into the session cache and return it
+    as a dict. The namespace of a referenced rig node is added to every name. Rigs built
+    before mirror tables existed return an empty dict.'''
+    _mirrorTables.add(rigNode)
+    attr = rigNode+'.'+name.MIRRORPAIRSATTR
+    if not cmds.objExists(attr):
+        return {}
+    namespace = rigNode.rpartition(':')[0]
+    prefix = namespace+':' if namespace else ''
+    names = (cmds.getAttr(attr) or '').split()
+    table = {}
+    for node,other in zip(names[0::2],names[1::2]):
+        table[prefix+node] = prefix+other
+        table[prefix+other] = prefix+node
+    _mirrorPairs.update((node,(other,rigNode)) for node,other in table.items())
+    return table
+
+def clearMirrorTables():
+    '''forget the cached mirror tables, done by the scene callbacks inside Maya'''
+    _mirrorPairs.clear()
+    _mirrorTables.clear()
+
 def findMirrorCtrl(node):
     '''return the mirror node for this node. 
     Return None if none found. Returns the same node on center nodes, since those get
     mirrored in place.
+    Nodes in the mirror table of their rig are a dict lookup once the table is loaded
+    (the first call for a rig loads it). Other nodes are mirrored by name.
     '''
-    nameOfCtrl = name.Name(node)
-    preMirror = nameOfCtrl.get(noCheck=True)
-    nameOfCtrl.mirror()
-    postMirror = nameOfCtrl.get(noCheck=True)
-    mirroredCtrlName = node.replace(preMirror,postMirror)
+    pair = _mirrorPairs.get(node)
+    if pair is not None and _isCached(pair[0],pair[1]):
+        return pair[0]
+    if not cmds.objExists(node):
+        return None
+    rigNode = getCharacter(node)
+    if rigNode and rigNode not in _mirrorTables:
+        other = loadMirrorTable(rigNode).get(node)
+        if other is not None:
+            return other
+    mirroredCtrlName = getMirrorName(node)
     if cmds.objExists(mirroredCtrlName):
         return mirroredCtrlName
     return None
     
+#mirror modes, see mirrorCtrls
+MIRROR = 'mirror'   #copy each ctrl onto its mirror ctrl, center ctrls are mirrored in place
+FLIP = 'flip'       #swap the poses of both sides, center ctrls are mirrored in place
+COPY = 'copy'       #copy each ctrl onto its mirror ctrl, center ctrls are left alone
+MIRRORMODES = (MIRROR,FLIP,COPY)
+
+def getMirrorTargets(ctrls,mode=MIRROR):
+    '''return a list of (source ctrl,target ctrl) pairs a mirror of the given ctrls
+    copies poses between, for one of the MIRRORMODES. Flip adds the mirror ctrls of the
+    given ctrls as sources too. The other modes skip ctrls that are the target of a
+    ctrl before them, like mirroring one ctrl after another would.'''
+    if mode not in MIRRORMODES:
+        raise RuntimeError('Unknown mirror mode %s, use one of %s'%(mode,', '.join(MIRRORMODES)))
+    ctrls = unique(ctrls)
+    ctrlSet = set(ctrls)
+    pairs = []
+    targets = set()
+    for ctrlName in ctrls:
+        other = findMirrorCtrl(ctrlName)
+        if not other or (other == ctrlName and mode == COPY):
+            continue
+        if mode != FLIP and ctrlName in targets:
+            continue
+        pairs.append((ctrlName,other))
+        targets.add(other)
+        if mode == FLIP and other != ctrlName and other not in ctrlSet:
+            pairs.append((other,ctrlName))
+    return pairs
+
+@mpXform.invalidates
+def mirrorCtrls(ctrls,mode=MIRROR):
+    '''mirror the pose of the given ctrls as a single undo step, see MIRRORMODES.
+    Every source ctrl is read before anything is set, with one getAttr for its translate
+    and one for its rotate, and the mirror info signs are applied to the whole vector.
+    Targets are set with one setAttr for each of translate and rotate where none of
+    their channels are locked.'''
+    pairs = getMirrorTargets(ctrls,mode)
+    poses = {}
+    for source,target in pairs:
+        if source not in poses:
+            mirrorInfo = getMirrorInfo(source)
+            if not mirrorInfo:
+                continue
+            translate = cmds.getAttr(source+'.t')[0]
+            rotate = cmds.getAttr(source+'.r')[0]
+            poses[source] = [value*sign for value,sign in zip(translate,mirrorInfo)]
+            poses[source] += [-value*sign for value,sign in zip(rotate,mirrorInfo)]
+    with mpScene.UndoChunk('mirrorCtrls'):
+        for source,target in pairs:
+            if source not in poses:
+                continue
+            settable = getCtrlDefaults(target)
+            values = dict((channel,value) for channel,value in zip(_MIRRORCHANNELS,poses[source])
+                if channel in settable)
+            mpAttr.setChannels(target,values,skipLocked=True)
+
+#channels mirrored by mirrorCtrls
+_MIRRORCHANNELS = ('tx','ty','tz','rx','ry','rz')
+
 def mirrorCtrl(ctrlName):
     '''copy this ctrl's pose onto its mirror ctrl'''
-    opCtrl = findMirrorCtrl(ctrlName)
-    if not opCtrl:
-        return
-    mirrorInfo = getMirrorInfo(ctrlName)
-    if not mirrorInfo:
-        return
-    #mirror to opCtrl
-    for index,attr in enumerate(['tx','ty','tz']):
-        try:
-            cmds.setAttr(opCtrl+'.'+attr, cmds.getAttr(ctrlName+'.'+attr) * mirrorInfo[index])
-        except RuntimeError:
-            pass #silently skip locked attrs
-    for index,attr in enumerate(['rx','ry','rz']):
-        try:
-            cmds.setAttr(opCtrl+'.'+attr, cmds.getAttr(ctrlName+'.'+attr) * mirrorInfo[index]*-1)
-        except RuntimeError:
-            pass #silently skip locked attrs
+    mirrorCtrls([ctrlName])
             
-def mirrorSelectedCtrls():
+def mirrorSelectedCtrls(mode=MIRROR):
     '''mirror each ctrl that is selected'''
-    for ctrlName in getSelectedCtrls():
-        mirrorCtrl(ctrlName)
-        
-def mirrorLimb(ctrlName):
-    '''given a ctrl copy its entire limb's pose onto the mirror limb'''
-    for lctrl in getLimbCtrls(ctrlName):
-        mirrorCtrl(lctrl)
-
-    #copy over limb attributes (like FKIK switches)
-    limbAttrNode = getLimbNodeShape(ctrlName)
-    otherLimbNode = findMirrorCtrl(ctrlName)
-    if limbAttrNode and otherLimbNode and (limbAttrNode!=otherLimbNode):
-        for attr in cmds.listAttr(limbAttrNode,ud=True) or []:
+    mirrorCtrls(getSelectedCtrls(),mode)
+
+def mirrorLimbAttrs(limbShapes,mode=MIRROR):
+    '''copy the animatable limb attributes (like FKIK switches) of the given limb
+    attribute nodes onto their mirror limbs, see MIRRORMODES'''
+    pairs = [(source,target) for source,target in getMirrorTargets(limbShapes,mode) if source != target]
+    #read every source before anything is set, so flipped limbs swap their values
+    values = {}
+    for source,target in pairs:
+        if source not in values:
+            values[source] = [(attr,cmds.getAttr('%s.%s'%(source,attr)))
+                for attr in cmds.listAttr(source,ud=True) or []]
+    for source,target in pairs:
+        for attr,value in values[source]:
             try:
-                cmds.setAttr('%s.%s'%(otherLimbNode,attr), cmds.getAttr('%s.%s'%(limbAttrNode,attr)))
+                cmds.setAttr('%s.%s'%(target,attr),value)
             except RuntimeError:
-                print 'failed to mirror limb attribute %s.%s'%(limbAttrNode,attr)
+                print('failed to mirror limb attribute %s.%s'%(source,attr))
+
+@mpXform.invalidates
+def mirrorLimbs(ctrls,mode=MIRROR):
+    '''mirror every limb the given ctrls are in once, with its limb attributes, as a
+    single undo step'''
+    limbCtrls = []
+    limbShapes = []
+    done = set()
+    for ctrlName in ctrls:
+        if ctrlName in done: #limb already added
+            continue
+        limbCtrls.extend(getLimbCtrls(ctrlName))
+        done.update(limbCtrls)
+        limbAttrNode = getLimbNodeShape(ctrlName)
+        if limbAttrNode:
+            limbShapes.append(limbAttrNode)
+    with mpScene.UndoChunk('mirrorLimbs'):
+        mirrorCtrls(limbCtrls,mode)
+        mirrorLimbAttrs(limbShapes,mode)
+
+def mirrorLimb(ctrlName,mode=MIRROR):
+    '''given a ctrl copy its entire limb's pose onto the mirror limb'''
+    mirrorLimbs([ctrlName],mode)
 
-def mirrorSelectedLimbs():
+def mirrorSelectedLimbs(mode=MIRROR):
     '''mirror every limb involved in the current ctrl selection'''
+    mirrorLimbs(getSelectedCtrls(),mode)
+
+def mirrorCharacter(obj,mode=FLIP,side=name.LEFT):
+    '''mirror the whole character obj is in as a single undo step. Flip mirrors the
+    entire pose, the other modes copy the given side onto the other side.'''
+    ctrls = getCharacterCtrls(obj)
+    if mode != FLIP:
+        ctrls = [ctrlName for ctrlName in ctrls if name.Name(ctrlName).loc in (side,name.MID)]
+    mirrorLimbs(ctrls,mode)
+
+def mirrorSelectedCharacters(mode=FLIP,side=name.LEFT):
+    '''mirror every character involved in the current ctrl selection'''
+    alreadyDone = []
     for ctrlName in getSelectedCtrls():
-        mirrorLimb(ctrlName)
+        character = getCharacter(ctrlName)
+        if character in alreadyDone:
+            continue
+        alreadyDone.append(character)
+        mirrorCharacter(ctrlName,mode,side)
 
 def pickWalkUp(ctrls=None,add=False):
     '''performs a pickwalk up. If add = True the selection is added instead of replaced
@@ -412,7 +945,7 @@ def pickWalkUp(ctrls=None,add=False):
         if pars:
             newSelectionList.extend(pars)
     if newSelectionList:
-        cmds.select(newSelectionList,r=True)
+        cmds.select(unique(newSelectionList),r=True)
         
 def pickWalkDown(ctrls=None,add=False):
     '''performs a pickwalk down. If add=True the selection is added instead of replaced
@@ -431,7 +964,77 @@ def pickWalkDown(ctrls=None,add=False):
         if children:
             newSelectionList.extend(children)
     if newSelectionList:
-        cmds.select(newSelectionList,r=True)
+        cmds.select(unique(newSelectionList),r=True)
+
+def getPickGraph(obj):
+    '''return the pickwalk graph of the character obj is in, as a dict of ctrl: pick
+    parents and a dict of ctrl: pick children. Links across limbs are included.'''
+    parents = {}
+    children = {}
+    for ctrlName in getCharacterCtrls(obj):
+        parents[ctrlName] = getPickParents(ctrlName)
+        children[ctrlName] = getPickChildren(ctrlName)
+    return parents,children
+
+def getPickDescendants(ctrlName):
+    '''return every ctrl below the given ctrl in the pickwalk graph, nearest first'''
+    descendants = []
+    seen = set([ctrlName])
+    current = [ctrlName]
+    while current:
+        below = []
+        for node in current:
+            for child in getPickChildren(node):
+                if child not in seen:
+                    seen.add(child)
+                    below.append(child)
+        descendants.extend(below)
+        current = below
+    return descendants
+
+def getPickChain(ctrlName):
+    '''return the unbranched pickwalk chain the given ctrl is in (like a finger), top
+    first. The chain goes up and down from the ctrl until a ctrl branches.'''
+    up = []
+    seen = set([ctrlName])
+    node = ctrlName
+    while True:
+        parents = getPickParents(node)
+        if len(parents) != 1 or parents[0] in seen or len(getPickChildren(parents[0])) != 1:
+            break
+        node = parents[0]
+        seen.add(node)
+        up.append(node)
+    down = []
+    node = ctrlName
+    while True:
+        children = getPickChildren(node)
+        if len(children) != 1 or children[0] in seen or len(getPickParents(children[0])) != 1:
+            break
+        node = children[0]
+        seen.add(node)
+        down.append(node)
+    up.reverse()
+    return up+[ctrlName]+down
+
+def _selectFromPickGraph(getter,ctrls,add):
+    if not ctrls:
+        ctrls = cmds.ls(sl=True) or []
+    newSelectionList = cmds.ls(sl=True) or [] if add else []
+    for ctrlName in ctrls:
+        newSelectionList.extend(getter(ctrlName))
+    if newSelectionList:
+        cmds.select(unique(newSelectionList),r=True)
+
+def selectPickHierarchy(ctrls=None,add=False):
+    '''select the given ctrls and everything below them in the pickwalk graph. If no ctrl
+    list is given the current selection is used'''
+    _selectFromPickGraph(lambda ctrlName:[ctrlName]+getPickDescendants(ctrlName),ctrls,add)
+
+def selectPickChain(ctrls=None,add=False):
+    '''select the unbranched pickwalk chain of each given ctrl (see getPickChain). If
+    no ctrl list is given the current selection is used'''
+    _selectFromPickGraph(getPickChain,ctrls,add)
             
 def selectLimb(ctrlName):
     '''given a ctrl select the entire limb ctrls'''
@@ -462,55 +1065,139 @@ def selectSelectedCharacters():
     list(set(selList))
     cmds.select(selList,r=True)
     
-def keyCtrl(ctrlName):
+def _queryKeyPlugs(node,userDefined=False):
+    '''return the keyable plugs of a node'''
+    return ['%s.%s'%(node,attr) for attr in cmds.listAttr(node,k=True,ud=userDefined) or []]
+
+def _getCharacterKeyPlugs(obj):
+    '''return the dict of node: keyable plugs of the character obj is in, see
+    _getRigKeyPlugs. None if obj isn't in a character.'''
+    rigNode = getCharacter(obj)
+    if not rigNode:
+        return None
+    return _getRigKeyPlugs(rigNode)
+
+def _getRigKeyPlugs(rigNode):
+    '''return the dict of node: keyable plugs of a rig, made once per rig for the session
+    (the scene callbacks clear it). The rig node is checked on every call, None if it is
+    gone.'''
+    if not _isCached(rigNode,rigNode):
+        return None
+    plugs = _keyPlugs.get(rigNode)
+    if plugs is None:
+        plugs = {}
+        for ctrlName in getCharacterCtrls(rigNode):
+            plugs[ctrlName] = _queryKeyPlugs(ctrlName)
+            limbShape = getLimbNodeShape(ctrlName)
+            if limbShape and limbShape not in plugs:
+                plugs[limbShape] = _queryKeyPlugs(limbShape,userDefined=True)
+        _keyPlugs[rigNode] = plugs
+    return plugs
+
+#long names of transform channels, listAttr returns those
+_LONGCHANNELS = {'t':'translate','r':'rotate','s':'scale','v':'visibility'}
+
+def _expandChannels(channels):
+    '''return the set of attribute names for a channel filter. 't','r','s' stand for
+    their x,y,z channels, and transform channels match their short and long names.'''
+    expanded = set()
+    for channel in channels:
+        expanded.add(channel)
+        if channel in ('t','r','s'):
+            for axis in 'xyz':
+                expanded.update((channel+axis,_LONGCHANNELS[channel]+axis.upper()))
+        elif channel in _LONGCHANNELS:
+            expanded.add(_LONGCHANNELS[channel])
+        elif len(channel) == 2 and channel[0] in 'trs' and channel[1] in 'xyz':
+            expanded.add(_LONGCHANNELS[channel[0]]+channel[1].upper())
+    return expanded
+
+def getKeyPlugs(ctrls,limbAttrs=False,channels=None):
+    '''return the list of keyable plugs of the given ctrls. With limbAttrs the
+    animatable attributes of their limbs are added. channels is an optional list of
+    attribute names to key, like ['t','rx','FKIK'].
+    Plugs are looked up in a table made once per character. Ctrls of indexed rigs find
+    their rig in the index, and each rig is checked once per call.'''
+    plugs = []
+    done = set()
+    tables = {} #rig node: plug table, None if the rig is gone
+    for ctrlName in ctrls:
+        info = _ctrlIndex.get(ctrlName)
+        if info is not None and info['rig'] not in tables:
+            tables[info['rig']] = _getRigKeyPlugs(info['rig'])
+            info = _ctrlIndex.get(ctrlName) #cleared if the rig was gone
+        table = tables.get(info['rig']) if info is not None else None
+        if table is None:
+            #not indexed, or indexed in a scene that is gone: look the ctrl up
+            table = _getCharacterKeyPlugs(ctrlName) or {}
+            limbShape = getLimbNodeShape(ctrlName) if limbAttrs else None
+        else:
+            limbShape = info['shape']
+        nodes = [ctrlName]
+        if limbAttrs:
+            nodes.append(limbShape)
+        for node in nodes:
+            if not node or node in done:
+                continue
+            done.add(node)
+            if node in table:
+                plugs.extend(table[node])
+            else:
+                plugs.extend(_queryKeyPlugs(node,userDefined=(node != ctrlName)))
+    if channels is not None:
+        channels = _expandChannels(channels)
+        plugs = [plug for plug in plugs if plug.rpartition('.')[2] in channels]
+    return plugs
+
+def keyCtrls(ctrls,limbAttrs=False,breakdown=False,channels=None):
+    '''key the given ctrls with a single setKeyframe call. See getKeyPlugs for limbAttrs
+    and channels, breakdown sets breakdown keys.'''
+    plugs = getKeyPlugs(ctrls,limbAttrs,channels)
+    if plugs:
+        cmds.setKeyframe(plugs,breakdown=breakdown)
+
+def keyCtrl(ctrlName,breakdown=False,channels=None):
     '''add a keyframe to the ctrl'''
-    cmds.setKeyframe(ctrlName,hierarchy='none',controlPoints=False,shape=False,breakdown=0)
+    keyCtrls([ctrlName],breakdown=breakdown,channels=channels)
+
+def keySelectedCtrls(breakdown=False,channels=None):
+    '''key the selected ctrls'''
+    keyCtrls(getSelectedCtrls(),breakdown=breakdown,channels=channels)
     
-def keyLimb(ctrlName):
-    '''given a ctrl key the entire limb'''
-    doneNodes=[]
-    for kctrl in getLimbCtrls(ctrlName):
-        if kctrl not in doneNodes:
-            keyCtrl(kctrl)
-        limbShape = getLimbNodeShape(kctrl)
-        if limbShape in doneNodes:
-            for attr in cmds.listAttr(limbShape,k=True,ud=True) or []:
-                cmds.setKeyframe('%s.%s'%(limbShape,attr))
-        doneNodes.append(kctrl)
-        doneNodes.append(limbShape)
+def keyLimb(ctrlName,breakdown=False,channels=None):
+    '''given a ctrl key the entire limb, with its limb attributes'''
+    keyCtrls(getLimbCtrls(ctrlName),True,breakdown,channels)
         
-def keySelectedLimb():
+def keySelectedLimb(breakdown=False,channels=None):
     '''key every limb involved in the current selection'''
-    doneLimbs=[]
+    ctrls = []
+    done = set()
     for ctrlName in getSelectedCtrls():
-        limbNode = getLimbNode(ctrlName)
-        if limbNode not in doneLimbs:
-            keyLimb(ctrlName)
-        doneLimbs.append(limbNode)
+        if ctrlName not in done: #limb not added yet
+            limbCtrls = getLimbCtrls(ctrlName)
+            ctrls.extend(limbCtrls)
+            done.update(limbCtrls)
+    keyCtrls(ctrls,True,breakdown,channels)
+
+def keyCharacter(obj,breakdown=False,channels=None):
+    '''given an obj in a character key every ctrl and limb attribute of it'''
+    keyCtrls(getCharacterCtrls(obj),True,breakdown,channels)
         
-def keySelectedCharacter():
+def keySelectedCharacter(breakdown=False,channels=None):
     '''key every ctrl on every character involved in the current selection'''
-    ctrls = getSelectedCtrls()
-    if not ctrls:
-        return
-    limbNodes=[]
-    for ctrlName in getAllCtrls(ctrls[0]):
-        cmds.setKeyframe(ctrlName,hierarchy='none',shape=0)
-        limbNodes.append(getLimbNodeShape(ctrlName))
-    limbNodes=set(limbNodes) #remove duplicates
-    for limb in limbNodes:
-        for attr in cmds.listAttr(limb,k=True,ud=True) or []:
-            cmds.setKeyframe('%s.%s'%(limb,attr))
+    alreadyDone = []
+    ctrls = []
+    for ctrlName in getSelectedCtrls():
+        character = getCharacter(ctrlName)
+        if character in alreadyDone:
+            continue
+        alreadyDone.append(character)
+        ctrls.extend(getCharacterCtrls(ctrlName))
+    keyCtrls(ctrls,True,breakdown,channels)
 
-def getAimVector(start,mid,end,distance=0.5):
-    '''Given three points (like shoulder,elbow,wrist joints) compute vector for aim
-    location. This can be used to create/snap IK aim in a way that won't move an existing
-    chain. Distance is a cosmetic multiplier.
-    Returns Vector object of aim position.
-    '''
-    startV = rigmath.Vector(start)
-    midV = rigmath.Vector(mid)
-    endV = rigmath.Vector(end)
+def getAimPosition(startV,midV,endV,distance=0.5):
+    '''Given three Vectors (like shoulder,elbow,wrist positions) compute the aim position,
+    see getAimVector. Returns Vector object of aim position.'''
     chainV = endV-startV
     upperV = midV-startV
     chainLength = chainV.length()
@@ -528,80 +1215,141 @@ def getAimVector(start,mid,end,distance=0.5):
     aimV = elbowV*chainLength*distance #get an aethetic distance from the chain
     aimV += midV 
     return aimV
-            
-def snapIKFK(ikctrl):
-    '''Given an ik ctrl, snap the ik to the fk for that limb.  Uses messages on the ikctrl to find fk ctrls.
-    pvPosMult: increase distance of poleVector control. Doesn't affect IK solution, just distance.
+
+def getAimVector(start,mid,end,distance=0.5):
+    '''Given three points (like shoulder,elbow,wrist joints) compute vector for aim
+    location. This can be used to create/snap IK aim in a way that won't move an existing
+    chain. Distance is a cosmetic multiplier.
+    Returns Vector object of aim position.
     '''
-    # get all IK ctrls
-    ikCtrlSet = getCtrlSetIK(ikctrl) or [ikctrl]
-    allIKCtrls = cmds.sets(ikCtrlSet,q=True)
-
-    #loop through twice, first doing end ctrls, then doing aims
-    results = dict()
-    for ctrlName in allIKCtrls:
-        if not cmds.objExists(ctrlName+'.snapParents'):
-            results[ctrlName]=None
-            continue
-        snapParents = cmds.listConnections(ctrlName+'.snapParents',s=1,d=0) or []
-        #if there is one snap parent this is an end effector ctrl
-        #do a simple snap
-        if len(snapParents)==1:
-            results[ctrlName]=cmds.xform(snapParents[0],q=True,ws=True,m=True)
-            
+    startV,midV,endV = rigmath.getVectors([start,mid,end])
+    return getAimPosition(startV,midV,endV,distance)
 
-    for ctrlName in allIKCtrls:
-        if not cmds.objExists(ctrlName+'.snapParents'):
-            results[ctrlName]=None
-            continue
-        snapParents = cmds.listConnections(ctrlName+'.snapParents',s=1,d=0) or []
-        #Use three parents to compute aim position
-        if len(snapParents)==3:
-            aimV = getAimVector(snapParents[0],snapParents[1],snapParents[2])
-            aimXform = rigmath.Transform(aimV)
-            results[ctrlName]=aimXform.get()
-
-    #bug fix for some IK limbs that need multiple snaps to reach the goal
-    #This is because IK hierarchies can be arbitrary, and it's difficult to determine
-    #which controls move others, so this takes an iterative approach
-    for i in range(4):
-        for ctrlName,value in results.iteritems():
-            if not value:
-                resetCtrl(ctrlName)
-            else:
-                cmds.xform(ctrlName,ws=True,m=value)
+def getAimVectors(starts,mids,ends,distance=0.5):
+    '''getAimVector for many chains (like one arm on many frames) at once. Takes lists of
+    positions, returns a list of Vectors. Computed as arrays when numpy is available.'''
+    if not rigmath.numpy:
+        return [getAimPosition(rigmath.Vector(start),rigmath.Vector(mid),rigmath.Vector(end),distance)
+            for start,mid,end in zip(starts,mids,ends)]
+    startV,midV,endV = [rigmath.VectorArray(list(items)) for items in (starts,mids,ends)]
+    chainV = endV-startV
+    upperV = midV-startV
+    chainLength = chainV.length()
+    chainV.normalize()
+    upperV.normalize()
+    elbowV = chainV.cross(upperV).cross(chainV)
+    elbowV.normalize()
+    if len(chainLength) and rigmath.numpy.max(rigmath.numpy.abs(chainV.dot(upperV))) > 0.998:
+        raise RuntimeError("Cannot calculate aim, is chain hyper extended?")
+    return (elbowV*(chainLength*distance)+midV).getVectors()
+
+#IK/FK snapping, see snapLimb
+SNAPPASSES = 8          #most times the ctrls are set on one frame before giving up
+SNAPTOLERANCE = 1e-5    #world matrix values closer than this count as the same
+
+def getSnapMatrices(targets,frameMatrices):
+    '''given a list of (ctrl,snap parents) and a list of {node: world matrix} of the snap
+    parents on each frame, return a list of {ctrl: world matrix} to snap to on each frame.
+    Ctrls with one snap parent get its matrix, ctrls with three (IK aims) the aim position
+    of the three, computed for every frame at once.'''
+    result = [{} for matrices in frameMatrices]
+    for ctrlName,snapParents in targets:
+        if len(snapParents) == 1:
+            for ctrlMatrices,matrices in zip(result,frameMatrices):
+                ctrlMatrices[ctrlName] = matrices[snapParents[0]]
+        elif len(snapParents) == 3:
+            positions = [[matrices[parent][12:15] for matrices in frameMatrices] for parent in snapParents]
+            for ctrlMatrices,aimV in zip(result,getAimVectors(*positions)):
+                ctrlMatrices[ctrlName] = rigmath.Transform(aimV).get()
+    return result
+
+def _isClose(matrices,others):
+    for matrix,other in zip(matrices,others):
+        for value,otherValue in zip(matrix,other):
+            if abs(value-otherValue) > SNAPTOLERANCE:
+                return False
+    return True
 
-    # Turn on IK
-    limbNode = getLimbNodeShape(allIKCtrls[0])
-    cmds.setAttr(limbNode+'.'+name.FKIKBLENDATTR,1)
+def setWorldMatrices(ctrlMatrices):
+    '''set ctrls to a dict of ctrl: world matrix. IK hierarchies can be arbitrary and
+    setting one ctrl may move another, so the ctrls are set again until they are where
+    they should be, or stop moving (locked channels), at most SNAPPASSES times.
+    Returns the number of passes made.'''
+    ctrls = list(ctrlMatrices)
+    wanted = [ctrlMatrices[ctrlName] for ctrlName in ctrls]
+    previous = None
+    for passCount in range(1,SNAPPASSES+1):
+        for ctrlName,matrix in zip(ctrls,wanted):
+            cmds.xform(ctrlName,ws=True,m=matrix)
+        current = mpXform.getWorldMatrices(ctrls)
+        if _isClose(current,wanted) or (previous and _isClose(current,previous)):
+            break
+        previous = current
+    return passCount
+
+@mpXform.invalidates
+def snapLimb(ctrlName,toIK,frames=None,key=None):
+    '''switch the limb of ctrlName to IK (toIK=True) or FK, matching the pose of the other
+    side. IK ctrls snap to the FK ctrls, FK ctrls snap to the joints.
+    frames: list of frames to snap, the current frame only if None.
+    key: key the snapped ctrls and the FKIK attribute on every frame. Defaults to True
+    when frames are given.
+    The snap parents are sampled on every frame in one pass before anything is set, the
+    snap matrices of all frames are computed together and each frame is keyed with a
+    single setKeyframe. Ctrls without snap parents are reset on every frame before it is
+    keyed. Runs as a single undo step.'''
+    ctrlSet = getCtrlSetIK(ctrlName) if toIK else getCtrlSetFK(ctrlName)
+    ctrls = cmds.sets(ctrlSet,q=True) if ctrlSet else [ctrlName]
+    targets = [(snapCtrl,getSnapParents(snapCtrl)) for snapCtrl in ctrls]
+    blendPlug = getLimbNodeShape(ctrls[0])+'.'+name.FKIKBLENDATTR
+    currentFrame = cmds.currentTime(q=True)
+    if key is None:
+        key = frames is not None
+    if frames is None:
+        frames = [currentFrame]
+
+    #sample every snap parent on every frame, then compute where the ctrls go
+    sources = unique(parent for snapCtrl,snapParents in targets for parent in snapParents)
+    sampled = mpXform.getWorldMatricesAtFrames(sources,frames) if sources else [[] for frame in frames]
+    snapMatrices = getSnapMatrices(targets,[dict(zip(sources,matrices)) for matrices in sampled])
+    keyPlugs = getKeyPlugs(ctrls,channels=['t','r'])+[blendPlug] if key else []
+
+    #ctrls without snap parents go to their default pose
+    resetList = [snapCtrl for snapCtrl,snapParents in targets if not snapParents]
+
+    with mpScene.UndoChunk('snapLimb'):
+        time = currentFrame
+        for frame,ctrlMatrices in zip(frames,snapMatrices):
+            if frame != time:
+                time = cmds.currentTime(frame,update=True)
+            #reset on every frame, changing frame evaluates their animation again
+            resetCtrls(resetList)
+            setWorldMatrices(ctrlMatrices)
+            cmds.setAttr(blendPlug,1 if toIK else 0)
+            if keyPlugs:
+                cmds.setKeyframe(keyPlugs,t=frame)
+        if time != currentFrame:
+            cmds.currentTime(currentFrame,update=True)
+
+def snapLimbRange(ctrlName,toIK,start,end,step=1):
+    '''switch the limb of ctrlName to IK or FK on every frame from start to end, keying
+    it, see snapLimb'''
+    frames = []
+    frame = start
+    while frame <= end:
+        frames.append(frame)
+        frame += step
+    snapLimb(ctrlName,toIK,frames)
+
+def snapIKFK(ikctrl):
+    '''Given an ik ctrl, snap the ik to the fk for that limb.  Uses messages on the ikctrl to find fk ctrls.'''
+    snapLimb(ikctrl,True)
 
 def snapFKIK(fkctrl):
     ''' given an fk ctrl, snap all of the fkctrls to the ik joints.  
     Uses messages on the ikctrl to find fk ctrls. 
     '''
-    # get all IK ctrls
-    fkCtrlSet = getCtrlSetFK(fkctrl) or [fkctrl]
-    allFKCtrls = cmds.sets(fkCtrlSet,q=True)
-
-    #loop through getting transforms, then apply them.
-    results = dict()
-    for fkCtrl in allFKCtrls:
-        if not cmds.objExists(fkCtrl+'.snapParents'):
-            results[fkCtrl]=None 
-            continue
-        snapParents = cmds.listConnections(fkCtrl+'.snapParents',s=1,d=0) or []
-        if len(snapParents)==1:
-            results[fkCtrl]=cmds.xform(snapParents[0],q=True,ws=True,m=True)
-            
-    for fkCtrl,value in results.iteritems():
-        if not value:
-            resetCtrl(fkCtrl)
-        else:
-            cmds.xform(fkCtrl,ws=True,m=value)
-    
-    # Turn on FK
-    limbNode = getLimbNodeShape(allFKCtrls[0])
-    cmds.setAttr(limbNode+'.'+name.FKIKBLENDATTR,0)
+    snapLimb(fkctrl,False)
     
 def snapSelectedIKFKCtrl():
     '''Snap IK to FK'''
@@ -611,4 +1359,4 @@ def snapSelectedIKFKCtrl():
     if sel.find('FK') != -1:
         snapIKFK(cmds.listConnections(attrctrl+'.IK')[0])
     else:
-        snapFKIK(cmds.listConnections(attrctrl+'.startFK')[0])
\ No newline at end of file
+        snapFKIK(cmds.listConnections(attrctrl+'.startFK')[0])
@@ -9,14 +9,53 @@ uses the world matrix, or by default just an identity matrix.
 
 Vectors and Transforms can be multiplied/added/subtracted with each other, where it 
 makes sense.
+
+Quaternion represents a rotation. It converts to and from Transforms and can be
+multiplied, inverted and interpolated (lerp/slerp), which is handy for blending poses.
+
+VectorArray, TransformArray and QuaternionArray hold many values in a single numpy buffer
+and do the same math on every element at once. They are useful when working on whole
+chains or skeletons, and convert to and from the single value classes without loss.
+They require numpy.
+
+Vectors and Transforms made from object names query Maya through lib.xform, so they
+use its world matrix cache when one is open.
+
 This module can be used outside of maya, however some methods that query maya objects will fail.
 
 '''
 import math
+from mpyr.lib.scene import cmds
+import mpyr.lib.xform as mpXform
+try:
+    _stringTypes=(basestring,)
+    _numberTypes=(int,long,float)
+except NameError:
+    _stringTypes=(str,)
+    _numberTypes=(int,float)
 try:
-    import maya.cmds as cmds
+    import numpy
 except ImportError:
-    cmds=None
+    numpy=None
+
+#quaternions closer than this (by dot product) are lerped instead of slerped
+SLERPTHRESHOLD=0.9995
+
+#rotation order -> (first,second,third) axis index and parity, used to decompose eulers
+EULERORDERS={
+    'xyz':(0,1,2,1.0),
+    'yzx':(1,2,0,1.0),
+    'zxy':(2,0,1,1.0),
+    'xzy':(0,2,1,-1.0),
+    'yxz':(1,0,2,-1.0),
+    'zyx':(2,1,0,-1.0)
+    }
+
+#axes whose cosine between them is below this are treated as perpendicular
+ORTHOTOLERANCE=1e-9
+
+#sine of the middle euler angle above which a decomposition is treated as gimbal locked
+GIMBALTHRESHOLD=1.0-1e-9
 
 def degToRad(deg):
     '''convert degree to radians'''
@@ -25,18 +64,84 @@ def degToRad(deg):
 def radToDeg(rad):
     '''convert radians to degrees'''
     return 180.0*rad/math.pi
+
+def getVectors(items):
+    '''cast a list of Vectors, lists or maya object names to a list of Vectors. Object
+    names are queried in one pass.'''
+    nodes=[item for item in items if isinstance(item,_stringTypes)]
+    positions=dict(zip(nodes,mpXform.getWorldTranslations(nodes)))
+    return [Vector(positions[item]) if isinstance(item,_stringTypes) else Vector(item) for item in items]
+
+def getTransforms(items):
+    '''cast a list of Transforms, lists or maya object names to a list of Transforms.
+    Object names are queried in one pass.'''
+    nodes=[item for item in items if isinstance(item,_stringTypes)]
+    matrices=dict(zip(nodes,mpXform.getWorldMatrices(nodes)))
+    return [Transform(matrices[item]) if isinstance(item,_stringTypes) else Transform(item) for item in items]
+
+def _closestEuler(angles,previous,order,locked=False):
+    '''given [x,y,z] euler angles in degrees return the equivalent angles for the given
+    order that are closest to previous [x,y,z] angles. If locked is True the angles are
+    gimbal locked and the third angle is kept from previous.'''
+    i,j,k,parity=EULERORDERS[order.lower()]
+    angles=list(angles)
+    if locked:
+        #first and third axis line up, trade the third angle for the first
+        sign=parity if angles[j]>0 else -parity
+        angles[i]+=sign*previous[k]
+        angles[k]=previous[k]
+    other=list(angles)
+    other[i]+=180.0
+    other[j]=180.0-other[j]
+    other[k]+=180.0
+    best=None
+    bestDistance=None
+    for candidate in (angles,other):
+        candidate=[angle+360.0*round((prev-angle)/360.0) for angle,prev in zip(candidate,previous)]
+        distance=sum([abs(prev-angle) for angle,prev in zip(candidate,previous)])
+        if best is None or distance<bestDistance:
+            best=candidate
+            bestDistance=distance
+    return best
     
+def _newVector(x,y,z):
+    '''trusted Vector constructor used internally, skips argument checking.
+    Args must already be floats.'''
+    newV=Vector.__new__(Vector)
+    newV.x=x
+    newV.y=y
+    newV.z=z
+    return newV
+
+def _newQuaternion(x,y,z,w):
+    '''trusted Quaternion constructor used internally, skips argument checking.'''
+    newQ=Quaternion.__new__(Quaternion)
+    newQ.x=x
+    newQ.y=y
+    newQ.z=z
+    newQ.w=w
+    return newQ
+
+def _newTransform(matrix):
+    '''trusted Transform constructor used internally, skips argument checking.
+    The given 16 element list is used as is, not copied.'''
+    newT=Transform.__new__(Transform)
+    newT._matrix=matrix
+    return newT
+
 class Vector(object):
     '''3d vector helper class. 
     Initializes to origin unless given three float args. Can also be given
     a maya object and will initialize to the world transform
     '''
+    __slots__=('x','y','z')
+
     def __init__(self,*args):
-        object.__init__(self)
-        self.x=None
-        self.y=None
-        self.z=None
-        if args:
+        if len(args)==3:
+            self.x=float(args[0])
+            self.y=float(args[1])
+            self.z=float(args[2])
+        elif args:
             self.set(*args)
         else:
             self.zero()
@@ -49,17 +154,16 @@ class Vector(object):
     def __setitem__(self,idx,val):
         if idx>len(self)-1:
             raise IndexError('index on Vector out of range')
-        attrs=[self.x,self.y,self.z]
-        attrs[idx]=float(val)
+        setattr(self,self.__slots__[idx],float(val))
             
     def __repr__(self):
         return 'Vector(%.3f,%.3f,%.3f)'%(self.x,self.y,self.z)
         
     def zero(self):
         '''set vector to zero'''
-        self.x=0
-        self.y=0
-        self.z=0
+        self.x=0.0
+        self.y=0.0
+        self.z=0.0
     
     def set(self,*args):
         '''set vector. If one float arg, set all three axes to that value.
@@ -67,17 +171,19 @@ class Vector(object):
         of that object.
         '''
         if len(args)==1:
-            if hasattr(args[0], 'x') and hasattr(args[0],'y') and hasattr(args[0],'z'):
+            if isinstance(args[0],Vector):
+                self.setFromVector(args[0])
+            elif hasattr(args[0], 'x') and hasattr(args[0],'y') and hasattr(args[0],'z'):
                 self.setFromVector(args[0])
             elif hasattr(args[0], '_matrix'):
                 self.setFromVector(args[0].getTranslation())
-            elif hasattr(args[0],'__iter__'):
+            elif hasattr(args[0],'__iter__') and not isinstance(args[0],_stringTypes):
                 self.setFromList(args[0])
-            elif isinstance(args[0], (int, long, float)):
+            elif isinstance(args[0], _numberTypes):
                 self.setFromScalar(args[0])
             elif args[0][-1] in 'xyz':
                 self.setFromAxisName(args[0])
-            elif cmds and cmds.objExists(args[0]): #check 'if cmds' because we may not be in Maya
+            elif mpXform.exists(args[0]): #False outside of Maya
                 self.setFromObj(args[0])
             else:
                 raise RuntimeError("Could not create vector from args: %s" % args)
@@ -86,7 +192,7 @@ class Vector(object):
             
     def copy(self):
         '''return a copy of the current vector'''
-        return Vector(self.x,self.y,self.z)
+        return _newVector(self.x,self.y,self.z)
         
     def setFromScalar(self,scalar):
         self.x=float(scalar)
@@ -109,7 +215,7 @@ class Vector(object):
         '''set vector to a maya object's world space transform'''
         if not cmds:
             raise RuntimeError("Maya.cmds not found. This method can only be used inside Maya")
-        self.x,self.y,self.z = cmds.xform(obj,ws=True,q=True,t=True)
+        self.x,self.y,self.z = mpXform.getWorldTranslation(obj)
 
     def setFromAxisName(self,axis='x'):
         '''Set from a given axis name. Alse accepts negative names ('-x' for example)'''
@@ -125,37 +231,28 @@ class Vector(object):
         return [self.x,self.y,self.z]
     
     def __add__(self,other):
-        newV = Vector()
-        newV.setFromList([self.x + other.x,self.y + other.y,self.z + other.z])
-        return newV
+        return _newVector(self.x + other.x,self.y + other.y,self.z + other.z)
     
     def __sub__(self,other):
-        newV = Vector()
-        newV.setFromList([self.x - other.x, self.y - other.y, self.z - other.z])
-        return newV
+        return _newVector(self.x - other.x, self.y - other.y, self.z - other.z)
     
     def __mul__(self,other):
-        newV=Vector()
         if isinstance(other,Vector):
-            newV.set(self.x * other.x, self.y * other.y, self.z * other.z)
+            return _newVector(self.x * other.x, self.y * other.y, self.z * other.z)
         elif isinstance(other,Transform):
-            a1,a2,a3 = self.get()
-            b11,b12,b13,b14,b21,b22,b23,b24,b31,b32,b33,b34,b41,b42,b43,b44 = other.get()
-            newV.setFromList(
-                [
+            a1,a2,a3 = self.x,self.y,self.z
+            b11,b12,b13,b14,b21,b22,b23,b24,b31,b32,b33,b34,b41,b42,b43,b44 = other._matrix
+            return _newVector(
                 b11*a1 + b12*a2 + b13*a3 + b14,
                 b21*a1 + b22*a2 + b23*a3 + b24,
                 b31*a1 + b32*a2 + b33*a3 + b34
-                ]
-            )
-        else:
-            newV.setFromList([self.x*other,self.y*other,self.z*other])
-        return newV
+                )
+        other=float(other)
+        return _newVector(self.x*other,self.y*other,self.z*other)
         
     def __div__(self, other):
-        newV = Vector()
-        newV.setFromList([self.x / other.x, self.y / other.y, self.z / other.z])
-        return newV
+        return _newVector(self.x / other.x, self.y / other.y, self.z / other.z)
+    __truediv__=__div__
         
     def __len__(self):
         return 3
@@ -186,7 +283,7 @@ class Vector(object):
         
     def cross(self,other):
         '''return cross product of this vector and another as a Vector'''
-        return Vector(self.y*other.z-self.z*other.y , 
+        return _newVector(self.y*other.z-self.z*other.y , 
             self.z*other.x-self.x*other.z , 
             self.x*other.y-self.y*other.x)
     
@@ -199,19 +296,20 @@ class Vector(object):
     def reflect(self,plane=None):
         '''reflect the current vector along the plane formed by another. If none given the
         yz plane is used (-1,0,0)'''
-        thisV = self.copy()
         if not plane:
-            plane=Vector(-1,0,0)
-        else:
+            plane=_newVector(-1.0,0.0,0.0)
+        elif not isinstance(plane,Vector):
             plane=Vector(plane)
-        dot=thisV.dot(plane)
-        self.setFromVector(thisV-plane*2*dot)
+        dot2=self.dot(plane)*2
+        self.x-=plane.x*dot2
+        self.y-=plane.y*dot2
+        self.z-=plane.z*dot2
         
 class Transform(object):
     '''4x4 object transform class'''
+    __slots__=('_matrix',)
+
     def __init__(self,*args):
-        object.__init__(self)
-        self._matrix=None
         self.identity()
         if args:
             self.set(*args)
@@ -239,7 +337,7 @@ class Transform(object):
         
     def copy(self):
         '''return a copy of this transform as a new Transform'''
-        return Transform(self.get())
+        return _newTransform(self._matrix[:])
         
     def zero(self):
         '''set to all zero'''
@@ -258,13 +356,19 @@ class Transform(object):
         '''
         if args:
             if len(args) == 1:
-                if hasattr(args[0], 'x') and hasattr(args[0],'y') and hasattr(args[0],'z'):
+                if isinstance(args[0],Transform):
+                    self._matrix=args[0]._matrix[:]
+                elif isinstance(args[0],Quaternion):
+                    self.setFromQuaternion(args[0])
+                elif isinstance(args[0],Vector):
+                    self.setTranslation(args[0])
+                elif hasattr(args[0], 'x') and hasattr(args[0],'y') and hasattr(args[0],'z'):
                     self.setTranslation(args[0])
                 elif hasattr(args[0], 'get') and len(args[0].get()) == 16:
                     self.setFromList(args[0].get())
-                elif hasattr(args[0],'__iter__'):
+                elif hasattr(args[0],'__iter__') and not isinstance(args[0],_stringTypes):
                     self.setFromList(args[0])
-                elif cmds and cmds.objExists(args[0]):
+                elif mpXform.exists(args[0]):
                     self.setFromObj(args[0])
                 else:
                     raise RuntimeError("can't find '%s' in scene to make matrix"%args[0])
@@ -283,9 +387,9 @@ class Transform(object):
         x=degToRad(x);y=degToRad(y);z=degToRad(z)
         cx=math.cos(x);cy=math.cos(y);cz=math.cos(z)
         sx=math.sin(x);sy=math.sin(y);sz=math.sin(z)
-        rx=Transform(1,0,0,0,0,cx,sx,0,0,-sx,cx,0,0,0,0,1)
-        ry=Transform(cy,0,-sy,0,0,1,0,0,sy,0,cy,0,0,0,0,1)
-        rz=Transform(cz,sz,0,0,-sz,cz,0,0,0,0,1,0,0,0,0,1)
+        rx=_newTransform([1,0,0,0,0,cx,sx,0,0,-sx,cx,0,0,0,0,1])
+        ry=_newTransform([cy,0,-sy,0,0,1,0,0,sy,0,cy,0,0,0,0,1])
+        rz=_newTransform([cz,sz,0,0,-sz,cz,0,0,0,0,1,0,0,0,0,1])
 
         order=order.lower()
         if order=='xzy':
@@ -303,13 +407,70 @@ class Transform(object):
         else:
             raise RuntimeError('unknown order argument for setFromEuler:%s'%order)
 
-        for idx in range(11):
-            self._matrix[idx]=rotMatrix[idx]
+        self._matrix[:11]=rotMatrix._matrix[:11]
             
+    def getEuler(self,order='xyz',previous=None):
+        '''Return [x,y,z] euler angles in degrees for the given order, the inverse of
+        setFromEuler. Scale is removed first. If previous [x,y,z] angles are given the
+        equivalent solution closest to them is returned instead, to avoid flips when
+        stepping through frames.'''
+        try:
+            i,j,k,parity=EULERORDERS[order.lower()]
+        except KeyError:
+            raise RuntimeError('unknown order argument for getEuler:%s'%order)
+        a=self._matrix
+        rows=[]
+        for row in (a[0:3],a[4:7],a[8:11]):
+            rowLength=math.sqrt(row[0]*row[0]+row[1]*row[1]+row[2]*row[2])
+            rows.append([row[0]/rowLength,row[1]/rowLength,row[2]/rowLength])
+        angles=[0.0,0.0,0.0]
+        sinMid=max(-1.0,min(1.0,-parity*rows[i][k]))
+        angles[j]=math.asin(sinMid)
+        locked=abs(sinMid)>=GIMBALTHRESHOLD
+        if not locked:
+            angles[i]=math.atan2(parity*rows[j][k],rows[k][k])
+            angles[k]=math.atan2(parity*rows[i][j],rows[i][i])
+        else:
+            #gimbal locked, only first+third is known so put it all on the first axis
+            angles[i]=math.atan2(-parity*rows[k][j],rows[j][j])
+        angles=[radToDeg(angle) for angle in angles]
+        if previous is not None:
+            angles=_closestEuler(angles,previous,order,locked)
+        return angles
+
+    def decompose(self,rotationType='quaternion'):
+        '''Return (translation,rotation,scale). Translation and scale are Vectors, rotation
+        is a Quaternion, or a Transform if rotationType is 'transform'. A mirrored matrix
+        gets a negative x scale so that rotation stays a proper rotation. Shear is not
+        separated out.'''
+        a=self._matrix
+        scale=_newVector(
+            math.sqrt(a[0]*a[0]+a[1]*a[1]+a[2]*a[2]),
+            math.sqrt(a[4]*a[4]+a[5]*a[5]+a[6]*a[6]),
+            math.sqrt(a[8]*a[8]+a[9]*a[9]+a[10]*a[10]))
+        if self.xAxis().cross(self.yAxis()).dot(self.zAxis())<0:
+            scale.x=-scale.x
+        if scale.x==0 or scale.y==0 or scale.z==0:
+            raise ZeroDivisionError("matrix has zero scale, can't find rotation")
+        rotation=_newTransform([
+            a[0]/scale.x,a[1]/scale.x,a[2]/scale.x,0.0,
+            a[4]/scale.y,a[5]/scale.y,a[6]/scale.y,0.0,
+            a[8]/scale.z,a[9]/scale.z,a[10]/scale.z,0.0,
+            0.0,0.0,0.0,1.0])
+        if rotationType=='quaternion':
+            rotation=Quaternion(rotation)
+        elif rotationType!='transform':
+            raise RuntimeError('unknown rotationType argument for decompose:%s'%rotationType)
+        return (self.getTranslation(),rotation,scale)
+
+    def setFromQuaternion(self,quat):
+        '''set the rotation from a Quaternion, keeping the translation'''
+        self._matrix[:12]=quat.getTransform()._matrix[:12]
+
     def setFromObj(self,obj):
         if not cmds:
             raise RuntimeError("Maya.cmds not found. This method can only be used inside Maya")
-        self._matrix=cmds.xform(obj,ws=True,m=True,q=True)
+        self._matrix=mpXform.getWorldMatrix(obj)
         
     def setFromList(self,other):
         '''set matrix from a 16 element list'''
@@ -319,23 +480,24 @@ class Transform(object):
         
     def xAxis(self):
         '''return the xAxis of the Transform as a Vector'''
-        return Vector(self._matrix[0],self._matrix[1],self._matrix[2])
+        return _newVector(self._matrix[0],self._matrix[1],self._matrix[2])
     
     def yAxis(self):
         '''return the yAxis of the Transform as a Vector'''
-        return Vector(self._matrix[4],self._matrix[5],self._matrix[6])
+        return _newVector(self._matrix[4],self._matrix[5],self._matrix[6])
 
     def zAxis(self):
         '''return the zAxis of the Transform as a Vector'''
-        return Vector(self._matrix[8],self._matrix[9],self._matrix[10])
+        return _newVector(self._matrix[8],self._matrix[9],self._matrix[10])
         
     def getTranslation(self):
         '''get translation as a Vector'''
-        return Vector(self._matrix[12],self._matrix[13],self._matrix[14])
+        return _newVector(self._matrix[12],self._matrix[13],self._matrix[14])
         
     def setTranslation(self,other):
         '''set translation from another object'''
-        other = Vector(other)
+        if not isinstance(other,Vector):
+            other = Vector(other)
         self._matrix[12]=other.x
         self._matrix[13]=other.y
         self._matrix[14]=other.z
@@ -361,10 +523,11 @@ class Transform(object):
             if len(other)==3: #matrix and vector
                 self.translate(other)
             elif len(other)==16: #matrix and matrix
-                return Transform(map((lambda x,y: x+y),self.get(),other.get()))
+                return _newTransform([x+y for x,y in zip(self._matrix,other.get())])
         #matrix and float
         except TypeError:
-            return Transform(map((lambda x,y: x+y),self.get(),[float(other)]*16))
+            other=float(other)
+            return _newTransform([x+other for x in self._matrix])
         
     def __sub__(self,other):
         '''subtract this matrix from another, or subtract a vector (from translate)'''
@@ -372,15 +535,16 @@ class Transform(object):
             if len(other)==3: #matrix and vector
                 self.translate(other*-1)
             elif len(other)==16: #matrix and matrix
-                return Transform(map((lambda x,y: x-y),self.get(),other.get()))
+                return _newTransform([x-y for x,y in zip(self._matrix,other.get())])
         except TypeError: # matrix and float
-            return Transform(map((lambda x,y: x-y),self.get(),[float(other)]*16))     
+            other=float(other)
+            return _newTransform([x-other for x in self._matrix])     
             
     def __mul__(self,other):
         '''multiply this matrix by another matrix or vector'''
         if isinstance(other,Transform):
-            a11,a12,a13,a14,a21,a22,a23,a24,a31,a32,a33,a34,a41,a42,a43,a44 = self.get()
-            b11,b12,b13,b14,b21,b22,b23,b24,b31,b32,b33,b34,b41,b42,b43,b44 = other.get()
+            a11,a12,a13,a14,a21,a22,a23,a24,a31,a32,a33,a34,a41,a42,a43,a44 = self._matrix
+            b11,b12,b13,b14,b21,b22,b23,b24,b31,b32,b33,b34,b41,b42,b43,b44 = other._matrix
             m11=a11*b11 + a12*b21 + a13*b31 + a14*b41
             m12=a11*b12 + a12*b22 + a13*b32 + a14*b42
             m13=a11*b13 + a12*b23 + a13*b33 + a14*b43
@@ -397,12 +561,12 @@ class Transform(object):
             m42=a41*b12 + a42*b22 + a43*b32 + a44*b42
             m43=a41*b13 + a42*b23 + a43*b33 + a44*b43
             m44=a41*b14 + a42*b24 + a43*b34 + a44*b44
-            return Transform(m11,m12,m13,m14,m21,m22,m23,m24,m31,m32,m33,m34,m41,m42,m43,m44)
+            return _newTransform([m11,m12,m13,m14,m21,m22,m23,m24,m31,m32,m33,m34,m41,m42,m43,m44])
         elif isinstance(other,Vector):
-            a11,a12,a13,a14,a21,a22,a23,a24,a31,a32,a33,a34,a41,a42,a43,a44 = self.get()
-            b1,b2,b3 = other.get()
-            return Transform(a11*b1,a12*b2,a13*b3,a14,a21*b1,a22*b2,a23*b3,a24,
-                a31*b1,a32*b2,a33*b3,a34,a41,a42,a43,a44)
+            a11,a12,a13,a14,a21,a22,a23,a24,a31,a32,a33,a34,a41,a42,a43,a44 = self._matrix
+            b1,b2,b3 = other.x,other.y,other.z
+            return _newTransform([a11*b1,a12*b2,a13*b3,a14,a21*b1,a22*b2,a23*b3,a24,
+                a31*b1,a32*b2,a33*b3,a34,a41,a42,a43,a44])
         else:
             raise TypeError("unsupported operand type(s) for *: '%s' and '%s'" %(self.__class__.__name__ ,other.__class__.__name__))
 
@@ -417,11 +581,11 @@ class Transform(object):
         za.reflect(plane=plane)
         ta=self.getTranslation()
         ta.reflect(plane=plane)
-        self.set(xa.x,xa.y,xa.z,0,ya.x,ya.y,ya.z,0,za.x,za.y,za.z,0,ta.x,ta.y,ta.z,1)
+        self._matrix=[xa.x,xa.y,xa.z,0,ya.x,ya.y,ya.z,0,za.x,za.y,za.z,0,ta.x,ta.y,ta.z,1]
         
     def det(self):
         '''return the determinate of the matrix'''
-        a11,a12,a13,a14,a21,a22,a23,a24,a31,a32,a33,a34,a41,a42,a43,a44 = self.get()
+        a11,a12,a13,a14,a21,a22,a23,a24,a31,a32,a33,a34,a41,a42,a43,a44 = self._matrix
         return (
             a11*a22*a33*a44 + a11*a23*a34*a42 + a11*a24*a32*a43 +
             a12*a21*a34*a43 + a12*a23*a31*a44 + a12*a24*a33*a41 +
@@ -435,13 +599,83 @@ class Transform(object):
             
     def transpose(self):
         '''transpose the current matrix in place'''
-        a11,a12,a13,a14,a21,a22,a23,a24,a31,a32,a33,a34,a41,a42,a43,a44 = self.get()
-        self.set(a11,a21,a31,a41,a12,a22,a32,a42,a13,a23,a33,a43,a14,a24,a34,a44)
+        a11,a12,a13,a14,a21,a22,a23,a24,a31,a32,a33,a34,a41,a42,a43,a44 = self._matrix
+        self._matrix=[a11,a21,a31,a41,a12,a22,a32,a42,a13,a23,a33,a43,a14,a24,a34,a44]
         
+    def isAffine(self):
+        '''return True if the last column is 0,0,0,1 (no projection)'''
+        a=self._matrix
+        return a[3]==0 and a[7]==0 and a[11]==0 and a[15]==1
+
+    def isOrthogonal(self,tolerance=ORTHOTOLERANCE):
+        '''return True if the x,y,z axes are perpendicular to each other, so the matrix
+        is only rotation, scale and translation (no shear)'''
+        a=self._matrix
+        xx=a[0]*a[0]+a[1]*a[1]+a[2]*a[2]
+        yy=a[4]*a[4]+a[5]*a[5]+a[6]*a[6]
+        zz=a[8]*a[8]+a[9]*a[9]+a[10]*a[10]
+        xy=a[0]*a[4]+a[1]*a[5]+a[2]*a[6]
+        xz=a[0]*a[8]+a[1]*a[9]+a[2]*a[10]
+        yz=a[4]*a[8]+a[5]*a[9]+a[6]*a[10]
+        #compare squared cosines so no square roots are needed
+        limit=tolerance*tolerance
+        return xy*xy<=limit*xx*yy and xz*xz<=limit*xx*zz and yz*yz<=limit*yy*zz
+
     def invert(self):
-        '''invert the current matrix in place.'''
+        '''invert the current matrix in place.
+        Rigid and scaled rigid matrices (the usual case in a rig) are inverted with a
+        transpose, other affine matrices with a 3x3 inverse, and anything else with the
+        full 4x4 inverse.'''
+        if self.isAffine():
+            if self.isOrthogonal():
+                self._invertOrthogonal()
+            else:
+                self._invertAffine()
+        else:
+            self._invertFull()
+
+    def _invertOrthogonal(self):
+        '''invert an affine matrix with perpendicular axes. The inverse of the 3x3 part
+        is its transpose with each column divided by that axis' squared length.'''
+        a11,a12,a13,a14,a21,a22,a23,a24,a31,a32,a33,a34,a41,a42,a43,a44 = self._matrix
+        xx=a11*a11+a12*a12+a13*a13
+        yy=a21*a21+a22*a22+a23*a23
+        zz=a31*a31+a32*a32+a33*a33
+        if xx==0 or yy==0 or zz==0:
+            raise ZeroDivisionError("matrix is not invertable")
+        xx=1.0/xx;yy=1.0/yy;zz=1.0/zz
+        b11=a11*xx;b12=a21*yy;b13=a31*zz
+        b21=a12*xx;b22=a22*yy;b23=a32*zz
+        b31=a13*xx;b32=a23*yy;b33=a33*zz
+        self._matrix=[
+            b11,b12,b13,0.0,
+            b21,b22,b23,0.0,
+            b31,b32,b33,0.0,
+            -(a41*b11+a42*b21+a43*b31),-(a41*b12+a42*b22+a43*b32),-(a41*b13+a42*b23+a43*b33),1.0]
+
+    def _invertAffine(self):
+        '''invert an affine matrix using the 3x3 inverse and the translation'''
+        a11,a12,a13,a14,a21,a22,a23,a24,a31,a32,a33,a34,a41,a42,a43,a44 = self._matrix
+        c11=a22*a33-a23*a32
+        c12=a13*a32-a12*a33
+        c13=a12*a23-a13*a22
+        det=a11*c11+a21*c12+a31*c13
+        if det==0:
+            raise ZeroDivisionError("matrix is not invertable")
+        det=1.0/det
+        b11=c11*det;b12=c12*det;b13=c13*det
+        b21=(a23*a31-a21*a33)*det;b22=(a11*a33-a13*a31)*det;b23=(a13*a21-a11*a23)*det
+        b31=(a21*a32-a22*a31)*det;b32=(a12*a31-a11*a32)*det;b33=(a11*a22-a12*a21)*det
+        self._matrix=[
+            b11,b12,b13,0.0,
+            b21,b22,b23,0.0,
+            b31,b32,b33,0.0,
+            -(a41*b11+a42*b21+a43*b31),-(a41*b12+a42*b22+a43*b32),-(a41*b13+a42*b23+a43*b33),1.0]
+
+    def _invertFull(self):
+        '''invert any invertable matrix with the full 4x4 cofactor expansion'''
         inv = [0]*16
-        a = self._matrix[:]
+        a = self._matrix
         inv[0] = a[5]*a[10]*a[15] - a[5]*a[11]*a[14] - a[9]*a[6]*a[15] + \
                  a[9]*a[7]*a[14] + a[13]*a[6]*a[11] - a[13]*a[7]*a[10]
         inv[4] = -a[4]*a[10]*a[15] + a[4]*a[11]*a[14] + a[8]*a[6]*a[15] - \
@@ -494,8 +728,6 @@ class Transform(object):
         xy=x*y
         xz=x*z
         yz=y*z
-        a11,a12,a13,a14,a21,a22,a23,a24,a31,a32,a33,a34,a41,a42,a43,a44 = self.get()
-        
         a11=xx+ca*(1.0-xx)
         a12=xy-ca*xy+sa*z
         a13=xz-ca*xz-sa*y
@@ -512,7 +744,7 @@ class Transform(object):
         a42=0.0
         a43=0.0
         a44=1.0      
-        self.set(a11,a21,a31,a41,a12,a22,a32,a42,a13,a23,a33,a43,a14,a24,a34,a44)         
+        self._matrix=[a11,a21,a31,a41,a12,a22,a32,a42,a13,a23,a33,a43,a14,a24,a34,a44]
 
     def alignToWorld(self):
         '''UNTESTED. Applies the smallest rotation that will make transform axes parallel to world axes'''
@@ -545,3 +777,854 @@ class Transform(object):
         zAngle = math.acos(zAngle)
         self.setFromEuler(radToDeg(xAngle),radToDeg(yAngle),radToDeg(zAngle))
             
+
+class Quaternion(object):
+    '''Rotation quaternion stored as x,y,z,w.
+    Initializes to identity unless given four float args (x,y,z,w), another Quaternion,
+    a Transform or a maya object (the rotation of the world matrix is used, scale is
+    ignored).
+    Multiplication order matches Transform: a*b rotates by a and then by b.
+    '''
+    __slots__=('x','y','z','w')
+
+    def __init__(self,*args):
+        if len(args)==4:
+            self.setFromList(args)
+        elif args:
+            self.set(*args)
+        else:
+            self.identity()
+
+    def __getitem__(self,idx):
+        if idx>len(self)-1:
+            raise IndexError('index on Quaternion out of range')
+        return self.get()[idx]
+
+    def __len__(self):
+        return 4
+
+    def __repr__(self):
+        return 'Quaternion(%.3f,%.3f,%.3f,%.3f)'%(self.x,self.y,self.z,self.w)
+
+    def identity(self):
+        '''set to identity (no rotation)'''
+        self.x=0.0
+        self.y=0.0
+        self.z=0.0
+        self.w=1.0
+
+    def set(self,*args):
+        '''set quaternion from four floats (x,y,z,w), another Quaternion, a Transform,
+        a four element list or a maya object.'''
+        if len(args)==1:
+            if isinstance(args[0],Quaternion):
+                self.setFromQuaternion(args[0])
+            elif isinstance(args[0],Transform):
+                self.setFromTransform(args[0])
+            elif hasattr(args[0],'__iter__') and len(args[0])==4 and not isinstance(args[0],_stringTypes):
+                self.setFromList(args[0])
+            else:
+                self.setFromTransform(Transform(args[0]))
+        elif len(args)==4:
+            self.setFromList(args)
+        else:
+            raise RuntimeError("Could not create quaternion from args: %s" % str(args))
+
+    def copy(self):
+        '''return a copy of this quaternion'''
+        return _newQuaternion(self.x,self.y,self.z,self.w)
+
+    def get(self):
+        '''return list of this quaternion's [x,y,z,w]'''
+        return [self.x,self.y,self.z,self.w]
+
+    def setFromList(self,other):
+        '''set from a list of [x,y,z,w]'''
+        self.x=float(other[0])
+        self.y=float(other[1])
+        self.z=float(other[2])
+        self.w=float(other[3])
+
+    def setFromQuaternion(self,other):
+        '''set this quaternion from another quaternion'''
+        self.x=other.x
+        self.y=other.y
+        self.z=other.z
+        self.w=other.w
+
+    def setFromTransform(self,xform):
+        '''set from the rotation of a Transform. Scale is removed first.'''
+        a=xform._matrix
+        xLength=math.sqrt(a[0]*a[0]+a[1]*a[1]+a[2]*a[2])
+        yLength=math.sqrt(a[4]*a[4]+a[5]*a[5]+a[6]*a[6])
+        zLength=math.sqrt(a[8]*a[8]+a[9]*a[9]+a[10]*a[10])
+        m00,m01,m02=a[0]/xLength,a[1]/xLength,a[2]/xLength
+        m10,m11,m12=a[4]/yLength,a[5]/yLength,a[6]/yLength
+        m20,m21,m22=a[8]/zLength,a[9]/zLength,a[10]/zLength
+        trace=m00+m11+m22
+        #pick the largest diagonal term to divide by, for precision
+        if trace>0:
+            s=math.sqrt(trace+1.0)*2
+            self.w=0.25*s
+            self.x=(m12-m21)/s
+            self.y=(m20-m02)/s
+            self.z=(m01-m10)/s
+        elif m00>m11 and m00>m22:
+            s=math.sqrt(1.0+m00-m11-m22)*2
+            self.w=(m12-m21)/s
+            self.x=0.25*s
+            self.y=(m01+m10)/s
+            self.z=(m02+m20)/s
+        elif m11>m22:
+            s=math.sqrt(1.0+m11-m00-m22)*2
+            self.w=(m20-m02)/s
+            self.x=(m01+m10)/s
+            self.y=0.25*s
+            self.z=(m12+m21)/s
+        else:
+            s=math.sqrt(1.0+m22-m00-m11)*2
+            self.w=(m01-m10)/s
+            self.x=(m02+m20)/s
+            self.y=(m12+m21)/s
+            self.z=0.25*s
+
+    def setFromAxisAngle(self,axis,angle):
+        '''given an axis Vector and angle in radians, set to that rotation'''
+        xform=Transform()
+        xform.setFromAxisAngle(axis,angle)
+        self.setFromTransform(xform)
+
+    def setFromEuler(self,x,y,z,order='xyz'):
+        '''Set from three euler angles. Optionally specify order, default="xyz"'''
+        xform=Transform()
+        xform.setFromEuler(x,y,z,order=order)
+        self.setFromTransform(xform)
+
+    def getTransform(self):
+        '''return the rotation as a Transform'''
+        x,y,z,w=self.x,self.y,self.z,self.w
+        xx=x*x;yy=y*y;zz=z*z
+        xy=x*y;xz=x*z;yz=y*z
+        wx=w*x;wy=w*y;wz=w*z
+        return _newTransform([
+            1-2*(yy+zz),2*(xy+wz),2*(xz-wy),0.0,
+            2*(xy-wz),1-2*(xx+zz),2*(yz+wx),0.0,
+            2*(xz+wy),2*(yz-wx),1-2*(xx+yy),0.0,
+            0.0,0.0,0.0,1.0])
+
+    def __mul__(self,other):
+        '''combine with another Quaternion, rotating by this one and then the other'''
+        if not isinstance(other,Quaternion):
+            raise TypeError("unsupported operand type(s) for *: '%s' and '%s'" %(self.__class__.__name__ ,other.__class__.__name__))
+        ax,ay,az,aw=other.x,other.y,other.z,other.w
+        bx,by,bz,bw=self.x,self.y,self.z,self.w
+        return _newQuaternion(
+            aw*bx + ax*bw + ay*bz - az*by,
+            aw*by - ax*bz + ay*bw + az*bx,
+            aw*bz + ax*by - ay*bx + az*bw,
+            aw*bw - ax*bx - ay*by - az*bz)
+
+    def dot(self,other):
+        '''return dot product of this quaternion and another'''
+        return self.x*other.x+self.y*other.y+self.z*other.z+self.w*other.w
+
+    def length(self):
+        '''return quaternion length'''
+        return math.sqrt(self.dot(self))
+
+    def normalize(self):
+        '''normalize the quaternion in place'''
+        thisLength=self.length()
+        self.x/=thisLength
+        self.y/=thisLength
+        self.z/=thisLength
+        self.w/=thisLength
+
+    def invert(self):
+        '''invert the quaternion in place'''
+        sqLength=self.dot(self)
+        if sqLength==0:
+            raise ZeroDivisionError("quaternion is not invertable")
+        self.x/=-sqLength
+        self.y/=-sqLength
+        self.z/=-sqLength
+        self.w/=sqLength
+
+    def lerp(self,other,weight):
+        '''return the normalized linear interpolation between this quaternion and another.
+        weight 0 = this, weight 1 = other. Takes the shortest path.'''
+        sign=1.0
+        if self.dot(other)<0:
+            sign=-1.0
+        thisWeight=1.0-weight
+        otherWeight=weight*sign
+        newQ=_newQuaternion(
+            self.x*thisWeight+other.x*otherWeight,
+            self.y*thisWeight+other.y*otherWeight,
+            self.z*thisWeight+other.z*otherWeight,
+            self.w*thisWeight+other.w*otherWeight)
+        newQ.normalize()
+        return newQ
+
+    def slerp(self,other,weight):
+        '''return the spherical interpolation between this quaternion and another.
+        weight 0 = this, weight 1 = other. Takes the shortest path.'''
+        dot=self.dot(other)
+        sign=1.0
+        if dot<0:
+            dot=-dot
+            sign=-1.0
+        #nearly the same rotation, lerp is accurate and avoids dividing by ~0
+        if dot>SLERPTHRESHOLD:
+            return self.lerp(other,weight)
+        angle=math.acos(dot)
+        sinAngle=math.sin(angle)
+        thisWeight=math.sin((1.0-weight)*angle)/sinAngle
+        otherWeight=math.sin(weight*angle)/sinAngle*sign
+        return _newQuaternion(
+            self.x*thisWeight+other.x*otherWeight,
+            self.y*thisWeight+other.y*otherWeight,
+            self.z*thisWeight+other.z*otherWeight,
+            self.w*thisWeight+other.w*otherWeight)
+
+
+class VectorArray(object):
+    '''Array of 3d vectors stored in one contiguous (N,3) numpy buffer.
+    Initializes empty unless given a list of Vectors, lists or maya objects, another
+    VectorArray, a TransformArray (the translations are used) or an (N,3) array.
+    Math is the same as on Vector but done on every element at once. Indexing returns
+    a Vector. Requires numpy.
+    '''
+    def __init__(self,*args):
+        object.__init__(self)
+        if not numpy:
+            raise RuntimeError("numpy not found. VectorArray requires numpy")
+        self._array=None
+        if args:
+            self.set(*args)
+        else:
+            self.zero(0)
+
+    def __len__(self):
+        return len(self._array)
+
+    def __getitem__(self,idx):
+        if isinstance(idx,slice):
+            return VectorArray(self._array[idx])
+        x,y,z=self._array[idx].tolist()
+        return _newVector(x,y,z)
+
+    def __setitem__(self,idx,val):
+        self._array[idx]=Vector(val).get()
+
+    def __iter__(self):
+        for x,y,z in self._array.tolist():
+            yield _newVector(x,y,z)
+
+    def __repr__(self):
+        return 'VectorArray(%s)'%','.join(['(%.3f,%.3f,%.3f)'%tuple(v) for v in self._array.tolist()])
+
+    def zero(self,count=None):
+        '''set every vector to zero. If count is given resize the array to count vectors'''
+        if count is None:
+            count=len(self._array)
+        self._array=numpy.zeros((count,3))
+
+    def set(self,*args):
+        '''set the array from another VectorArray, a TransformArray (translations), an (N,3)
+        array, or a list of Vectors, lists, or maya objects.
+        '''
+        if len(args)!=1:
+            raise RuntimeError("Could not create VectorArray from args: %s" % str(args))
+        other=args[0]
+        if isinstance(other,VectorArray):
+            self._array=other._array.copy()
+        elif isinstance(other,TransformArray):
+            self._array=other._array[:,3,:3].copy()
+        elif isinstance(other,numpy.ndarray):
+            self._array=numpy.array(other,dtype=float).reshape(-1,3)
+        elif hasattr(other,'__iter__'):
+            other=list(other)
+            if other and all([isinstance(item,_stringTypes) for item in other]):
+                self.setFromObjs(other)
+                return
+            values=[]
+            for item in other:
+                if isinstance(item,Vector):
+                    values.append((item.x,item.y,item.z))
+                elif isinstance(item,(list,tuple)):
+                    values.append(item)
+                else:
+                    values.append(Vector(item).get())
+            self._array=numpy.array(values,dtype=float).reshape(-1,3)
+        else:
+            raise RuntimeError("Could not create VectorArray from args: %s" % str(args))
+
+    def setFromObjs(self,objs):
+        '''set from the world translations of maya objects, queried in one pass'''
+        self._array=numpy.array(mpXform.getWorldTranslations(objs),dtype=float).reshape(-1,3)
+
+    def copy(self):
+        '''return a copy of this array'''
+        return VectorArray(self)
+
+    def get(self):
+        '''return a list of [x,y,z] lists'''
+        return self._array.tolist()
+
+    def getVectors(self):
+        '''return a list of Vectors'''
+        return [_newVector(x,y,z) for x,y,z in self._array.tolist()]
+
+    def getArray(self,copy=True):
+        '''return the (N,3) numpy array. If copy is False the internal buffer is returned'''
+        if copy:
+            return self._array.copy()
+        return self._array
+
+    def _operand(self,other):
+        '''return other in a form that broadcasts against the (N,3) buffer'''
+        if isinstance(other,VectorArray):
+            return other._array
+        elif isinstance(other,Vector):
+            return numpy.array((other.x,other.y,other.z))
+        elif isinstance(other,numpy.ndarray) and other.ndim==1 and len(other)==len(self._array):
+            return other[:,numpy.newaxis] #one scalar per vector
+        return other
+
+    def __add__(self,other):
+        return VectorArray(self._array+self._operand(other))
+
+    def __sub__(self,other):
+        return VectorArray(self._array-self._operand(other))
+
+    def __mul__(self,other):
+        if isinstance(other,(Transform,TransformArray)):
+            #same as Vector*Transform, for every vector
+            if isinstance(other,Transform):
+                matrix=numpy.array(other._matrix,dtype=float).reshape(4,4)
+                return VectorArray(numpy.dot(self._array,matrix[:3,:3].T)+matrix[:3,3])
+            matrix=other._array
+            return VectorArray(numpy.einsum('nij,nj->ni',matrix[:,:3,:3],self._array)+matrix[:,:3,3])
+        return VectorArray(self._array*self._operand(other))
+
+    def __div__(self,other):
+        return VectorArray(self._array/self._operand(other))
+
+    __truediv__=__div__
+
+    def normalize(self):
+        '''normalize every vector in place'''
+        self._array/=self.length()[:,numpy.newaxis]
+
+    def length(self):
+        '''return the length of every vector as an (N,) array'''
+        return numpy.sqrt(self.sqLength())
+
+    def sqLength(self):
+        '''return the squared length of every vector as an (N,) array'''
+        return self.dot(self)
+
+    def dot(self,other):
+        '''return the dot product of every vector with another Vector or VectorArray as an
+        (N,) array'''
+        return numpy.sum(self._array*self._operand(other),axis=-1)
+
+    def cross(self,other):
+        '''return the cross product of every vector with another Vector or VectorArray'''
+        return VectorArray(numpy.cross(self._array,self._operand(other)))
+
+    def invert(self):
+        '''invert every vector in place'''
+        self._array*=-1
+
+    def reflect(self,plane=None):
+        '''reflect every vector along the plane formed by another. If none given the
+        yz plane is used (-1,0,0)'''
+        if not plane:
+            plane=Vector(-1,0,0)
+        else:
+            plane=Vector(plane)
+        planeArray=numpy.array(plane.get())
+        dots=numpy.dot(self._array,planeArray)
+        self._array-=planeArray*2*dots[:,numpy.newaxis]
+
+class TransformArray(object):
+    '''Array of 4x4 transforms stored in one contiguous (N,4,4) numpy buffer.
+    Initializes empty unless given a list of Transforms, 16 element lists or maya
+    objects, another TransformArray, a VectorArray (sets translations) or an (N,16) or
+    (N,4,4) array. Math is the same as on Transform but done on every element at once.
+    Indexing returns a Transform. Requires numpy.
+    '''
+    def __init__(self,*args):
+        object.__init__(self)
+        if not numpy:
+            raise RuntimeError("numpy not found. TransformArray requires numpy")
+        self._array=None
+        if args:
+            self.set(*args)
+        else:
+            self.identity(0)
+
+    def __len__(self):
+        return len(self._array)
+
+    def __getitem__(self,idx):
+        if isinstance(idx,slice):
+            return TransformArray(self._array[idx])
+        return _newTransform(self._array[idx].ravel().tolist())
+
+    def __setitem__(self,idx,val):
+        self._array[idx]=numpy.array(Transform(val).get(),dtype=float).reshape(4,4)
+
+    def __iter__(self):
+        for matrix in self._array.reshape(-1,16).tolist():
+            yield _newTransform(matrix)
+
+    def __repr__(self):
+        return 'TransformArray(%s)'%len(self._array)
+
+    def identity(self,count=None):
+        '''set every transform to identity. If count is given resize the array to count
+        transforms'''
+        if count is None:
+            count=len(self._array)
+        self._array=numpy.tile(numpy.identity(4),(count,1,1))
+
+    def zero(self,count=None):
+        '''set every transform to all zero. If count is given resize the array to count
+        transforms'''
+        if count is None:
+            count=len(self._array)
+        self._array=numpy.zeros((count,4,4))
+
+    def set(self,*args):
+        '''set the array from another TransformArray, a VectorArray (translations), a
+        QuaternionArray (rotations), an (N,16) or (N,4,4) array, or a list of Transforms,
+        16 element lists, or maya objects.
+        '''
+        if len(args)!=1:
+            raise RuntimeError("can't init TransformArray from args: %s" % str(args))
+        other=args[0]
+        if isinstance(other,TransformArray):
+            self._array=other._array.copy()
+        elif isinstance(other,VectorArray):
+            self.identity(len(other))
+            self._array[:,3,:3]=other._array
+        elif isinstance(other,QuaternionArray):
+            self._array=other.getTransformArray()._array
+        elif isinstance(other,numpy.ndarray):
+            self._array=numpy.array(other,dtype=float).reshape(-1,4,4)
+        elif hasattr(other,'__iter__'):
+            other=list(other)
+            if other and all([isinstance(item,_stringTypes) for item in other]):
+                self.setFromObjs(other)
+                return
+            values=[]
+            for item in other:
+                if isinstance(item,Transform):
+                    values.append(item._matrix)
+                elif isinstance(item,(list,tuple)) and len(item)==16:
+                    values.append(item)
+                else:
+                    values.append(Transform(item).get())
+            self._array=numpy.array(values,dtype=float).reshape(-1,4,4)
+        else:
+            raise RuntimeError("can't init TransformArray from args: %s" % str(args))
+
+    def setFromObjs(self,objs):
+        '''set from the world matrices of maya objects, queried in one pass'''
+        self._array=numpy.array(mpXform.getWorldMatrices(objs,flat=True),dtype=float).reshape(-1,4,4)
+
+    def copy(self):
+        '''return a copy of this array'''
+        return TransformArray(self)
+
+    def get(self):
+        '''return a list of 16 element lists'''
+        return self._array.reshape(-1,16).tolist()
+
+    def getTransforms(self):
+        '''return a list of Transforms'''
+        return [_newTransform(matrix) for matrix in self._array.reshape(-1,16).tolist()]
+
+    def getArray(self,copy=True):
+        '''return the (N,4,4) numpy array. If copy is False the internal buffer is returned'''
+        if copy:
+            return self._array.copy()
+        return self._array
+
+    def __mul__(self,other):
+        '''multiply every transform by another Transform or TransformArray, or scale by a
+        Vector or VectorArray (same as Transform*Vector)'''
+        if isinstance(other,TransformArray):
+            return TransformArray(numpy.matmul(self._array,other._array))
+        elif isinstance(other,Transform):
+            matrix=numpy.array(other._matrix,dtype=float).reshape(4,4)
+            return TransformArray(numpy.matmul(self._array,matrix))
+        elif isinstance(other,(Vector,VectorArray)):
+            if isinstance(other,Vector):
+                scale=numpy.array((other.x,other.y,other.z))
+            else:
+                scale=other._array[:,numpy.newaxis,:]
+            newArray=self._array.copy()
+            newArray[:,:3,:3]*=scale
+            return TransformArray(newArray)
+        else:
+            raise TypeError("unsupported operand type(s) for *: '%s' and '%s'" %(self.__class__.__name__ ,other.__class__.__name__))
+
+    def xAxis(self):
+        '''return the xAxis of every transform as a VectorArray'''
+        return VectorArray(self._array[:,0,:3])
+
+    def yAxis(self):
+        '''return the yAxis of every transform as a VectorArray'''
+        return VectorArray(self._array[:,1,:3])
+
+    def zAxis(self):
+        '''return the zAxis of every transform as a VectorArray'''
+        return VectorArray(self._array[:,2,:3])
+
+    def getTranslation(self):
+        '''get every translation as a VectorArray'''
+        return VectorArray(self._array[:,3,:3])
+
+    def setTranslation(self,other):
+        '''set translations from a Vector (all the same) or a VectorArray'''
+        if isinstance(other,VectorArray):
+            self._array[:,3,:3]=other._array
+        else:
+            self._array[:,3,:3]=Vector(other).get()
+
+    def translate(self,other):
+        '''move every translation by a Vector or by each vector of a VectorArray'''
+        if isinstance(other,VectorArray):
+            self._array[:,3,:3]+=other._array
+        else:
+            self._array[:,3,:3]+=Vector(other).get()
+
+    def reflect(self,plane=None):
+        '''reflect every transform about a plane specified as a Vector. If none given the yz
+        plane is used.'''
+        rows=VectorArray(self._array[:,:,:3].reshape(-1,3))
+        rows.reflect(plane=plane)
+        self._array[:,:,:3]=rows._array.reshape(-1,4,3)
+        self._array[:,:,3]=(0,0,0,1)
+
+    def getEuler(self,order='xyz',previous=None,continuous=False):
+        '''Return euler angles in degrees for the given order as a VectorArray of x,y,z,
+        the same as Transform.getEuler on every transform. previous can be one [x,y,z]
+        or one per transform, the closest equivalent solution to it is returned. If
+        continuous is True every transform is filtered against the result before it
+        (starting from previous if given), for a flip free curve over frames.'''
+        try:
+            i,j,k,parity=EULERORDERS[order.lower()]
+        except KeyError:
+            raise RuntimeError('unknown order argument for getEuler:%s'%order)
+        rows=self._array[:,:3,:3]
+        rows=rows/numpy.sqrt(numpy.sum(rows*rows,axis=2))[:,:,numpy.newaxis]
+        angles=numpy.zeros((len(rows),3))
+        sinMid=numpy.clip(-parity*rows[:,i,k],-1.0,1.0)
+        angles[:,j]=numpy.arcsin(sinMid)
+        locked=numpy.abs(sinMid)>=GIMBALTHRESHOLD
+        angles[:,i]=numpy.where(locked,
+            numpy.arctan2(-parity*rows[:,k,j],rows[:,j,j]),
+            numpy.arctan2(parity*rows[:,j,k],rows[:,k,k]))
+        angles[:,k]=numpy.where(locked,0.0,numpy.arctan2(parity*rows[:,i,j],rows[:,i,i]))
+        angles=numpy.degrees(angles)
+        if continuous:
+            filtered=[]
+            prev=previous
+            for frameAngles,frameLocked in zip(angles.tolist(),locked.tolist()):
+                if prev is not None:
+                    frameAngles=_closestEuler(frameAngles,prev,order,frameLocked)
+                filtered.append(frameAngles)
+                prev=frameAngles
+            return VectorArray(numpy.array(filtered).reshape(-1,3))
+        if previous is not None:
+            previous=numpy.broadcast_to(numpy.asarray(previous,dtype=float),angles.shape)
+            sign=numpy.where(angles[:,j]>0,parity,-parity)
+            angles[:,i]+=numpy.where(locked,sign*previous[:,k],0.0)
+            angles[:,k]=numpy.where(locked,previous[:,k],angles[:,k])
+            other=angles.copy()
+            other[:,i]+=180.0
+            other[:,j]=180.0-other[:,j]
+            other[:,k]+=180.0
+            angles=angles+360.0*numpy.round((previous-angles)/360.0)
+            other=other+360.0*numpy.round((previous-other)/360.0)
+            useOther=numpy.sum(numpy.abs(previous-other),axis=1)<numpy.sum(numpy.abs(previous-angles),axis=1)
+            angles[useOther]=other[useOther]
+        return VectorArray(angles)
+
+    def det(self):
+        '''return the determinate of every matrix as an (N,) array'''
+        return numpy.linalg.det(self._array)
+
+    def transpose(self):
+        '''transpose every matrix in place'''
+        self._array=numpy.ascontiguousarray(self._array.transpose(0,2,1))
+
+    def isAffine(self):
+        '''return an (N,) bool array, True where the last column is 0,0,0,1'''
+        return numpy.all(self._array[:,:,3]==(0,0,0,1),axis=1)
+
+    def isOrthogonal(self,tolerance=ORTHOTOLERANCE):
+        '''return an (N,) bool array, True where the x,y,z axes are perpendicular'''
+        rows=self._array[:,:3,:3]
+        gram=numpy.matmul(rows,rows.transpose(0,2,1))
+        diagonal=numpy.diagonal(gram,axis1=1,axis2=2)
+        limit=tolerance*tolerance*diagonal[:,:,numpy.newaxis]*diagonal[:,numpy.newaxis,:]
+        offDiagonal=gram*gram*(1-numpy.eye(3))
+        return numpy.all((offDiagonal<=limit).reshape(-1,9),axis=1)
+
+    def invert(self):
+        '''invert every matrix in place.
+        When every matrix is affine only the 3x3 parts are inverted, using a transpose
+        where all the axes are perpendicular, like Transform.invert.'''
+        if not len(self._array):
+            return
+        if not self.isAffine().all():
+            if not self.det().all():
+                raise ZeroDivisionError("matrix is not invertable")
+            self._array=numpy.linalg.inv(self._array)
+            return
+        rows=self._array[:,:3,:3]
+        orthogonal=self.isOrthogonal()
+        inverse=numpy.empty_like(rows)
+        if orthogonal.any():
+            ortho=rows[orthogonal]
+            sqLength=numpy.sum(ortho*ortho,axis=2)
+            if not sqLength.all():
+                raise ZeroDivisionError("matrix is not invertable")
+            inverse[orthogonal]=ortho.transpose(0,2,1)/sqLength[:,numpy.newaxis,:]
+        if not orthogonal.all():
+            other=rows[~orthogonal]
+            if not numpy.linalg.det(other).all():
+                raise ZeroDivisionError("matrix is not invertable")
+            inverse[~orthogonal]=numpy.linalg.inv(other)
+        newArray=numpy.zeros_like(self._array)
+        newArray[:,:3,:3]=inverse
+        newArray[:,3,:3]=-numpy.einsum('ni,nij->nj',self._array[:,3,:3],inverse)
+        newArray[:,3,3]=1.0
+        self._array=newArray
+
+    def decompose(self,rotationType='quaternion'):
+        '''Return (translation,rotation,scale) for every transform, like
+        Transform.decompose. Translation and scale are VectorArrays, rotation is a
+        QuaternionArray, or a TransformArray if rotationType is 'transform'.'''
+        rows=self._array[:,:3,:3]
+        scale=numpy.sqrt(numpy.sum(rows*rows,axis=2))
+        mirrored=numpy.linalg.det(rows)<0
+        scale[mirrored,0]*=-1
+        if not scale.all():
+            raise ZeroDivisionError("matrix has zero scale, can't find rotation")
+        rotation=numpy.zeros_like(self._array)
+        rotation[:,:3,:3]=rows/scale[:,:,numpy.newaxis]
+        rotation[:,3,3]=1.0
+        rotation=TransformArray(rotation)
+        if rotationType=='quaternion':
+            rotation=QuaternionArray(rotation)
+        elif rotationType!='transform':
+            raise RuntimeError('unknown rotationType argument for decompose:%s'%rotationType)
+        return (self.getTranslation(),rotation,VectorArray(scale))
+
+class QuaternionArray(object):
+    '''Array of rotation quaternions stored in one contiguous (N,4) numpy buffer as x,y,z,w.
+    Initializes empty unless given a list of Quaternions, four element lists or
+    Transforms, another QuaternionArray, a TransformArray (rotations are used) or an
+    (N,4) array. Math is the same as on Quaternion but done on every element at once.
+    Indexing returns a Quaternion. Requires numpy.
+    '''
+    def __init__(self,*args):
+        object.__init__(self)
+        if not numpy:
+            raise RuntimeError("numpy not found. QuaternionArray requires numpy")
+        self._array=None
+        if args:
+            self.set(*args)
+        else:
+            self.identity(0)
+
+    def __len__(self):
+        return len(self._array)
+
+    def __getitem__(self,idx):
+        if isinstance(idx,slice):
+            return QuaternionArray(self._array[idx])
+        x,y,z,w=self._array[idx].tolist()
+        return _newQuaternion(x,y,z,w)
+
+    def __setitem__(self,idx,val):
+        self._array[idx]=Quaternion(val).get()
+
+    def __iter__(self):
+        for x,y,z,w in self._array.tolist():
+            yield _newQuaternion(x,y,z,w)
+
+    def __repr__(self):
+        return 'QuaternionArray(%s)'%','.join(['(%.3f,%.3f,%.3f,%.3f)'%tuple(q) for q in self._array.tolist()])
+
+    def identity(self,count=None):
+        '''set every quaternion to identity. If count is given resize the array to count
+        quaternions'''
+        if count is None:
+            count=len(self._array)
+        self._array=numpy.zeros((count,4))
+        self._array[:,3]=1.0
+
+    def set(self,*args):
+        '''set the array from another QuaternionArray, a TransformArray (rotations), an
+        (N,4) array, or a list of Quaternions, four element lists or Transforms.
+        '''
+        if len(args)!=1:
+            raise RuntimeError("Could not create QuaternionArray from args: %s" % str(args))
+        other=args[0]
+        if isinstance(other,QuaternionArray):
+            self._array=other._array.copy()
+        elif isinstance(other,TransformArray):
+            self.setFromTransformArray(other)
+        elif isinstance(other,numpy.ndarray):
+            self._array=numpy.array(other,dtype=float).reshape(-1,4)
+        elif hasattr(other,'__iter__'):
+            values=[]
+            for item in other:
+                if isinstance(item,Quaternion):
+                    values.append((item.x,item.y,item.z,item.w))
+                elif isinstance(item,(list,tuple)) and len(item)==4:
+                    values.append(item)
+                else:
+                    values.append(Quaternion(item).get())
+            self._array=numpy.array(values,dtype=float).reshape(-1,4)
+        else:
+            raise RuntimeError("Could not create QuaternionArray from args: %s" % str(args))
+
+    def setFromTransformArray(self,xforms):
+        '''set from the rotations of a TransformArray. Scale is removed first.'''
+        rot=xforms._array[:,:3,:3]
+        rot=rot/numpy.sqrt(numpy.sum(rot*rot,axis=2))[:,:,numpy.newaxis]
+        m00,m01,m02=rot[:,0,0],rot[:,0,1],rot[:,0,2]
+        m10,m11,m12=rot[:,1,0],rot[:,1,1],rot[:,1,2]
+        m20,m21,m22=rot[:,2,0],rot[:,2,1],rot[:,2,2]
+        #same branches as Quaternion.setFromTransform, every branch computed then picked
+        branches=numpy.stack((
+            numpy.sqrt(numpy.maximum(1.0+m00+m11+m22,1e-300))*2,
+            numpy.sqrt(numpy.maximum(1.0+m00-m11-m22,1e-300))*2,
+            numpy.sqrt(numpy.maximum(1.0+m11-m00-m22,1e-300))*2,
+            numpy.sqrt(numpy.maximum(1.0+m22-m00-m11,1e-300))*2))
+        candidates=numpy.stack((
+            numpy.stack(((m12-m21),(m20-m02),(m01-m10),0.25*branches[0]**2),axis=-1),
+            numpy.stack((0.25*branches[1]**2,(m01+m10),(m02+m20),(m12-m21)),axis=-1),
+            numpy.stack(((m01+m10),0.25*branches[2]**2,(m12+m21),(m20-m02)),axis=-1),
+            numpy.stack(((m02+m20),(m12+m21),0.25*branches[3]**2,(m01-m10)),axis=-1)))
+        candidates/=branches[:,:,numpy.newaxis]
+        trace=m00+m11+m22
+        choice=numpy.where(trace>0,0,
+            numpy.where((m00>m11)&(m00>m22),1,
+            numpy.where(m11>m22,2,3)))
+        self._array=candidates[choice,numpy.arange(len(choice))]
+
+    def copy(self):
+        '''return a copy of this array'''
+        return QuaternionArray(self)
+
+    def get(self):
+        '''return a list of [x,y,z,w] lists'''
+        return self._array.tolist()
+
+    def getQuaternions(self):
+        '''return a list of Quaternions'''
+        return [_newQuaternion(x,y,z,w) for x,y,z,w in self._array.tolist()]
+
+    def getArray(self,copy=True):
+        '''return the (N,4) numpy array. If copy is False the internal buffer is returned'''
+        if copy:
+            return self._array.copy()
+        return self._array
+
+    def getTransformArray(self):
+        '''return the rotations as a TransformArray'''
+        x,y,z,w=self._array.T
+        xx=x*x;yy=y*y;zz=z*z
+        xy=x*y;xz=x*z;yz=y*z
+        wx=w*x;wy=w*y;wz=w*z
+        matrices=numpy.zeros((len(self._array),4,4))
+        matrices[:,0,:3]=numpy.stack((1-2*(yy+zz),2*(xy+wz),2*(xz-wy)),axis=-1)
+        matrices[:,1,:3]=numpy.stack((2*(xy-wz),1-2*(xx+zz),2*(yz+wx)),axis=-1)
+        matrices[:,2,:3]=numpy.stack((2*(xz+wy),2*(yz-wx),1-2*(xx+yy)),axis=-1)
+        matrices[:,3,3]=1.0
+        return TransformArray(matrices)
+
+    def _operand(self,other):
+        '''return other as an array that broadcasts against the (N,4) buffer'''
+        if isinstance(other,QuaternionArray):
+            return other._array
+        elif isinstance(other,Quaternion):
+            return numpy.array((other.x,other.y,other.z,other.w))
+        raise TypeError("expected Quaternion or QuaternionArray, got '%s'"%other.__class__.__name__)
+
+    def __mul__(self,other):
+        '''combine with another Quaternion or QuaternionArray, rotating by this one and then
+        the other'''
+        ax,ay,az,aw=numpy.moveaxis(numpy.broadcast_to(self._operand(other),self._array.shape),-1,0)
+        bx,by,bz,bw=self._array.T
+        return QuaternionArray(numpy.stack((
+            aw*bx + ax*bw + ay*bz - az*by,
+            aw*by - ax*bz + ay*bw + az*bx,
+            aw*bz + ax*by - ay*bx + az*bw,
+            aw*bw - ax*bx - ay*by - az*bz),axis=-1))
+
+    def dot(self,other):
+        '''return the dot product of every quaternion with another as an (N,) array'''
+        return numpy.sum(self._array*self._operand(other),axis=-1)
+
+    def length(self):
+        '''return the length of every quaternion as an (N,) array'''
+        return numpy.sqrt(numpy.sum(self._array*self._array,axis=-1))
+
+    def normalize(self):
+        '''normalize every quaternion in place'''
+        self._array/=self.length()[:,numpy.newaxis]
+
+    def invert(self):
+        '''invert every quaternion in place'''
+        sqLength=numpy.sum(self._array*self._array,axis=-1)
+        if not sqLength.all():
+            raise ZeroDivisionError("quaternion is not invertable")
+        self._array/=sqLength[:,numpy.newaxis]
+        self._array[:,:3]*=-1
+
+    def _weights(self,weight):
+        '''return weight as an (N,1) array'''
+        weight=numpy.asarray(weight,dtype=float)
+        return numpy.broadcast_to(weight.reshape(-1,1),(len(self._array),1))
+
+    def lerp(self,other,weight):
+        '''return the normalized linear interpolation between every quaternion and another
+        Quaternion or QuaternionArray. weight can be a float or one weight per quaternion.
+        Takes the shortest path.'''
+        sign=numpy.where(self.dot(other)<0,-1.0,1.0)
+        otherArray=self._operand(other)*sign[:,numpy.newaxis]
+        weight=self._weights(weight)
+        newQ=QuaternionArray(self._array*(1.0-weight)+otherArray*weight)
+        newQ.normalize()
+        return newQ
+
+    def slerp(self,other,weight):
+        '''return the spherical interpolation between every quaternion and another
+        Quaternion or QuaternionArray. weight can be a float or one weight per quaternion.
+        Takes the shortest path.'''
+        dot=self.dot(other)
+        sign=numpy.where(dot<0,-1.0,1.0)
+        dot=numpy.abs(dot)
+        otherArray=self._operand(other)*sign[:,numpy.newaxis]
+        weight=self._weights(weight)
+        #nearly identical rotations get lerped, like Quaternion.slerp
+        useLerp=dot>SLERPTHRESHOLD
+        angle=numpy.arccos(numpy.minimum(dot,1.0))[:,numpy.newaxis]
+        sinAngle=numpy.where(useLerp[:,numpy.newaxis],1.0,numpy.sin(angle))
+        thisWeight=numpy.where(useLerp[:,numpy.newaxis],1.0-weight,numpy.sin((1.0-weight)*angle)/sinAngle)
+        otherWeight=numpy.where(useLerp[:,numpy.newaxis],weight,numpy.sin(weight*angle)/sinAngle)
+        result=self._array*thisWeight+otherArray*otherWeight
+        lerpLength=numpy.sqrt(numpy.sum(result*result,axis=-1))
+        result[useLerp]/=lerpLength[useLerp][:,numpy.newaxis]
+        return QuaternionArray(result)
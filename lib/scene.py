@@ -0,0 +1,309 @@
+'''Access to the Maya scene commands, with optional call tracing.
+
+Every mpyr module gets maya.cmds and maya.mel through this module:
+
+    from mpyr.lib.scene import cmds
+
+cmds and mel here are thin proxies. The first time a command is used it is looked up
+on the real module and stored on the proxy, after that cmds.xform is a plain module
+attribute lookup, costing nanoseconds on top of the command itself.
+
+While a Trace is open, commands are wrapped to count calls per command and per
+calling function, and to time them:
+
+    with mpScene.Trace() as trace:
+        biped.Rig().create()
+    print(trace.getTable())
+    print(trace.getCallers('objExists')) #e.g. how many objExists calls Name.get made
+
+Opening or closing a Trace clears the stored commands, so no wrapper is left behind and
+there is no overhead when tracing is off. Code that keeps its own reference to a
+command (func = cmds.xform) keeps whatever it was given.
+
+The commands can be sent somewhere other than Maya with setBackend or Backend, for
+example to the in-memory scene of lib.fakeScene to build and profile rigs outside Maya.
+Code that uses the Maya API next to cmds should check isMaya() first.
+'''
+import sys
+import time
+import types
+try:
+    import maya.cmds as _mayaCmds
+except ImportError:
+    _mayaCmds=None
+try:
+    import maya.mel as _mayaMel
+except ImportError:
+    _mayaMel=None
+
+#best wall clock available, time.time on python 2
+_clock=getattr(time,'perf_counter',time.time)
+
+#upper bounds in seconds of the latency histogram buckets, the last bucket is open ended
+HISTOGRAMBOUNDS=(1e-6,1e-5,1e-4,1e-3,1e-2,1e-1,1.0)
+
+_trace=None #the open Trace
+
+class CommandProxy(types.ModuleType):
+    '''Stands in for a command module (maya.cmds, maya.mel). Attribute lookups are
+    forwarded to the module and remembered. Is False if the module isn't available,
+    so 'if not cmds' still tells if Maya is there.
+
+    The proxy is a module object itself, so a remembered command is found exactly the
+    way it would be on maya.cmds. Misses go to _lookup, through a module __getattr__
+    on python 3.7+ and a class __getattr__ before that.'''
+    def __init__(self,name,module,prefix=''):
+        types.ModuleType.__init__(self,name)
+        self.__dict__['_module']=module
+        self.__dict__['_prefix']=prefix
+        if sys.version_info>=(3,7):
+            self.__dict__['__getattr__']=self._lookup
+
+    def __repr__(self):
+        return '<%s %s of %s>'%(self.__class__.__name__,self.__name__,self._module)
+
+    def __bool__(self):
+        return self._module is not None
+    __nonzero__=__bool__
+
+    def _lookup(self,name):
+        '''find a command on the module, wrap it if a Trace is open, and remember it'''
+        module=self.__dict__['_module']
+        if module is None or name.startswith('__'):
+            raise AttributeError("'%s' not found, Maya commands are only available inside Maya"%name)
+        func=getattr(module,name)
+        if _trace is not None and callable(func):
+            func=_trace.wrap(self._prefix+name,func)
+        self.__dict__[name]=func
+        return func
+
+    def _clear(self):
+        '''forget every remembered command so the next lookup goes to the module again'''
+        for name in list(self.__dict__):
+            if not name.startswith('_'):
+                del self.__dict__[name]
+
+    def _setModule(self,module):
+        self.__dict__['_module']=module
+        self._clear()
+
+if sys.version_info<(3,7):
+    CommandProxy.__getattr__=CommandProxy._lookup #no module __getattr__ support
+
+cmds=CommandProxy('mpyr.lib.scene.cmds',_mayaCmds)
+mel=CommandProxy('mpyr.lib.scene.mel',_mayaMel,prefix='mel.')
+
+def _clearProxies():
+    cmds._clear()
+    mel._clear()
+
+def setBackend(cmdsModule,melModule=None):
+    '''send cmds and mel to other modules, any object with the maya.cmds functions mpyr
+    uses will do (see lib.fakeScene). None for both makes the commands unavailable.'''
+    cmds._setModule(cmdsModule)
+    mel._setModule(melModule)
+
+def resetBackend():
+    '''send cmds and mel back to maya.cmds and maya.mel'''
+    setBackend(_mayaCmds,_mayaMel)
+
+def getBackend():
+    '''return the (cmds,mel) modules commands are sent to'''
+    return cmds._module,mel._module
+
+def isMaya():
+    '''return True if commands go to the real Maya, so the Maya API can be used too'''
+    return _mayaCmds is not None and cmds._module is _mayaCmds
+
+class Backend(object):
+    '''Context manager that sends cmds and mel to other modules while it is open, and
+    puts the previous ones back on exit'''
+    def __init__(self,cmdsModule,melModule=None):
+        object.__init__(self)
+        self.modules=(cmdsModule,melModule)
+        self._previous=None
+
+    def __enter__(self):
+        self._previous=getBackend()
+        setBackend(*self.modules)
+        return self
+
+    def __exit__(self,excType,excValue,traceback):
+        setBackend(*self._previous)
+        return False
+
+class UndoChunk(object):
+    '''Context manager that makes every command run while it is open a single undo step'''
+    def __init__(self,name=None):
+        object.__init__(self)
+        self.name=name
+
+    def __enter__(self):
+        if self.name:
+            cmds.undoInfo(openChunk=True,chunkName=self.name)
+        else:
+            cmds.undoInfo(openChunk=True)
+        return self
+
+    def __exit__(self,excType,excValue,traceback):
+        cmds.undoInfo(closeChunk=True)
+        return False
+
+def getCaller(depth=2):
+    '''return 'module.function' of the code calling a command, depth frames up'''
+    frame=sys._getframe(depth)
+    return '%s.%s'%(frame.f_globals.get('__name__','?'),frame.f_code.co_name)
+
+def _bucket(seconds):
+    for idx,bound in enumerate(HISTOGRAMBOUNDS):
+        if seconds<bound:
+            return idx
+    return len(HISTOGRAMBOUNDS)
+
+def _bucketLabel(idx):
+    def fmt(seconds):
+        if seconds<1e-3:
+            return '%gus'%(seconds*1e6)
+        if seconds<1.0:
+            return '%gms'%(seconds*1e3)
+        return '%gs'%seconds
+    if idx==0:
+        return '<%s'%fmt(HISTOGRAMBOUNDS[0])
+    if idx==len(HISTOGRAMBOUNDS):
+        return '>=%s'%fmt(HISTOGRAMBOUNDS[-1])
+    return '%s-%s'%(fmt(HISTOGRAMBOUNDS[idx-1]),fmt(HISTOGRAMBOUNDS[idx]))
+
+class CommandStats(object):
+    '''Call count, timing and callers of one command'''
+    def __init__(self,name):
+        object.__init__(self)
+        self.name=name
+        self.calls=0
+        self.seconds=0.0
+        self.maxSeconds=0.0
+        self.callers={}
+        self.histogram=[0]*(len(HISTOGRAMBOUNDS)+1)
+
+    def __repr__(self):
+        return '%s(%s) %s calls %.3fs'%(self.__class__.__name__,self.name,self.calls,self.seconds)
+
+    def add(self,seconds,caller):
+        self.calls+=1
+        self.seconds+=seconds
+        if seconds>self.maxSeconds:
+            self.maxSeconds=seconds
+        self.callers[caller]=self.callers.get(caller,0)+1
+        self.histogram[_bucket(seconds)]+=1
+
+    def toDict(self):
+        return {
+            'calls':self.calls,
+            'seconds':self.seconds,
+            'maxSeconds':self.maxSeconds,
+            'callers':dict(self.callers),
+            'histogram':dict((_bucketLabel(idx),count) for idx,count in enumerate(self.histogram)),
+            }
+
+class Trace(object):
+    '''Context manager that records every cmds and mel call made while it is open.
+    Only one trace can be open at a time, opening a second raises RuntimeError.
+    Set callers=False to skip recording the calling function, which is the slowest
+    part of tracing.'''
+    def __init__(self,callers=True):
+        object.__init__(self)
+        self.recordCallers=callers
+        self.commands={}
+        self.seconds=0.0
+        self._start=0.0
+
+    def __enter__(self):
+        global _trace
+        if _trace is not None:
+            raise RuntimeError('A scene Trace is already open')
+        _trace=self
+        _clearProxies()
+        self._start=_clock()
+        return self
+
+    def __exit__(self,excType,excValue,traceback):
+        global _trace
+        self.seconds+=_clock()-self._start
+        _trace=None
+        _clearProxies()
+        return False
+
+    def wrap(self,name,func):
+        '''return func wrapped to record its calls under name'''
+        stats=self.commands.get(name)
+        if stats is None:
+            stats=self.commands[name]=CommandStats(name)
+        recordCallers=self.recordCallers
+        def traced(*args,**kwargs):
+            start=_clock()
+            try:
+                return func(*args,**kwargs)
+            finally:
+                stats.add(_clock()-start,getCaller() if recordCallers else '')
+        traced.__name__=name.split('.')[-1]
+        traced.__doc__=func.__doc__
+        return traced
+
+    def getCalls(self):
+        '''return the total number of calls recorded'''
+        return sum(stats.calls for stats in self.commands.values())
+
+    def getCounts(self):
+        '''return a dict of command name: number of calls'''
+        return dict((name,stats.calls) for name,stats in self.commands.items() if stats.calls)
+
+    def getCallers(self,command=None):
+        '''return a dict of calling function: number of calls, for one command or all'''
+        callers={}
+        for name,stats in self.commands.items():
+            if command is None or name==command:
+                for caller,count in stats.callers.items():
+                    callers[caller]=callers.get(caller,0)+count
+        return callers
+
+    def getHistogram(self,command=None):
+        '''return a list of (bucket label,number of calls) latencies, for one command or all'''
+        counts=[0]*(len(HISTOGRAMBOUNDS)+1)
+        for name,stats in self.commands.items():
+            if command is None or name==command:
+                for idx,count in enumerate(stats.histogram):
+                    counts[idx]+=count
+        return [(_bucketLabel(idx),count) for idx,count in enumerate(counts)]
+
+    def getTable(self,top=20):
+        '''return a text report: the most called commands, their top callers and the
+        latency histogram of all calls'''
+        used=sorted((stats for stats in self.commands.values() if stats.calls),key=lambda stats:-stats.calls)
+        lines=['%d scene calls, %.1f ms in commands, %.1f ms traced'%(
+            self.getCalls(),1000.0*sum(stats.seconds for stats in used),1000.0*self.seconds)]
+        lines.append('%-28s %8s %10s %10s %10s'%('command','calls','total ms','mean us','max us'))
+        for stats in used[:top]:
+            lines.append('%-28s %8d %10.1f %10.1f %10.1f'%(stats.name,stats.calls,stats.seconds*1000.0,
+                1e6*stats.seconds/stats.calls,stats.maxSeconds*1e6))
+        callers=sorted(self.getCallers().items(),key=lambda item:-item[1])
+        if callers and callers[0][0]:
+            lines.append('')
+            lines.append('%-60s %8s'%('caller','calls'))
+            for caller,count in callers[:top]:
+                lines.append('%-60s %8d'%(caller,count))
+        lines.append('')
+        lines.append('%-28s %8s'%('latency','calls'))
+        for label,count in self.getHistogram():
+            lines.append('%-28s %8d'%(label,count))
+        return '\n'.join(lines)
+
+    def toDict(self):
+        '''return the trace as a dict that can be saved as json'''
+        return {
+            'calls':self.getCalls(),
+            'seconds':self.seconds,
+            'commands':dict((name,stats.toDict()) for name,stats in self.commands.items() if stats.calls),
+            }
+
+def isTracing():
+    '''return True if a Trace is open'''
+    return _trace is not None
@@ -0,0 +1,236 @@
+'''World space transform queries, with a scoped cache for rig builds.
+
+Building a limb asks Maya for the world position of the same joints many times.
+While an XformCache is open, world matrices and translations queried through this
+module are remembered per node, so each node is only queried once:
+
+    with mpXform.XformCache():
+        startV = rigmath.Vector(startJoint) #queried
+        startX = rigmath.Transform(startJoint) #from cache
+
+rigmath.Vector and rigmath.Transform go through this module when given an object
+name, so code using them gets the cache for free. With no cache open every query goes
+straight to Maya, exactly like before.
+
+Moving a node moves all of its children too, so the whole cache is cleared by
+invalidate(), when the outermost XformCache closes, and after any mpyr function
+decorated with @invalidates (functions that move, parent or re-orient nodes).
+Functions decorated with @cached run inside their own XformCache.
+Code inside a cache that moves already queried nodes with cmds directly should call
+invalidate() itself.
+
+getWorldMatrices and getWorldTranslations query many nodes in one pass, through the
+OpenMaya API when commands go to Maya, instead of one cmds.xform call per node.
+'''
+import functools
+import mpyr.lib.scene as mpScene
+from mpyr.lib.scene import cmds
+try:
+    import maya.api.OpenMaya as om
+except ImportError:
+    om=None
+
+#set to False to make every XformCache do nothing, for debugging or comparing query counts
+ENABLED=True
+
+_depth=0
+_matrices={}
+_translations={}
+_stats={'hits':0,'misses':0,'invalidations':0}
+
+class XformCache(object):
+    '''Context manager that caches world space queries until it closes. Nesting is
+    allowed, inner caches share the outer one.'''
+    def __init__(self):
+        object.__init__(self)
+        self._opened=[] #per __enter__, whether it opened a cache (ENABLED may change meanwhile)
+
+    def __enter__(self):
+        global _depth
+        self._opened.append(ENABLED)
+        if ENABLED:
+            _depth+=1
+        return self
+
+    def __exit__(self,excType,excValue,traceback):
+        global _depth
+        if self._opened.pop() and _depth:
+            _depth-=1
+            if not _depth:
+                _clear()
+        return False
+
+def isActive():
+    '''return True if a cache is open'''
+    return bool(_depth)
+
+def _clear():
+    _matrices.clear()
+    _translations.clear()
+
+def invalidate():
+    '''forget every cached query. Call after moving, parenting or orienting nodes that
+    may have been queried while a cache is open.'''
+    if _matrices or _translations:
+        _stats['invalidations']+=1
+    _clear()
+
+def invalidates(func):
+    '''decorator for functions that move, parent or re-orient nodes. Clears the cache
+    after the function runs.'''
+    @functools.wraps(func)
+    def wrapper(*args,**kwargs):
+        try:
+            return func(*args,**kwargs)
+        finally:
+            if _depth:
+                invalidate()
+    return wrapper
+
+def cached(func):
+    '''decorator that runs the function inside an XformCache'''
+    @functools.wraps(func)
+    def wrapper(*args,**kwargs):
+        with XformCache():
+            return func(*args,**kwargs)
+    return wrapper
+
+def getStats():
+    '''return a dict of cache hits, misses (queries sent to Maya) and invalidations'''
+    return dict(_stats)
+
+def resetStats():
+    '''zero the counters returned by getStats'''
+    for key in _stats:
+        _stats[key]=0
+
+def _checkCmds():
+    if not cmds:
+        raise RuntimeError("Maya.cmds not found. This method can only be used inside Maya")
+
+def exists(node):
+    '''return True if node exists. Nodes already in the cache are not queried again.'''
+    if node in _matrices or node in _translations:
+        return True
+    return bool(cmds) and cmds.objExists(node)
+
+def getWorldMatrix(node):
+    '''return the 16 element world matrix of node as a new list'''
+    if _depth:
+        matrix=_matrices.get(node)
+        if matrix is not None:
+            _stats['hits']+=1
+            return list(matrix)
+    _checkCmds()
+    _stats['misses']+=1
+    matrix=cmds.xform(node,ws=True,m=True,q=True)
+    if _depth:
+        _matrices[node]=list(matrix)
+    return matrix
+
+def getWorldTranslation(node):
+    '''return the [x,y,z] world translation of node as a new list'''
+    if _depth:
+        matrix=_matrices.get(node)
+        if matrix is not None:
+            _stats['hits']+=1
+            return matrix[12:15]
+        translation=_translations.get(node)
+        if translation is not None:
+            _stats['hits']+=1
+            return list(translation)
+    _checkCmds()
+    _stats['misses']+=1
+    translation=cmds.xform(node,ws=True,q=True,t=True)
+    if _depth:
+        _translations[node]=list(translation)
+    return translation
+
+def _queryMatrices(nodes):
+    '''return world matrices of unique nodes from Maya, as a list of 16 element lists'''
+    if om and mpScene.isMaya():
+        try:
+            selection=om.MSelectionList()
+            for node in nodes:
+                selection.add(node)
+            if selection.length()==len(nodes):
+                return [list(selection.getDagPath(idx).inclusiveMatrix()) for idx in range(len(nodes))]
+        except RuntimeError:
+            pass #ambiguous or non dag names, let cmds report the problem
+    _checkCmds()
+    return [cmds.xform(node,ws=True,m=True,q=True) for node in nodes]
+
+def getWorldMatrices(nodes,flat=False):
+    '''return the world matrices of many nodes as a list of 16 element lists, or one
+    flat list of 16*len(nodes) floats if flat is True. Nodes are queried in one pass,
+    cached nodes are not queried again.'''
+    matrices={}
+    toQuery=[]
+    for node in nodes:
+        if node in matrices:
+            continue
+        matrix=_matrices.get(node) if _depth else None
+        if matrix is not None:
+            _stats['hits']+=1
+            matrices[node]=matrix
+        else:
+            matrices[node]=None
+            toQuery.append(node)
+    if toQuery:
+        _stats['misses']+=len(toQuery)
+        for node,matrix in zip(toQuery,_queryMatrices(toQuery)):
+            matrices[node]=matrix
+            if _depth:
+                _matrices[node]=list(matrix)
+    if flat:
+        result=[]
+        for node in nodes:
+            result.extend(matrices[node])
+        return result
+    return [list(matrices[node]) for node in nodes]
+
+def getWorldMatricesAtFrames(nodes,frames):
+    '''return the world matrices of many nodes on many frames, as a list with one list
+    of 16 element matrices per frame. Nodes are evaluated at each frame without
+    changing the current time, through the OpenMaya API when commands go to Maya and
+    with getAttr -time otherwise. Nothing is cached, the cache is for the current time.'''
+    if om and mpScene.isMaya():
+        try:
+            selection=om.MSelectionList()
+            for node in nodes:
+                selection.add(node)
+            if selection.length()==len(nodes):
+                plugs=[om.MFnDependencyNode(selection.getDependNode(idx)).findPlug('worldMatrix',False).elementByLogicalIndex(0)
+                    for idx in range(len(nodes))]
+                unit=om.MTime.uiUnit()
+                result=[]
+                for frame in frames:
+                    context=om.MDGContext(om.MTime(frame,unit))
+                    if hasattr(context,'makeCurrent'): #2018+, asMObject(context) is deprecated
+                        previous=context.makeCurrent()
+                        try:
+                            result.append([list(om.MFnMatrixData(plug.asMObject()).matrix()) for plug in plugs])
+                        finally:
+                            previous.makeCurrent()
+                    else:
+                        result.append([list(om.MFnMatrixData(plug.asMObject(context)).matrix()) for plug in plugs])
+                return result
+        except RuntimeError:
+            pass #ambiguous or non dag names, let cmds report the problem
+    _checkCmds()
+    return [[list(cmds.getAttr(node+'.worldMatrix',time=frame)) for node in nodes] for frame in frames]
+
+def getWorldTranslations(nodes):
+    '''return the world translations of many nodes as a list of [x,y,z] lists'''
+    if om and mpScene.isMaya():
+        return [matrix[12:15] for matrix in getWorldMatrices(nodes)]
+    translations={}
+    for node in nodes:
+        if node not in translations:
+            translations[node]=getWorldTranslation(node)
+    return [list(translations[node]) for node in nodes]
+
+def getWorldTransforms(nodes):
+    '''return the world matrices of many nodes as a list of rigmath Transforms'''
+    import mpyr.lib.rigmath as rigmath #imported here, rigmath imports this module
+    return [rigmath.Transform(matrix) for matrix in getWorldMatrices(nodes)]
@@ -1,6 +1,6 @@
 '''generic limbs. Offsets, etc.'''
 
-import maya.cmds as cmds
+from mpyr.lib.scene import cmds
 import mpyr.lib.rigmath as mpMath
 import mpyr.lib.rig as mpRig
 import mpyr.lib.joint as mpJoint
@@ -190,7 +190,7 @@ class NurbsStrip(limbBase.Limb):
         self.addPinParent()
         self.addAttrLimb(ln='noStretch', at='float',min=0,max=1,dv=0,k=True,s=1)
         self.addAttrLimb(ln='slideAlong', at='float',min=-1,max=1,dv=0,k=True,s=1)
-        jointList = mpJoint.getJointList(self.startJoint,self.endJoint)
+        jointList = mpJoint.getJointList(self.startJoint,self.endJoint,snapshot=self.getSkeletonSnapshot())
         if len(jointList) < 2:
             raise RuntimeError('NurbsStrip requires at least 2 joints in chain. Got %s'%len(jointList))
 
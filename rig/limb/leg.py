@@ -1,13 +1,14 @@
 '''Leg Limbs, such as biped five joint leg'''
 import math
 import logging
-import maya.cmds as cmds
+from mpyr.lib.scene import cmds
 import mpyr.lib.rigmath as mpMath
 import mpyr.lib.joint as mpJoint
 import mpyr.lib.name as mpName
 import mpyr.lib.attr as mpAttr
 import mpyr.lib.rig as mpRig
 import mpyr.lib.ctrl as mpCtrl
+import mpyr.lib.xform as mpXform
 import mpyr.rig.limb.limbBase as limbBase
 
 RIGLOG = logging.getLogger('rig.limb')
@@ -30,8 +31,9 @@ class LegFKIK(limbBase.Limb):
         if not self.endJoint or not cmds.objExists(self.endJoint):
             raise RuntimeError('invalid endJoint: %s' % self.endJoint)
 
+    @mpXform.cached
     def build(self):
-        jointList = mpJoint.getJointList(self.startJoint,self.endJoint)
+        jointList = mpJoint.getJointList(self.startJoint,self.endJoint,snapshot=self.getSkeletonSnapshot())
         if len(jointList) < 5:
             raise RuntimeError('LegFKIK requires at least 5 joints in chain: hip/knee/ankle/ball/toetip. Got %s'%len(jointList))
         
@@ -128,22 +130,22 @@ class LegFKIK(limbBase.Limb):
         #Make some nulls to act as snap targets. This is because IK and FK controls might have different axis order or initial positions.
         self.name.desc='ikAnkleSnapTarget'
         ikAnkleSnapTarget = cmds.group(em=True,n=self.name.get(),p=legCtrls[-3]) 
-        cmds.xform(ikAnkleSnapTarget,ws=True,m=cmds.xform(footCtrl,ws=True,q=True,m=True))
+        cmds.xform(ikAnkleSnapTarget,ws=True,m=mpXform.getWorldMatrix(footCtrl))
         mpRig.addSnapParent(footCtrl,ikAnkleSnapTarget)
 
         self.name.desc='ikBallSnapTarget'
         ikBallSnapTarget = cmds.group(em=True,n=self.name.get(),p=ballFKCtrl) 
-        cmds.xform(ikBallSnapTarget,ws=True,m=cmds.xform(ballCtrl,ws=True,q=True,m=True))
+        cmds.xform(ikBallSnapTarget,ws=True,m=mpXform.getWorldMatrix(ballCtrl))
         mpRig.addSnapParent(ballCtrl,ikBallSnapTarget)
 
         self.name.desc='fkBallSnapTarget'
         fkBallSnapTarget = cmds.group(em=True,n=self.name.get(),p=ballCtrl) 
-        cmds.xform(fkBallSnapTarget,ws=True,m=cmds.xform(ballFKCtrl,ws=True,q=True,m=True))
+        cmds.xform(fkBallSnapTarget,ws=True,m=mpXform.getWorldMatrix(ballFKCtrl))
         mpRig.addSnapParent(ballFKCtrl,fkBallSnapTarget)
         
         self.name.desc='ikToeSnapTarget'
         ikToeSnapTarget = cmds.group(em=True,n=self.name.get(),p=ballFKCtrl) 
-        cmds.xform(ikToeSnapTarget,ws=True,m=cmds.xform(toeTipCtrl,ws=True,q=True,m=True))
+        cmds.xform(ikToeSnapTarget,ws=True,m=mpXform.getWorldMatrix(toeTipCtrl))
         mpRig.addSnapParent(toeTipCtrl,ikToeSnapTarget)
 
         #add new ctrls to vis switch
@@ -179,14 +181,15 @@ class DogLeg(limbBase.Limb):
         if not self.endJoint or not cmds.objExists(self.endJoint):
             raise RuntimeError('invalid endJoint: %s' % self.endJoint)  
 
+    @mpXform.cached
     def build(self):
-        jointList = mpJoint.getJointList(self.startJoint,self.endJoint)
+        jointList = mpJoint.getJointList(self.startJoint,self.endJoint,snapshot=self.getSkeletonSnapshot())
         if len(jointList) < 5:
             raise RuntimeError('LegFKIK requires at least 5 joints in chain: hip/knee/ankle/ball/toetip. Got %s'%len(jointList))
 
         #Internally the dog leg is driven by a 3 joint ik system made here.
         #This three joint IK has the same total length as hip->ball joint chain.
-        length=mpJoint.getChainLength(jointList[0],jointList[-2])
+        length=mpJoint.getChainLength(jointList[0],jointList[-2],snapshot=self.getSkeletonSnapshot())
         halfLength=length/2.0
 
         hip=mpMath.Vector(jointList[0])
@@ -300,22 +303,22 @@ class DogLeg(limbBase.Limb):
         #Make some nulls to act as snap targets. This is because IK and FK controls might have different axis order or initial positions.
         self.name.desc='ikAnkleSnapTarget'
         ikAnkleSnapTarget = cmds.group(em=True,n=self.name.get(),p=jointList[-2]) 
-        cmds.xform(ikAnkleSnapTarget,ws=True,m=cmds.xform(footCtrl,ws=True,q=True,m=True))
+        cmds.xform(ikAnkleSnapTarget,ws=True,m=mpXform.getWorldMatrix(footCtrl))
         mpRig.addSnapParent(footCtrl,ikAnkleSnapTarget)
 
         self.name.desc='ikBallSnapTarget'
         ikBallSnapTarget = cmds.group(em=True,n=self.name.get(),p=ballFKCtrl) 
-        cmds.xform(ikBallSnapTarget,ws=True,m=cmds.xform(ballCtrl,ws=True,q=True,m=True))
+        cmds.xform(ikBallSnapTarget,ws=True,m=mpXform.getWorldMatrix(ballCtrl))
         mpRig.addSnapParent(ballCtrl,ikBallSnapTarget)
 
         self.name.desc='fkBallSnapTarget'
         fkBallSnapTarget = cmds.group(em=True,n=self.name.get(),p=jointList[-2]) 
-        cmds.xform(fkBallSnapTarget,ws=True,m=cmds.xform(ballFKCtrl,ws=True,q=True,m=True))
+        cmds.xform(fkBallSnapTarget,ws=True,m=mpXform.getWorldMatrix(ballFKCtrl))
         mpRig.addSnapParent(ballFKCtrl,fkBallSnapTarget)
         
         self.name.desc='ikToeSnapTarget'
         ikToeSnapTarget = cmds.group(em=True,n=self.name.get(),p=ballFKCtrl) 
-        cmds.xform(ikToeSnapTarget,ws=True,m=cmds.xform(toeTipCtrl,ws=True,q=True,m=True))
+        cmds.xform(ikToeSnapTarget,ws=True,m=mpXform.getWorldMatrix(toeTipCtrl))
         mpRig.addSnapParent(toeTipCtrl,ikToeSnapTarget)
 
         #add new ctrls to vis switch
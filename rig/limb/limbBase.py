@@ -24,7 +24,7 @@ They should all inherit from Limb or some intermediate class.
 import logging
 import inspect
 import copy
-import maya.cmds as cmds
+from mpyr.lib.scene import cmds
 
 import mpyr.lib.attr as mpAttr
 import mpyr.lib.name as mpName
@@ -34,9 +34,16 @@ import mpyr.lib.rigmath as mpMath
 import mpyr.lib.joint as mpJoint
 import mpyr.lib.rig as mpRig
 import mpyr.lib.cache as mpCache
+import mpyr.lib.xform as mpXform
+import mpyr.lib.profiler as mpProfiler
 
 RIGLOG = logging.getLogger('rig.limb')
 
+try:
+    _stringTypes=(basestring,)
+except NameError:
+    _stringTypes=(str,)
+
 class Limb(object):
     '''This is a virtual base class for all other limbs.
     All implemented limbs should inherit from this class or it's children.
@@ -131,7 +138,7 @@ class Limb(object):
         #Otherwise grab whatever is driving 'other' and see if it's a ctrl
         elif cmds.objExists(other):
             endCtrl=mpRig.getCtrlFromJoint(other)
-            print 'endCtrl:',endCtrl
+            RIGLOG.debug('endCtrl: %s',endCtrl)
             if mpCtrl.isCtrl(endCtrl):
                 RIGLOG.debug('wiring pickParent from %s to %s',self.startCtrl,endCtrl)
                 mpRig.addPickParent(self.startCtrl,endCtrl)
@@ -158,7 +165,7 @@ class Limb(object):
         self.pinParent = cmds.group(em=True,n=self.name.get(),p=self.limbNode)
         #try to move the pinParent to start joint, for a sensible pivot
         if self.startJoint:
-            cmds.xform(self.pinParent,ws=True,m=cmds.xform(self.startJoint,ws=True,q=True,m=True))
+            cmds.xform(self.pinParent,ws=True,m=mpXform.getWorldMatrix(self.startJoint))
         return self.pinParent
         
     def addPinWorld(self):
@@ -169,7 +176,7 @@ class Limb(object):
         self.name.desc = mpName.PINWORLD
         self.pinWorld = cmds.group(em=True,n=self.name.get(),p=self.limbNode)
         if self.startJoint:
-            cmds.xform(self.pinWorld,ws=True,m=cmds.xform(self.startJoint,ws=True,q=True,m=True))
+            cmds.xform(self.pinWorld,ws=True,m=mpXform.getWorldMatrix(self.startJoint))
         return self.pinWorld
 
     def addPinBlend(self):
@@ -198,13 +205,17 @@ class Limb(object):
         '''This method builds the limb by calling the creation methods in the correct 
         order.
         '''
-        RIGLOG.info('begin limb %s',self)
-        self.begin()
-        RIGLOG.debug('limb build')
-        self.build()
-        RIGLOG.debug('ending limb build')
-        self.end()
-        RIGLOG.info('limb build complete')
+        with mpProfiler.phase(str(self)):
+            RIGLOG.info('begin limb %s',self)
+            with mpProfiler.phase('begin'):
+                self.begin()
+            RIGLOG.debug('limb build')
+            with mpProfiler.phase('build'):
+                self.build()
+            RIGLOG.debug('ending limb build')
+            with mpProfiler.phase('end'):
+                self.end()
+            RIGLOG.info('limb build complete')
         
     def begin(self):
         '''Limb build setup. Make a top level node, some nodes that are on all limbs'''
@@ -219,6 +230,7 @@ class Limb(object):
         '''Runs at end of limb creation'''
         self.instanceLimbNodeShape()
         mpAttr.visOveride(self.noXform,0)
+        self.addDriverGraph()
         self.setStartEndCtrls()
         
     def build(self):
@@ -266,14 +278,38 @@ class Limb(object):
 
         return(zero,control)
 
+    def getCtrlsByType(self):
+        '''return the ctrls of the limb as three lists: FK ctrls, IK ctrls and the rest,
+        sorted by the name suffix addCtrl gives each type'''
+        fkCtrls = []
+        ikCtrls = []
+        ctrls = []
+        for ctrl in self.ctrls:
+            if ctrl.endswith(mpName.FKCTRL):
+                fkCtrls.append(ctrl)
+            elif ctrl.endswith(mpName.IKCTRL):
+                ikCtrls.append(ctrl)
+            else:
+                ctrls.append(ctrl)
+        return fkCtrls,ikCtrls,ctrls
+
+    @mpXform.invalidates
     def deleteCtrl(self,ctrl):
         '''removed a ctrl nodes and info from limb'''
         RIGLOG.debug('deleting control %s',ctrl)
         zeroNode = cmds.listRelatives(ctrl,p=1)[0]
         cmds.delete(ctrl)
         cmds.delete(zeroNode)
+        mpName.release(ctrl)
         self.ctrls.remove(ctrl)
         
+    def getSkeletonSnapshot(self):
+        '''return the rig's skeleton HierarchySnapshot, or None if this limb isn't being
+        built by a rig. Joints that aren't in it are looked up in the scene as usual.'''
+        if self.rig:
+            return self.rig.getSkeletonSnapshot()
+        return None
+
     def getLimbNode(self):
         '''make or return the top level node for the limb'''
         #if already exists exit
@@ -333,7 +369,7 @@ class Limb(object):
         - parent = parent of the first ctrl
         '''
         RIGLOG.debug('adding FKChain')
-        jointList = mpJoint.getJointList(startJoint,endJoint)
+        jointList = mpJoint.getJointList(startJoint,endJoint,snapshot=self.getSkeletonSnapshot())
         ctrlParent = parent
         fkCtrls = []
         prevCtrl = None
@@ -352,6 +388,7 @@ class Limb(object):
             mpRig.addSnapParent(fkCtrl,joint) #for snapping FK to IK
         return fkCtrls
 
+    @mpXform.cached
     def addIKChain(self,startJoint,endJoint,worldParent):
         '''Create an IK RP solver on a chain with end and aim ctrls. Requires three or more joints in chain.
         Also creates a "stub" joint with an SC solver at the end of the chain, so that the last joint's
@@ -359,7 +396,7 @@ class Limb(object):
         - worldParent = Drives IK translate and rotate.
         Returns list of [IKAim,IKEnd] ctrls
         '''
-        jointList = mpJoint.getJointList(startJoint,endJoint)
+        jointList = mpJoint.getJointList(startJoint,endJoint,snapshot=self.getSkeletonSnapshot())
         if len(jointList)<3:
             raise RuntimeError('FKIKChain needs at least three joints')
         #Create IK Chain
@@ -383,7 +420,7 @@ class Limb(object):
         #make an 'end null' to have a buffer between the last ctrl and the handle
         self.name.desc = 'IKEnd'
         endNull = cmds.group(em=True,n=self.name.get(),p=self.noXform)
-        cmds.xform(endNull,ws=True,m=cmds.xform(endCtrl,ws=True,q=True,m=True))
+        cmds.xform(endNull,ws=True,m=mpXform.getWorldMatrix(endCtrl))
 
         #constrain everything
         cmds.parentConstraint(endCtrl,endNull,mo=True)
@@ -399,6 +436,7 @@ class Limb(object):
 
         return(aimCtrl,endCtrl)
 
+    @mpXform.cached
     def addFKIKChain(self,startJoint,endJoint,localParent,worldParent):
         '''Create a chain of FK ctrls with a blended IKRP solver. Requires three or more joints in chain.
         Also creates a "stub" joint with an SC solver at the end of the chain, so that the last joint's
@@ -407,7 +445,7 @@ class Limb(object):
         - worldParent = drives rotation when 'world' space is blended on. Drives IK translate and rotate.
         Returns list of [FkCtrl1,FKCtrl2,...,IKAim,IKEnd]
         '''
-        jointList = mpJoint.getJointList(startJoint,endJoint)
+        jointList = mpJoint.getJointList(startJoint,endJoint,snapshot=self.getSkeletonSnapshot())
         if len(jointList)<3:
             raise RuntimeError('FKIKChain needs at least three joints')
         fkCtrls = self.addFKChain(startJoint,endJoint,localParent)
@@ -481,7 +519,7 @@ class Limb(object):
         #make a null matching the IK's ori under the FK ctrl to act as a snap target
         self.name.desc='ikEndSnap'
         endSnapNull=cmds.group(em=True,n=self.name.get(),p=fkCtrls[-1])
-        cmds.xform(endSnapNull,ws=True,m=cmds.xform(endCtrl,q=True,ws=True,m=True))
+        cmds.xform(endSnapNull,ws=True,m=mpXform.getWorldMatrix(endCtrl))
         mpRig.addSnapParent(endCtrl, endSnapNull) 
         mpRig.addSnapParent(aimCtrl, fkCtrls[0])
         mpRig.addSnapParent(aimCtrl, fkCtrls[1])
@@ -514,7 +552,7 @@ class Limb(object):
             value = data
             try:
                 #if it's a string replace any 'lefts' or 'rights' and copy
-                if isinstance(value,basestring): #string attr
+                if isinstance(value,_stringTypes): #string attr
                     if leftToken in value:
                         newLimb.__dict__[attr] = value.replace(leftToken,rightToken)
                     elif rightToken in value:
@@ -533,7 +571,7 @@ class Limb(object):
                 elif type(value) in ('list','tuple'):
                     copiedIterable = copy.copy(value)
                     for item in copiedIterable:
-                        if isinstance(item,basestring):
+                        if isinstance(item,_stringTypes):
                             if leftToken in item:
                                 item = item.replace(leftToken,rightToken)
                             elif rightToken in item:
@@ -546,6 +584,13 @@ class Limb(object):
 
         return newLimb
 
+    def addDriverGraph(self):
+        '''finds the joints every ctrl of the limb drives and adds them to the driver maps
+        of lib/rig.py, so getJointFromCtrl and getCtrlFromJoint (used by setStartEndCtrls
+        and when wiring limbs together) don't walk the scene again.'''
+        ctrlJoints,jointCtrls = mpRig.makeDriverGraph(self.ctrls)
+        mpRig.addDriverGraph(ctrlJoints)
+
     def setStartEndCtrls(self):
         '''sets the startCtrl and endCtrl properties if they have not already been set.
         These properties are used to hook up pickwalk between limbs. If the limb author
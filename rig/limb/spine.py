@@ -1,6 +1,6 @@
 '''Spine Limbs'''
 
-import maya.cmds as cmds
+from mpyr.lib.scene import cmds
 import mpyr.lib.joint as mpJoint
 import mpyr.lib.attr as mpAttr
 import mpyr.lib.rig as mpRig
@@ -20,7 +20,7 @@ class SpineFK(limbBase.Limb):
 
     def build(self):
         self.addPinWorld()
-        jointList = mpJoint.getJointList(self.startJoint,self.endJoint)
+        jointList = mpJoint.getJointList(self.startJoint,self.endJoint,snapshot=self.getSkeletonSnapshot())
         if len(jointList) < 2:
             raise RuntimeError('SpineFK requires at least 2 joints in chain. Got %s'%len(jointList))
         
@@ -16,7 +16,7 @@ the .create() method.
 import os
 import getpass
 import logging
-import maya.cmds as cmds
+from mpyr.lib.scene import cmds
 
 import mpyr.lib.dag as mpDag
 import mpyr.lib.ctrl as mpCtrl
@@ -24,6 +24,8 @@ import mpyr.lib.attr as mpAttr
 import mpyr.lib.name as mpName
 import mpyr.lib.rig as mpRig
 import mpyr.lib.cache as mpCache
+import mpyr.lib.xform as mpXform
+import mpyr.lib.profiler as mpProfiler
 import mpyr.rig.limb.generic as limbGen
 
 RIGLOG = logging.getLogger('rig')
@@ -55,6 +57,10 @@ class Rig(object):
         
         #This is a cosmetic setting for ctrl sizes and whatnot.
         self.rigScale = 1
+
+        #Ctrl sets are made from the ctrls limbs register as they build. When this is True
+        #addLimbSets also walks every limb node and raises if the ctrls found don't match.
+        self.checkCtrlSets = False
         
         #this list gets appended to when limbs are added
         self.limbs = []
@@ -70,6 +76,8 @@ class Rig(object):
         self.ctrlSet = None      #The object set that will hold all the ctrls that are built
         self.cacheSet = None     #The object set that will hold all cacheable nodes
         self.loadSet = None      #The object set that will hold all nodes that can receive cache
+        self.skeletonSnapshot = None #dag.HierarchySnapshot of the skeleton, see getSkeletonSnapshot
+        self.limbSets = {}       #limb node: dict of the ctrl sets made by addLimbSets
 
 
         #Attrs set before build, used to import files/weights/etc. Can be set automatically based
@@ -85,23 +93,31 @@ class Rig(object):
 
     def create(self):
         '''Builds the rig by calling the creation methods in the correct 
-        order.
+        order. Names are checked with a lib.name NameRegistry during the build.
         '''
-        RIGLOG.info('beginning rig build')
-        self.begin()
-        RIGLOG.info('building rig')
-        self.build()
-        RIGLOG.info('ending build')
-        self.end()
-        RIGLOG.info('rig complete')
+        with mpProfiler.phase(str(self)),mpName.NameRegistry():
+            RIGLOG.info('beginning rig build')
+            with mpProfiler.phase('begin'):
+                self.begin()
+            RIGLOG.info('building rig')
+            with mpProfiler.phase('build'):
+                self.build()
+            RIGLOG.info('ending build')
+            with mpProfiler.phase('end'):
+                self.end()
+            RIGLOG.info('rig complete')
         
     def begin(self):
         '''Pre build actions'''
         cmds.file(new=True, f=True)
+        mpName.clearRegistry() #nothing left of the names used before
+        mpRig.clearMirrorTables()
+        mpRig.clearRigIndexes()
 
         RIGLOG.debug('making rig nodes')
         self.setRigNameDefault()  
         self.addRigNode()
+        mpRig.markDriverGraph(self.rigNode) #limbs add their ctrls as they are built
         self.addMasterSet()
         
         #Make some top level nodes
@@ -175,21 +191,38 @@ class Rig(object):
     def end(self):
         '''Post build actions'''
         #Add object sets for caching
-        self.addCacheSet()
-        self.addLoadSet()
+        with mpProfiler.phase('addCacheSet'):
+            self.addCacheSet()
+        with mpProfiler.phase('addLoadSet'):
+            self.addLoadSet()
 
         #Add object sets used for animation tools
-        self.addLimbSets()
-        self.addAllCtrlSet()
+        with mpProfiler.phase('addLimbSets'):
+            self.addLimbSets()
+        with mpProfiler.phase('addAllCtrlSet'):
+            self.addAllCtrlSet()
 
         #lock and cleanup
-        self.lock()
-        self.cleanupDanglingLimbs()
+        with mpProfiler.phase('lock'):
+            self.lock()
+        with mpProfiler.phase('cleanupDanglingLimbs'):
+            self.cleanupDanglingLimbs()
+
+        #store the mirror pairs of ctrls and limb attribute nodes on the rig node
+        with mpProfiler.phase('mirrorTable'):
+            self.addMirrorTable()
 
-        #add mirror info to every ctrl since we are in root pose now
-        for limbObj in self.limbs:
-            for ctrlNode in limbObj.ctrls:
-                mpRig.addMirrorInfo(ctrlNode)
+        #add mirror info to every ctrl since we are in root pose now.
+        #Nothing moves here, so every ctrl is queried once, all at the same time.
+        with mpProfiler.phase('mirrorInfo'),mpXform.XformCache():
+            mpXform.getWorldMatrices([ctrlNode for limbObj in self.limbs for ctrlNode in limbObj.ctrls])
+            for limbObj in self.limbs:
+                for ctrlNode in limbObj.ctrls:
+                    mpRig.addMirrorInfo(ctrlNode)
+
+        #store where every ctrl belongs on the rig node, for animation tools
+        with mpProfiler.phase('rigIndex'):
+            self.addRigIndex()
 
         
     def setRigNameDefault(self):
@@ -217,6 +250,7 @@ class Rig(object):
     def importSkeleton(self):
         '''Import the file specified with .skeletonPath'''
         self.getFile(self.skeletonPath,underGroup=True,underGroupName=self.skeletonNode)
+        self.skeletonSnapshot = None #hierarchy changed
 
         #set root joint attr if not yet set
         if not self.rootJoint:
@@ -228,6 +262,17 @@ class Rig(object):
         if not self.rootJoint:
             RIGLOG.warning('root joint not found in imported skeleton %s', self.skeletonPath)
 
+    def getSkeletonSnapshot(self,refresh=False):
+        '''Return a dag.HierarchySnapshot of everything under the skeletonNode, made the
+        first time this is called. Limbs share it for joint chain queries during the build.
+        Pass refresh=True after changing the skeleton hierarchy. Returns None before the
+        skeletonNode exists.'''
+        if not self.skeletonNode:
+            return None
+        if refresh or self.skeletonSnapshot is None:
+            self.skeletonSnapshot = mpDag.HierarchySnapshot(self.skeletonNode)
+        return self.skeletonSnapshot
+
     def importGeo(self):
         '''Import the file specified with .geoPath'''
         if self.geoPath:
@@ -332,6 +377,44 @@ class Rig(object):
                     RIGLOG.debug('limb %s not constrained, attaching to world', limb)
                     cmds.parentConstraint(self.limbs[0].ctrls[-1],limb.pinParent,mo=True)
             
+    def addMirrorTable(self):
+        '''Stores the mirror table of every ctrl and limb attribute node on the rig node,
+        so mirror tools look pairs up instead of parsing names. See lib/rig.py'''
+        nodes = [ctrlNode for limbObj in self.limbs for ctrlNode in limbObj.ctrls]
+        nodes.extend(limbObj.limbNode+mpName.LIMBSHAPE for limbObj in self.limbs if limbObj.limbNode)
+        mpRig.storeMirrorTable(self.rigNode,mpRig.makeMirrorTable(nodes))
+
+    def addRigIndex(self):
+        '''Stores the index of every ctrl in the limb sets on the rig node: its limb, limb
+        shape, ctrl sets, mirror ctrl and info, pick and snap relatives, reset values and the
+        joints it drives.
+        lib/rig.py looks ctrls up in it instead of walking the scene. Run after
+        addLimbSets and once the mirror info is added.'''
+        index = {'version':mpRig.RIGINDEXVERSION,'allCtrlSet':self.ctrlSet,'limbs':{},'ctrls':{}}
+        ctrlJoints = mpRig.getCtrlJoints([ctrlNode for limbData in self.limbSets.values() for ctrlNode in limbData['ctrls']])
+        for limbNode,limbData in self.limbSets.items():
+            limbInfo = dict(limbData)
+            limbInfo['shape'] = limbNode+mpName.LIMBSHAPE
+            index['limbs'][limbNode] = limbInfo
+            for ctrlNode in limbData['ctrls']:
+                index['ctrls'][ctrlNode] = {
+                    'limb':limbNode,
+                    'mirror':mpRig.findMirrorCtrl(ctrlNode),
+                    'pickParents':self._getConnections(ctrlNode,'pickParents',source=True),
+                    'pickChildren':self._getConnections(ctrlNode,'pickChildren',source=False),
+                    'snapParents':self._getConnections(ctrlNode,'snapParents',source=True),
+                    'defaults':mpRig.queryCtrlDefaults(ctrlNode),
+                    'mirrorInfo':mpRig.queryMirrorInfo(ctrlNode),
+                    'joints':ctrlJoints[ctrlNode],
+                    }
+        mpRig.storeRigIndex(self.rigNode,index)
+
+    def _getConnections(self,node,attr,source):
+        '''return the nodes connected to node.attr, or an empty list if it has no attr'''
+        if not cmds.objExists(node+'.'+attr):
+            return []
+        return cmds.listConnections(node+'.'+attr,s=source,d=not source) or []
+
     def addMasterSet(self):
         '''Creates the top level object set for the rig'''
         self.masterSet = cmds.sets(em=True,n=self.rigNode+'_MASTERSET')
@@ -355,48 +438,50 @@ class Rig(object):
         every control can easily be found by animation tools.
         
         FK/IK ctrls are sorted into sets by name. It's specified here, and when the ctrls are made, 
-        by the convention in lib/name.py
+        by the convention in lib/name.py. The ctrls are the ones each limb added while
+        building (limb.ctrls), see checkCtrlSets to compare them with the scene.
         '''
         RIGLOG.info('adding limb ctrl sets')
+        limbSets = []
         for limb in self.limbs:
-            ctrls = []
-            fkCtrls = []
-            ikCtrls = []
-            allNodes = cmds.listRelatives(limb.limbNode,ad=True)
-            for node in allNodes:
-                if mpCtrl.isCtrl(node):
-                    if node.endswith(mpName.FKCTRL):
-                        fkCtrls.append(node)
-                    elif node.endswith(mpName.IKCTRL):
-                        ikCtrls.append(node)
-                    else:
-                        ctrls.append(node)
+            if self.checkCtrlSets:
+                self.checkLimbCtrls(limb)
+            fkCtrls,ikCtrls,ctrls = limb.getCtrlsByType()
             limbSet = cmds.sets(em=True,n=limb.limbNode+'_'+mpName.CTRLSET)
-            cmds.sets(limbSet,add=self.masterSet)
+            limbSets.append(limbSet)
+            fkSet,ikSet,ctrlSet = (None,None,None)
             if fkCtrls:
-                fkSet = cmds.sets(em=True,n=limb.limbNode+'_'+mpName.CTRLSETFK)                            
-                cmds.sets(fkSet,add=limbSet)
-                cmds.sets(fkCtrls,add=fkSet)
+                fkSet = cmds.sets(fkCtrls,n=limb.limbNode+'_'+mpName.CTRLSETFK)
             if ikCtrls:
-                ikSet = cmds.sets(em=True,n=limb.limbNode+'_'+mpName.CTRLSETIK)  
-                cmds.sets(ikSet,add=limbSet)
-                cmds.sets(ikCtrls,add=ikSet)
+                ikSet = cmds.sets(ikCtrls,n=limb.limbNode+'_'+mpName.CTRLSETIK)
             if ctrls:
-                ctrlSet = cmds.sets(em=True,n=limb.limbNode+'_'+mpName.CTRLSET)  
-                cmds.sets(ctrlSet,add=limbSet)
-                cmds.sets(ctrls,add=ctrlSet)
+                ctrlSet = cmds.sets(ctrls,n=limb.limbNode+'_'+mpName.CTRLSET)
+            childSets = [item for item in (fkSet,ikSet,ctrlSet) if item]
+            if childSets:
+                cmds.sets(childSets,add=limbSet)
+            self.limbSets[limb.limbNode] = {'set':limbSet,'setFK':fkSet,'setIK':ikSet,
+                'ctrls':fkCtrls+ikCtrls+ctrls}
+        if limbSets:
+            cmds.sets(limbSets,add=self.masterSet)
+
+    def checkLimbCtrls(self,limb):
+        '''Walks everything under a limb node and raises RuntimeError if the ctrls found
+        aren't the ones the limb registered in limb.ctrls. Run by addLimbSets when
+        checkCtrlSets is True.'''
+        found = set(node for node in cmds.listRelatives(limb.limbNode,ad=True) or [] if mpCtrl.isCtrl(node))
+        registered = set(limb.ctrls)
+        if found != registered:
+            raise RuntimeError('Ctrls of limb %s do not match the scene. Not in limb.ctrls: %s, not ctrls under the limb: %s'%(
+                limb,sorted(found-registered),sorted(registered-found)))
 
     def addAllCtrlSet(self):
         '''create a set with all ctrl, called when limb building is done'''
-        allCtrls=[]
-        for limb in self.limbs:
-            allNodes = cmds.listRelatives(limb.limbNode,ad=True)
-            for node in allNodes:
-                if mpCtrl.isCtrl(node):
-                    allCtrls.append(node)
-        self.ctrlSet=cmds.sets(em=True,n=self.rigNode+'_'+mpName.ALLCTRLSET)
+        allCtrls = [ctrlNode for limb in self.limbs for ctrlNode in limb.ctrls]
+        if allCtrls:
+            self.ctrlSet = cmds.sets(allCtrls,n=self.rigNode+'_'+mpName.ALLCTRLSET)
+        else:
+            self.ctrlSet = cmds.sets(em=True,n=self.rigNode+'_'+mpName.ALLCTRLSET)
         cmds.sets(self.ctrlSet,add=self.masterSet) 
-        cmds.sets(allCtrls,add=self.ctrlSet)
                 
         
     def addLimb(self,limbObj):
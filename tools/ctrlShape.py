@@ -5,11 +5,15 @@ import os
 import sys
 import subprocess
 import tempfile
-import maya.cmds as cmds
-import maya.mel as mel
+from mpyr.lib.scene import cmds
+from mpyr.lib.scene import mel
 import mpyr.lib.rig as mpRig
 import mpyr.lib.ctrl as mpCtrl
 import mpyr.lib.fileIO as mpFile
+try:
+    from importlib import reload
+except ImportError:
+    pass #python 2, reload is a builtin
 
 reload(mpCtrl)
 
@@ -122,7 +126,7 @@ class SaveLoadCtrlShape(object):
         filePath=self.getTempFileName()
 
         mpCtrl.saveCtrlAppearance([sel[0]],filePath,search=sel[0],replace='TEMPNAME')
-        print 'copied tmp ctrl shape to',filePath
+        print('copied tmp ctrl shape to %s'%filePath)
 
     def pasteShapes(self,*args,**kwargs):
         '''load current shape from temp file'''
@@ -131,7 +135,7 @@ class SaveLoadCtrlShape(object):
             raise RuntimeError("Please select a ctrl")
         filePath=self.getTempFileName()
         mpCtrl.loadCtrlAppearance(filePath,search='TEMPNAME',replace=sel[0])
-        print 'pasted tmp ctrl shape to',filePath
+        print('pasted tmp ctrl shape to %s'%filePath)
         cmds.select(sel,r=True)
 
     def mirrorCtrl(self,*args,**kwargs):
@@ -192,10 +196,10 @@ class SaveLoadCtrlShape(object):
                     subprocess.call("start "+self.directory, shell=True)
                 else:
                     subprocess.call("open "+self.directory, shell=True)
-            except OSError, e:
-                print "File open failed:", e
+            except OSError as e:
+                print('File open failed: %s'%e)
         else:
-            print 'failed tests'
+            print('failed tests')
 
 
     def mirrorCtrlShape(self,src,dst=None):
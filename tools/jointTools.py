@@ -1,5 +1,5 @@
 '''Tools for joint orient workflow'''
-import maya.cmds as cmds
+from mpyr.lib.scene import cmds
 import mpyr.lib.joint as mpJoint
 
 class JointOrientTool(object):
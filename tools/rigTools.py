@@ -1,6 +1,10 @@
 '''Tools for performing rig actions, mirror limbs, reset etc.'''
-import maya.cmds as cmds
+from mpyr.lib.scene import cmds
 import mpyr.lib.rig as mpRig
+try:
+    from importlib import reload
+except ImportError:
+    pass #python 2, reload is a builtin
 reload(mpRig)
 
 class RigTools(object):
@@ -1,6 +1,6 @@
 '''Importing this module creates a shelf with the mpyr tools'''
-import maya.cmds as cmds
-import maya.mel as mel
+from mpyr.lib.scene import cmds
+from mpyr.lib.scene import mel
 
 def createShelf():
     shelfName='MPYR'